@@ -1,61 +1,56 @@
 # app.py (Flask API)
 
+import asyncio
+import os
+import threading
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 app = Flask(__name__)
 
-from data_handler import annualize_parameters, fetch_data, get_return,get_correlation_matrix
-from portfolio_optimizer import optimize_portfolio
-from simulations import simulate_portfolio, simulation_value
-from risk_neutral_pricing import risk_neutral_price
-from efficient_frontier import plot_effifient_frontier
-from config import ASSETS, RISK_TOLERANCE, TIME_HORIZON, RETURN_EXPECTATIONS, REBALANCING_FREQUENCY
-
-def portfolio(assets=ASSETS, risk_tolerance=RISK_TOLERANCE, time_horizon=TIME_HORIZON, return_expectations=RETURN_EXPECTATIONS,
-            rebalancing_frequency=REBALANCING_FREQUENCY):
-    trading_days_per_year = 252
-    
-    # Fetch and process data
-    data = fetch_data(assets)
-
-    returns = get_return(data)
-
-    # Estimate the expected return (mean of daily returns) and volatility (std of returns)
-    mu = returns.mean()
-    sigma = returns.std()
-
-    # Annualize the parameters
-    mu_annualized, sigma_annualized = annualize_parameters(mu, sigma, trading_days_per_year)
-
-    # Calculate the correlation matrix of the returns
-    correlation_matrix = get_correlation_matrix(returns)
-
-
-    optimal_weights, (expected_return, portfolio_volatility) = optimize_portfolio(mu_annualized.values, sigma_annualized.values, correlation_matrix, 
-                                                                                  risk_tolerance/10,target_return=return_expectations )
-    
-    S0 = data.iloc[-1].values # last observed price for each asset
-    dt = 1/252  # Time step (daily data)
-
-    # Simualate portfolio performance
-    simulated_path_prices = simulate_portfolio(len(ASSETS), S0, mu_annualized, sigma_annualized, time_horizon, dt)
+from data_handler import asset_prices, get_return
+from pipeline import run_portfolio
+from simulations import simulation_value
+from efficient_frontier import resampled_frontier
+from config import MONITOR_REPLAY_PATH, RunConfig
+from incremental import get_session, open_session
+from streaming_monitor import StreamingMonitor, replay_file, server_sent_events
+
+# Live stop/rebalance monitor shared by the streaming routes
+monitor = StreamingMonitor()
+
+# Largest resampled frontier one request may ask for. Its cost grows with resamples x points x assets: on one
+# CPU 10 assets x 500 resamples x 100 points take about 4s and 50 x 100 x 100 about 10s
+MAX_RESAMPLES = 1000
+MAX_FRONTIER_POINTS = 200
+MAX_RESAMPLED_ASSETS = 50
+MAX_RESAMPLED_WORK = 500_000
+
+# Processes the resamples of one request are solved across (None: one per CPU)
+RESAMPLE_WORKERS = None
+
+def portfolio(config=RunConfig()):
+    """
+    Run the optimization, simulation and risk pipeline for one run configuration.
+
+    Every setting (universe, risk tolerance, horizon, target, estimator, objective) comes from `config`,
+    so concurrent requests with different configurations never read shared module state. The pipeline
+    itself is pipeline.run_portfolio, shared with the batch mode; this only shapes its results for the API.
+    """
+    # Prices are views of the shared price store when the API serves a universe
+    run = run_portfolio(config)
 
     # Simualate portfolio values
-    simulation_portfolio_values = simulation_value(size_assets=len(ASSETS), simulated_paths_prices=simulated_path_prices, time_horizon=time_horizon)
-    
-    # Get just Efficient Frontier data
-    effcient_frontier = plot_effifient_frontier(mu_annualized.values, sigma_annualized.values, correlation_matrix, risk_tolerance/10, plot=False)
-
-    # Calculate portfolio VaR (95% confidence interval) using historical simulation
-    portfolio_returns = returns.dot(optimal_weights)
+    simulation_portfolio_values = simulation_value(size_assets=len(run.assets), simulated_paths_prices=run.simulated_prices, config=config)
 
-    VaR_95 = np.percentile(portfolio_returns, 5)
+    # Portfolio VaR (95% confidence interval) using historical simulation; the frontier points follow the optimal portfolio
+    VaR_95 = run.metrics['historical_var'][0]
+    frontier_risk = {name: values[1:].tolist() for name, values in run.metrics.items()}
 
-    
-    return optimal_weights.tolist(), str(f'{expected_return * 100:.2f}'), str(f'{portfolio_volatility * 100:.2f}'), str(f'{VaR_95 * 100:.2f}'), effcient_frontier, simulation_portfolio_values
+    return (run.weights.tolist(), str(f'{run.expected_return * 100:.2f}'), str(f'{run.volatility * 100:.2f}'), str(f'{VaR_95 * 100:.2f}'),
+            run.frontier_volatilities, simulation_portfolio_values, frontier_risk)
 
     # Backtesting
-    # continuous_monitoring_and_rebalancing(data,risk_tolerance/10, rebalance_frequency= REBALANCING_FREQUENCY)
+    # continuous_monitoring_and_rebalancing(data, config=config)
 
 
 @app.route('/optimize', methods=['POST'])
@@ -64,16 +59,23 @@ def optimize():
     # Get inputs
     data = request.get_json()
 
-    assets =  data['assets']
-    risk_tolerance = data['risk_tolerance']
-    time_horizon = data['time_horizon']
-    return_expectations = data['return_expectations']
-    rebalancing_frequency = data['rebalancing_frequency']
+    # Optional fields fall back to the defaults of config.py
+    try:
+        config = RunConfig(
+            assets=data['assets'],
+            risk_tolerance=data['risk_tolerance'],
+            time_horizon=data['time_horizon'],
+            return_expectations=data['return_expectations'],
+            rebalancing_frequency=data['rebalancing_frequency'],
+            covariance_estimator=data.get('covariance_estimator', RunConfig.covariance_estimator),
+            objective=data.get('objective', RunConfig.objective),
+            model=data.get('model', RunConfig.model),
+        )
+    except (KeyError, TypeError, ValueError) as error:
+        return jsonify({'error': f'Invalid request: {error}'}), 400
 
     # Call portfolio optimization function
-    optimal_weights, excepted_return, portfolio_volatility, VaR, effifient_frontier, simulation_portfolio_values = portfolio(
-        assets=assets, risk_tolerance=risk_tolerance, time_horizon=time_horizon, return_expectations=return_expectations, rebalancing_frequency=rebalancing_frequency
-    )
+    optimal_weights, excepted_return, portfolio_volatility, VaR, effifient_frontier, simulation_portfolio_values, effifient_frontier_risk = portfolio(config)
 
     print(simulation_portfolio_values)
 
@@ -90,7 +92,163 @@ def optimize():
         'VaR': VaR,
         'effifient_frontier': effifient_frontier,
         'simulation_portfolio_values': simulation_portfolio_values,
+        'effifient_frontier_risk': effifient_frontier_risk,
+    })
+
+@app.route('/resampled_frontier', methods=['POST'])
+def resampled_frontier_route():
+
+    # Get inputs
+    data = request.get_json()
+
+    try:
+        assets = list(RunConfig(assets=data['assets']).assets)
+        n_resamples = int(data.get('n_resamples', 500))
+        n_points = int(data.get('n_points', 100))
+        if not 1 <= n_resamples <= MAX_RESAMPLES or not 3 <= n_points <= MAX_FRONTIER_POINTS:
+            raise ValueError(f'n_resamples must be in [1, {MAX_RESAMPLES}] and n_points in [3, {MAX_FRONTIER_POINTS}]')
+        if len(assets) > MAX_RESAMPLED_ASSETS:
+            raise ValueError(f'at most {MAX_RESAMPLED_ASSETS} assets are supported')
+        if n_resamples * n_points * len(assets) > MAX_RESAMPLED_WORK:
+            raise ValueError(f'n_resamples x n_points x assets must be at most {MAX_RESAMPLED_WORK}')
+    except (KeyError, TypeError, ValueError) as error:
+        return jsonify({'error': f'Invalid request: {error}'}), 400
+
+    returns = get_return(asset_prices(assets))
+    frontier = resampled_frontier(returns.values, n_resamples=n_resamples, n_points=n_points, max_workers=RESAMPLE_WORKERS)
+
+    # Bands keyed by quantile as strings, so the frontend can chart each one as a series
+    def bands(name):
+        return {str(quantile): values.tolist() for quantile, values in frontier[name].items()}
+
+    return jsonify({
+        'assets': assets,
+        'weights': frontier['weights'].tolist(),
+        'expected_returns': frontier['expected_returns'].tolist(),
+        'volatilities': frontier['volatilities'].tolist(),
+        'return_bands': bands('return_bands'),
+        'volatility_bands': bands('volatility_bands'),
+        'weight_bands': bands('weight_bands'),
     })
 
+@app.route('/what_if', methods=['POST'])
+def what_if():
+
+    # Get inputs: the session's universe, optional tickers to add or remove, whether to append the days
+    # published since the session opened ('refresh') or to start it over ('reset'), and the optimizer settings.
+    # A session is identified by its id alone: 'assets' opens it, and later requests either omit 'assets' or
+    # send the session's current list (the 'assets' of the last response)
+    data = request.get_json()
+
+    try:
+        session_id = str(data['session_id'])
+        assets = None if data.get('assets') is None else list(RunConfig(assets=data['assets']).assets)
+        add, remove = data.get('add'), data.get('remove')
+        refresh, reset = bool(data.get('refresh', False)), bool(data.get('reset', False))
+        risk_tolerance = float(data.get('risk_tolerance', RunConfig.risk_tolerance))
+        target_return = data.get('return_expectations')
+        target_return = None if target_return is None else float(target_return)
+    except (KeyError, TypeError, ValueError) as error:
+        return jsonify({'error': f'Invalid request: {error}'}), 400
+
+    # A cached session is updated incrementally; otherwise the universe is loaded once
+    session = get_session(session_id)
+    if session is None or reset:
+        if assets is None:
+            return jsonify({'error': 'Invalid request: assets are needed to open a session'}), 400
+        session = open_session(session_id, assets, get_return(asset_prices(assets)))
+
+    elif assets is not None and assets != session.assets:
+        # Silently reopening would discard the session's additions, removals and warm start
+        return jsonify({'error': f'assets do not match session {session_id} (send its current assets, or reset)',
+                        'assets': session.assets}), 409
+
+    elif refresh:
+        try:
+            session.update(get_return(asset_prices(session.assets)))
+        except (KeyError, ValueError) as error:
+            return jsonify({'error': f'Cannot update the session: {error}'}), 400
+
+    if remove:
+        try:
+            session.remove_asset(remove)
+        except ValueError as error:
+            return jsonify({'error': f'Cannot remove {remove}: {error}'}), 400
+
+    if add and add not in session.assets:
+        try:
+            session.add_asset(add, asset_prices([add])[add].pct_change(fill_method=None))
+        except (KeyError, ValueError) as error:
+            return jsonify({'error': f'Cannot add {add}: {error}'}), 400
+
+    optimal_weights, (expected_return, portfolio_volatility) = session.optimize(risk_tolerance / 10, target_return)
+    _, frontier_volatilities, _ = session.frontier()
+
+    return jsonify({
+        'assets': session.assets,
+        'optimal_weights': optimal_weights.tolist(),
+        'excepted_return': f'{expected_return * 100:.2f}',
+        'portfolio_volatility': f'{portfolio_volatility * 100:.2f}',
+        'effifient_frontier': frontier_volatilities.tolist(),
+    })
+
+@app.route('/monitor/portfolios', methods=['POST'])
+def monitor_portfolio():
+
+    # Get inputs: {'id', 'weights': {ticker: weight}, optional 'band' and 'threshold'}
+    data = request.get_json()
+
+    try:
+        monitor.add_portfolio(data['id'], {str(ticker): float(weight) for ticker, weight in data['weights'].items()},
+                              band=float(data.get('band', 0.05)), threshold=float(data.get('threshold', RunConfig.rebalance_threshold)))
+    except (KeyError, TypeError, ValueError, AttributeError) as error:
+        return jsonify({'error': f'Invalid request: {error}'}), 400
+
+    return jsonify({'monitored': data['id']})
+
+@app.route('/monitor/replay', methods=['POST'])
+def monitor_replay():
+
+    # Replay a tick or price file of the replay directory through the monitor in the background
+    data = request.get_json()
+
+    try:
+        name, rate = str(data['path']), data.get('rate')
+        root = os.path.realpath(MONITOR_REPLAY_PATH)
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f'{name} is outside the replay directory')
+        open(path).close()
+    except (KeyError, TypeError, ValueError, OSError) as error:
+        return jsonify({'error': f'Invalid request: {error}'}), 400
+
+    threading.Thread(target=replay_in_background, args=(name, path, rate), daemon=True).start()
+    return jsonify({'replaying': name})
+
+def replay_in_background(name, path, rate=None):
+    """
+    Run a replay to its end; a failure (e.g. a malformed line) is logged and sent to the stream as an 'error' event
+    """
+    try:
+        asyncio.run(monitor.run(replay_file(path, rate)))
+    except Exception as error:
+        app.logger.exception('Replay of %s failed', name)
+        # Subscribers see the file's name, not where the server keeps it
+        monitor.publish({'type': 'error', 'path': name, 'error': str(error).replace(path, name)})
+
+@app.route('/monitor/stream')
+def monitor_stream():
+
+    # Server-Sent Events: one event per stop/rebalance decision
+    subscriber = monitor.subscribe()
+
+    def events():
+        try:
+            yield from server_sent_events(subscriber)
+        finally:
+            monitor.unsubscribe(subscriber)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 if __name__ == '__main__':
     app.run(debug=True)
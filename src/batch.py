@@ -0,0 +1,264 @@
+'''
+Purpose: Headless batch runs of many portfolio specifications
+
+A spec file lists one portfolio per row, as CSV or JSON lines:
+- JSONL: {"id": "growth", "assets": ["AAPL", "TSLA"], "risk_tolerance": 8, "objective": "cvar"}
+- CSV: header `id,assets,risk_tolerance,...`, with the assets separated by ';' (or spaces)
+Every field other than 'id' is a RunConfig setting; missing settings use config.py's defaults.
+
+The prices are loaded once (a CSV such as data/raw_data.csv, a price store universe, or one download
+of every ticker) and handed to each worker process once, through the pool initializer. Each spec is
+optimized, simulated and risk-measured in a worker; a failing spec becomes a row with an 'error'
+instead of stopping the batch. The results table (one row per spec, in spec order) is written as
+JSON lines or, when pyarrow is installed, Parquet.
+
+Plots never open a window: with a plot directory, every spec's simulated values and efficient frontier
+are rendered to PNG files by a separate process while the workers carry on with the next specs.
+'''
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+import numpy as np
+
+from config import RunConfig
+
+# Output formats, by file extension
+RESULT_FORMATS = ('.jsonl', '.parquet')
+
+# Prices shared by every spec of the running batch (set once per worker process)
+_prices = None
+
+# RunConfig field name -> type, to parse CSV cells
+_CONFIG_TYPES = {field.name: field.type for field in fields(RunConfig)}
+
+
+def _parse_cell(name, value):
+    # CSV cells are strings; convert them to the type of the RunConfig field
+    if name == 'assets':
+        return value.replace(';', ' ').split()
+    if _CONFIG_TYPES[name] is int:
+        return int(value)
+    if _CONFIG_TYPES[name] is float:
+        return float(value)
+    return value
+
+
+def read_specs(path):
+    """
+    Read a spec file (CSV or JSON lines, by extension) into run configurations.
+
+    All specs are validated before anything runs, so a typo fails the batch at once instead of hours later.
+
+    Returns:
+    - list of (spec id, RunConfig), in file order; specs without an 'id' are numbered from 0
+    """
+    if path.endswith('.csv'):
+        import csv
+
+        with open(path, newline='') as f:
+            # Empty cells fall back to the defaults
+            rows = [{name: value for name, value in row.items() if value not in (None, '')} for row in csv.DictReader(f)]
+    else:
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    specs = []
+    for number, row in enumerate(rows):
+        spec_id = str(row.pop('id', number))
+        try:
+            unknown = set(row) - set(_CONFIG_TYPES)
+            if unknown:
+                raise ValueError(f"unknown settings {sorted(unknown)}")
+            if path.endswith('.csv'):
+                row = {name: _parse_cell(name, value) for name, value in row.items()}
+            specs.append((spec_id, RunConfig(**row)))
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Invalid spec {spec_id!r} in {path}: {error}") from error
+
+    ids = [spec_id for spec_id, _ in specs]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate spec ids in {path}.")
+
+    return specs
+
+
+def load_batch_prices(specs, prices_path=None, universe=None):
+    """
+    Load the prices of every ticker used by the specs, once for the whole batch.
+
+    Args:
+    - specs: list of (spec id, RunConfig)
+    - prices_path (optional): CSV of prices (dates x tickers), e.g. data/raw_data.csv
+    - universe (optional): price store universe to read instead (see data_handler.load_prices)
+    Without either, every ticker is downloaded in one fetch_data call.
+    """
+    tickers = sorted({asset for _, config in specs for asset in config.assets})
+
+    if universe is not None:
+        from data_handler import load_prices
+        return load_prices(universe)
+    if prices_path is not None:
+        import pandas as pd
+        return pd.read_csv(prices_path, index_col=0, parse_dates=True)
+
+    from data_handler import fetch_data
+    return fetch_data(tickers)
+
+
+def _set_prices(prices):
+    global _prices
+    _prices = prices
+
+
+def evaluate_spec(config, prices, with_plot_data=False):
+    """
+    Optimize, simulate and measure the risk of one spec with the API's pipeline (pipeline.run_portfolio).
+
+    Args:
+    - config: run configuration of the spec
+    - prices: historical prices containing (at least) the spec's assets
+    - with_plot_data: also return the data of the spec's plots
+
+    Returns:
+    - (row, plot data): row is a dict of result columns; plot data is None unless requested
+    """
+    from pipeline import run_portfolio
+
+    run = run_portfolio(config, prices, frontier=with_plot_data)
+
+    # Value of the optimal portfolio along every simulated path, normalized to 1 at t=0
+    simulated_prices, weights = run.simulated_prices, run.weights
+    values = (simulated_prices @ weights.astype(simulated_prices.dtype)) / (run.initial_prices @ weights)
+    terminal = values[:, -1].astype(float)
+
+    row = {
+        'assets': run.assets,
+        'weights': weights.tolist(),
+        'expected_return': run.expected_return,
+        'volatility': run.volatility,
+        **{name: float(value[0]) for name, value in run.metrics.items()},
+        'mean_terminal_value': float(terminal.mean()),
+        'terminal_value_5%': float(np.quantile(terminal, 0.05)),
+        'probability_of_loss': float(np.mean(terminal < 1.0)),
+    }
+
+    plot_data = None
+    if with_plot_data:
+        frontier_volatilities = np.asarray(run.frontier_volatilities, dtype=float)
+        plot_data = {
+            'times': np.linspace(0, config.time_horizon, values.shape[1]),
+            'values': values[:10].astype(float),
+            'frontier_volatilities': frontier_volatilities,
+            'frontier_returns': np.linspace(run.mu_annualized.min(), run.mu_annualized.max(), len(frontier_volatilities)),
+        }
+
+    return row, plot_data
+
+
+def _run_spec(spec_id, config, with_plot_data):
+    try:
+        row, plot_data = evaluate_spec(config, _prices, with_plot_data)
+    except Exception as error:
+        # One bad spec (unknown ticker, infeasible target, ...) must not stop the nightly batch
+        return {'id': spec_id, 'error': f'{type(error).__name__}: {error}'}, None
+    return {'id': spec_id, 'error': None, **row}, plot_data
+
+
+def render_plots(spec_id, plot_dir, plot_data):
+    """
+    Render a spec's simulated portfolio values and efficient frontier to PNG files (no display needed)
+
+    Returns:
+    - paths of the written files
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+
+    os.makedirs(plot_dir, exist_ok=True)
+    paths = [os.path.join(plot_dir, f'{spec_id}_simulation.png'), os.path.join(plot_dir, f'{spec_id}_frontier.png')]
+
+    figure, axis = plt.subplots(figsize=(10, 6))
+    axis.plot(plot_data['times'], plot_data['values'].T)
+    axis.set(title=f"Simulated Portfolio Values Over Time ({spec_id})", xlabel="Time (Years)", ylabel="Portfolio Value")
+    figure.savefig(paths[0])
+    plt.close(figure)
+
+    figure, axis = plt.subplots(figsize=(10, 6))
+    axis.plot(plot_data['frontier_volatilities'], plot_data['frontier_returns'], color="b")
+    axis.set(title=f"Efficient Frontier ({spec_id})", xlabel="Portfolio Volatility (Risk)", ylabel="Portfolio Expected Return")
+    axis.grid(True)
+    figure.savefig(paths[1])
+    plt.close(figure)
+
+    return paths
+
+
+def write_results(results, output_path):
+    """
+    Write a batch results table as JSON lines or Parquet (by extension), atomically
+    """
+    extension = os.path.splitext(output_path)[1]
+    if extension not in RESULT_FORMATS:
+        raise ValueError(f"Unsupported output format {extension!r}; use one of {RESULT_FORMATS}.")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if extension == '.parquet':
+        # Needs pyarrow (or fastparquet); pandas raises an ImportError naming it otherwise
+        results.to_parquet(output_path + '.tmp', index=False)
+    else:
+        results.to_json(output_path + '.tmp', orient='records', lines=True)
+    os.replace(output_path + '.tmp', output_path)
+
+
+def run_batch(specs, prices, output_path=None, max_workers=None, plot_dir=None):
+    """
+    Run every spec across a process pool.
+
+    Args:
+    - specs: list of (spec id, RunConfig), e.g. from read_specs
+    - prices: historical prices of every ticker in the specs (see load_batch_prices)
+    - output_path (optional): .jsonl or .parquet file for the results table
+    - max_workers: worker processes (1 runs the specs in this process)
+    - plot_dir (optional): directory for each spec's plots, rendered by a separate process
+
+    Returns:
+    - Results table (DataFrame, one row per spec, in spec order; failed specs carry an 'error')
+    """
+    import pandas as pd
+
+    with_plot_data = plot_dir is not None
+    plotter = ProcessPoolExecutor(max_workers=1) if with_plot_data else None
+    plots = []
+    rows = {}
+
+    def record(spec_id, row, plot_data):
+        rows[spec_id] = row
+        if plot_data is not None:
+            plots.append(plotter.submit(render_plots, spec_id, plot_dir, plot_data))
+
+    try:
+        if max_workers == 1:
+            _set_prices(prices)
+            for spec_id, config in specs:
+                record(spec_id, *_run_spec(spec_id, config, with_plot_data))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_prices, initargs=(prices,)) as pool:
+                futures = {pool.submit(_run_spec, spec_id, config, with_plot_data): spec_id for spec_id, config in specs}
+                for future in as_completed(futures):
+                    record(futures[future], *future.result())
+
+        results = pd.DataFrame([rows[spec_id] for spec_id, _ in specs])
+        if output_path:
+            write_results(results, output_path)
+
+        # Only now wait for the plots still being rendered
+        for plot in plots:
+            plot.result()
+    finally:
+        if plotter is not None:
+            plotter.shutdown()
+
+    return results
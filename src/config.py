@@ -1,5 +1,8 @@
 # user-defined parameters for portfolio optimization
 
+import numbers
+from dataclasses import dataclass, replace
+
 # List of selected assets (Tickers)
 ASSETS = ['AAPL', 'TSLA', '^IRX']
 
@@ -13,7 +16,114 @@ TIME_HORIZON = 1
 REBALANCING_FREQUENCY = 'Quarterly'
 
 # Investment goal (Growth, Income, etc.)
-RETURN_EXPECTATIONS = 0.06,  # 6% annual return
+RETURN_EXPECTATIONS = 0.06  # 6% annual return
 
 # Risk-free rate (US Treasury bond rate)
 RISK_FREE_RATE = 0.02 # 2% risk-free rate
+
+# Covariance estimator: 'sample', 'pairwise' (missing data), 'ledoit_wolf', 'ewma' or 'factor' (structured low-rank model for large universes)
+COVARIANCE_ESTIMATOR = 'sample'
+
+# Universes larger than this use the sparse QP (ADMM) optimizer instead of SLSQP
+LARGE_UNIVERSE_THRESHOLD = 100
+
+# Optimization objective: 'variance' (mean-variance) or 'cvar' (minimum CVaR over historical scenarios)
+OPTIMIZATION_OBJECTIVE = 'variance'
+
+# Confidence level used for VaR/CVaR
+CVAR_CONFIDENCE = 0.95
+
+# Price path model of the simulations: 'gbm', 'merton' (jump-diffusion), 'heston' (stochastic volatility)
+# or 'regime_switching' (fitted to the historical returns), see sde_models.py
+SIMULATION_MODEL = 'gbm'
+
+# Directory of the shared memory-mapped price store
+DATA_STORE_PATH = 'data/store'
+
+# Price store universe the API reads its prices from, shared by every worker (None downloads them per
+# request with fetch_data); the SDE_PRICE_UNIVERSE environment variable overrides it
+PRICE_UNIVERSE = None
+
+# Source of fetch_data prices: 'yahoo' (download) or 'synthetic' (offline, see synthetic_market.py);
+# the SDE_DATA_BACKEND environment variable overrides it
+DATA_BACKEND = 'yahoo'
+
+# Directory of the tick and price files the API may replay through the streaming monitor (/monitor/replay
+# only opens files inside it)
+MONITOR_REPLAY_PATH = 'data/replay'
+
+# Directory of the memory-mapped cache of standard normal Monte Carlo shocks (see noise_cache.py); the
+# SDE_NOISE_CACHE_PATH environment variable overrides it
+NOISE_CACHE_PATH = 'data/store/noise'
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """
+    Immutable settings of one optimization/simulation run, defaulting to the constants above.
+
+    Being frozen (and holding the assets as a tuple) it is hashable, so runs with different
+    universes or settings can execute concurrently in one process and be used as cache keys.
+    """
+    assets: tuple = tuple(ASSETS)
+    risk_tolerance: float = RISK_TOLERANCE
+    time_horizon: float = TIME_HORIZON
+    return_expectations: float = RETURN_EXPECTATIONS
+    rebalancing_frequency: str = REBALANCING_FREQUENCY
+    risk_free_rate: float = RISK_FREE_RATE
+    covariance_estimator: str = COVARIANCE_ESTIMATOR
+    objective: str = OPTIMIZATION_OBJECTIVE
+    cvar_confidence: float = CVAR_CONFIDENCE
+    large_universe_threshold: int = LARGE_UNIVERSE_THRESHOLD
+    # Price move that triggers a rebalance in the optimal stopping rule
+    rebalance_threshold: float = 0.03
+    # Monte Carlo settings (daily steps, fixed seed for reproducibility)
+    n_simulations: int = 1000
+    n_steps: int = 252
+    time_step: float = 1 / 252
+    seed: int = 42
+    # Monte Carlo shocks: 'pseudo' (pseudo-random) or 'qmc' (scrambled Sobol with Brownian bridge)
+    sampling: str = 'pseudo'
+    # 'double' (float64 throughout) or 'mixed' (float32 paths and valuation, float64 accumulation and optimizer)
+    precision: str = 'double'
+    # Price path model of the simulations
+    model: str = SIMULATION_MODEL
+
+    def __post_init__(self):
+        from data_handler import COVARIANCE_ESTIMATORS
+
+        # Normalize inputs coming from JSON (lists, ints) so equal settings hash equally; numbers given as
+        # strings (or booleans) are rejected rather than failing later inside the pipeline
+        object.__setattr__(self, 'assets', tuple(str(asset) for asset in self.assets))
+        for name in ('risk_tolerance', 'time_horizon', 'return_expectations'):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, numbers.Real):
+                raise ValueError(f"{name} must be a number.")
+            object.__setattr__(self, name, float(value))
+
+        if not self.assets:
+            raise ValueError("assets must not be empty.")
+        if not 1 <= self.risk_tolerance <= 10:
+            raise ValueError("risk_tolerance must be between 1 and 10.")
+        if not (self.time_horizon > 0 and self.time_step > 0):
+            raise ValueError("time_horizon and time_step must be positive.")
+        if self.covariance_estimator not in COVARIANCE_ESTIMATORS:
+            raise ValueError(f"covariance_estimator must be one of {list(COVARIANCE_ESTIMATORS)}.")
+        if self.rebalancing_frequency not in ('Quarterly', 'Yearly'):
+            raise ValueError("rebalancing_frequency must be either 'Quarterly' or 'Yearly'.")
+        if self.objective not in ('variance', 'cvar'):
+            raise ValueError("objective must be either 'variance' or 'cvar'.")
+        if self.sampling not in ('pseudo', 'qmc'):
+            raise ValueError("sampling must be either 'pseudo' or 'qmc'.")
+        if self.precision not in ('double', 'mixed'):
+            raise ValueError("precision must be either 'double' or 'mixed'.")
+        if self.model not in ('gbm', 'merton', 'heston', 'regime_switching'):
+            raise ValueError("model must be one of 'gbm', 'merton', 'heston' or 'regime_switching'.")
+        if self.model != 'gbm' and self.sampling != 'pseudo':
+            raise ValueError("sampling='qmc' is only supported by the 'gbm' model.")
+
+    def replace(self, **changes):
+        """
+        Return a copy of the configuration with some settings changed
+        """
+        return replace(self, **changes)
@@ -0,0 +1,125 @@
+'''
+Purpose: CVaR optimization over historical or simulated scenarios (Rockafellar-Uryasev linear program)
+'''
+
+import warnings
+import numpy as np
+
+def scenario_returns(scenarios):
+    """
+    Return the scenario return matrix (n_scenarios x n_assets)
+
+    Args:
+    - scenarios: either a return matrix (e.g. the `get_return` DataFrame, one scenario per day),
+      or simulated prices from `simulate_portfolio` with shape (n_simulations, n_steps, n_assets),
+      in which case each path contributes its return over the whole horizon
+    """
+    scenarios = np.asarray(scenarios)
+
+    if scenarios.ndim == 3:
+        # Only the first and last steps are upcast (float32 paths stay float32), the LP works in float64
+        return scenarios[:, -1, :].astype(float) / scenarios[:, 0, :] - 1
+
+    return scenarios.astype(float, copy=False)
+
+def portfolio_cvar(weights, scenarios, alpha=0.95):
+    """
+    Return the historical VaR and CVaR (expected shortfall) of a portfolio, as positive losses
+
+    Args:
+    - weights: portfolio weights
+    - scenarios: return matrix or simulated prices (see scenario_returns)
+    - alpha: confidence level
+    """
+    losses = -scenario_returns(scenarios) @ np.asarray(weights, dtype=float)
+    value_at_risk = np.quantile(losses, alpha)
+    return value_at_risk, value_at_risk + np.mean(np.maximum(losses - value_at_risk, 0)) / (1 - alpha)
+
+def _solve_scenario_lp(R, scenario_index, alpha, n_scenarios, mean_returns, target_return, bounds):
+    """
+    Solve the Rockafellar-Uryasev LP restricted to a subset of scenarios.
+
+    Scenarios left out are assumed to be outside the tail (u_s = 0), so the result is a lower
+    bound of the full problem, and exact once no left-out scenario exceeds the optimal zeta.
+    """
+    from scipy import sparse
+    from scipy.optimize import linprog
+
+    num_assets = R.shape[1]
+    n_subset = len(scenario_index)
+
+    # Variables: [w (num_assets), zeta (1), u (n_subset)]; u keeps the full-sample weight 1 / ((1 - alpha) S)
+    cost = np.concatenate([np.zeros(num_assets), [1.0], np.full(n_subset, 1 / ((1 - alpha) * n_scenarios))])
+
+    # Sparse [-R_K | -1 | -I] block: the dense S x (n + 1 + S) matrix is never formed
+    A_ub = sparse.hstack([sparse.csr_matrix(-R[scenario_index]), sparse.csr_matrix(-np.ones((n_subset, 1))),
+                          -sparse.identity(n_subset, format='csr')], format='csr')
+    b_ub = np.zeros(n_subset)
+
+    if target_return is not None:
+        target_row = sparse.csr_matrix(np.concatenate([-mean_returns, np.zeros(1 + n_subset)])[None, :])
+        A_ub = sparse.vstack([A_ub, target_row], format='csr')
+        b_ub = np.append(b_ub, -target_return)
+
+    A_eq = sparse.csr_matrix(np.concatenate([np.ones(num_assets), np.zeros(1 + n_subset)])[None, :])
+
+    result = linprog(cost, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=[1.0],
+                     bounds=bounds + [(None, None)] + [(0, None)] * n_subset, method='highs-ipm')
+
+    if result.status != 0:
+        raise ValueError(f"CVaR optimization failed: {result.message}")
+
+    return result.x[:num_assets], result.x[num_assets], result.fun
+
+def optimize_cvar(scenarios, alpha=0.95, target_return=None, lower_bounds=0.0, upper_bounds=1.0, max_rounds=50):
+    """
+    Minimize portfolio CVaR over scenarios with the Rockafellar-Uryasev linear program.
+
+        minimize    zeta + 1 / ((1 - alpha) S) * sum(u)
+        subject to  u_s >= -r_s' w - zeta,  u_s >= 0,  sum(w) = 1,  mean(r)' w >= target_return
+
+    Only tail scenarios have u_s > 0 at the optimum, so the LP is solved by constraint generation:
+    start from the tail of the equal-weight portfolio, solve the restricted LP with HiGHS' interior point
+    method (sparse constraint blocks), then add every scenario whose loss exceeds the optimal zeta until none does.
+    The result is exact, and each LP only holds a few times (1 - alpha) * S scenarios.
+
+    Args:
+    - scenarios: return matrix (e.g. `get_return` output) or simulated prices from `simulate_portfolio`
+    - alpha: confidence level of the CVaR
+    - target_return (float, optional): minimum expected scenario return
+    - lower_bounds, upper_bounds: per-asset weight bounds (scalars or arrays)
+    - max_rounds: limit on constraint-generation rounds; if scenarios still violate after the last round,
+      a RuntimeWarning is issued and the LP is solved over every scenario instead
+
+    Returns:
+    - weights: optimal portfolio weights
+    - (portfolio_return, portfolio_cvar): mean scenario return and optimal CVaR (positive loss)
+    """
+    R = scenario_returns(scenarios)
+    n_scenarios, num_assets = R.shape
+    mean_returns = R.mean(axis=0)
+
+    lower = np.broadcast_to(np.asarray(lower_bounds, dtype=float), num_assets)
+    upper = np.broadcast_to(np.asarray(upper_bounds, dtype=float), num_assets)
+    bounds = list(zip(lower, upper))
+
+    # Initial working set: the tail of the equal-weight portfolio, with a 50% margin
+    losses = -R @ np.full(num_assets, 1 / num_assets)
+    scenario_index = np.flatnonzero(losses >= np.quantile(losses, max(0.0, 1 - 1.5 * (1 - alpha))))
+
+    for _ in range(max_rounds):
+        weights, zeta, portfolio_cvar = _solve_scenario_lp(R, scenario_index, alpha, n_scenarios, mean_returns, target_return, bounds)
+
+        # Scenarios outside the working set whose loss exceeds zeta violate u_s = 0
+        violated = np.setdiff1d(np.flatnonzero(-R @ weights > zeta + 1e-12), scenario_index, assume_unique=True)
+        if len(violated) == 0:
+            break
+
+        scenario_index = np.union1d(scenario_index, violated)
+    else:
+        # The restricted LP is only a lower bound while scenarios violate: fall back to the exact full LP
+        warnings.warn(f"CVaR constraint generation did not converge in {max_rounds} rounds; solving over all {n_scenarios} scenarios.",
+                      RuntimeWarning)
+        weights, _, portfolio_cvar = _solve_scenario_lp(R, np.arange(n_scenarios), alpha, n_scenarios, mean_returns, target_return, bounds)
+
+    return weights, (float(mean_returns @ weights), float(portfolio_cvar))
@@ -3,36 +3,351 @@ Purpose: Fetches and processes historical data, calculates returns, volatility,
 
 '''
 
-import yfinance as yf
-import pandas as pd
 import numpy as np
 import os
+from typing import NamedTuple
+
+def fetch_data(assets, end_date='2025-01-01', universe=None):
+    from config import DATA_BACKEND
 
-def fetch_data(assets, end_date='2025-01-01'):
     data_folder_path = 'data'
+    backend = os.environ.get('SDE_DATA_BACKEND', DATA_BACKEND)
+
+    if backend == 'synthetic':
+        # Offline deterministic prices (tests, benchmarks, load tests); the cached real prices are left alone
+        from synthetic_market import synthetic_prices
+        data = synthetic_prices(list(assets), start="2010-01-01", end=end_date)
+    elif backend == 'yahoo':
+        # Network client is imported lazily; it is only needed when data is actually downloaded
+        import yfinance as yf
+
+        # Download historical adjusted close prices from yfinace
+        data = yf.download(assets, start="2010-01-01", end=end_date, threads=5, auto_adjust=False)['Adj Close'] # Todo: Change end date
+        data.to_csv(os.path.join(data_folder_path, 'raw_data.csv'))
+    else:
+        raise ValueError(f"Unknown data backend {backend!r}; use 'yahoo' or 'synthetic'.")
+
+    # Optionally publish the prices to the shared memory-mapped store
+    if universe is not None:
+        from price_store import write_price_store
+        write_price_store(data, universe)
 
-    # Download historical adjusted close prices from yfinace
-    data = yf.download(assets, start="2010-01-01", end=end_date, threads=5, auto_adjust=False)['Adj Close'] # Todo: Change end date
-    data.to_csv(os.path.join(data_folder_path, 'raw_data.csv'))
     return data
 
-def get_return(raw_data):
+def load_prices(universe, tickers=None, start=None, end=None, store_path=None):
+    """
+    Return cached prices from the shared memory-mapped store as a DataFrame of zero-copy views
+    
+    Args:
+    - universe: name of the universe in the store
+    - tickers: optional subset of tickers (a contiguous run of columns stays zero-copy)
+    - start, end: optional inclusive date range (ISO strings)
+    - store_path: store directory (defaults to config.DATA_STORE_PATH)
+    """
+    from price_store import open_price_store
+    from config import DATA_STORE_PATH
+
+    return open_price_store(universe, store_path or DATA_STORE_PATH).frame(tickers, start, end)
+
+def asset_prices(assets, universe=None):
+    """
+    Return the prices of the assets for a request: mapped from the shared price store when a universe
+    is given or configured (config.PRICE_UNIVERSE, or the SDE_PRICE_UNIVERSE environment variable),
+    so every worker reads the same pages instead of holding its own copy; downloaded with fetch_data otherwise.
+    """
+    from config import PRICE_UNIVERSE
+
+    universe = universe or os.environ.get('SDE_PRICE_UNIVERSE', PRICE_UNIVERSE)
+    if universe:
+        return load_prices(universe, tickers=list(assets))
+
+    return fetch_data(assets)
+
+def get_return(raw_data, complete=True):
     """
     Return calculated daily returns
     
     Args:
     - raw_data: A historical adjusted close prices
+    - complete: keep only the days on which every asset has a return, so the panel starts at the youngest
+      listing; False keeps every day on which any asset has one (NaN elsewhere), for pairwise estimation
     """
-    return raw_data.pct_change(fill_method=None).dropna()
+    returns = raw_data.pct_change(fill_method=None)
+    return returns.dropna() if complete else returns.dropna(how='all')
 
-def get_correlation_matrix(returns):
+def get_correlation_matrix(returns, method='sample', **kwargs):
     """
     Return correlation matrix of the returns
     
     Args:
     - returns: daily returns for each assets
+    - method: covariance estimator to derive the correlation from (see COVARIANCE_ESTIMATORS)
+    - kwargs: extra arguments forwarded to the estimator
+
+    Returns:
+    - A DataFrame for dense estimators, or a FactorCovariance in correlation units for 'factor'
     """
-    return returns.corr()
+    if method == 'sample' and not np.isnan(np.asarray(returns, dtype=float)).any():
+        return returns.corr()
+
+    _, correlation_matrix = covariance_to_correlation(estimate_covariance(returns, method, **kwargs))
+
+    if isinstance(correlation_matrix, np.ndarray) and hasattr(returns, 'columns'):
+        correlation_matrix = type(returns)(correlation_matrix, index=returns.columns, columns=returns.columns)
+
+    return correlation_matrix
+
+
+class FactorCovariance(NamedTuple):
+    """
+    Low-rank-plus-diagonal covariance matrix B B^T + diag(d), kept in structured form.
+
+    Products with the matrix cost O(n*k) instead of O(n^2), so the optimizer and the
+    simulation never have to materialise the dense n x n matrix for large universes.
+
+    Fields:
+    - loadings: factor loadings B, shape (n_assets, n_factors)
+    - specific_variance: idiosyncratic variances d, shape (n_assets,)
+    """
+    loadings: np.ndarray
+    specific_variance: np.ndarray
+
+    @property
+    def shape(self):
+        n_assets = len(self.specific_variance)
+        return (n_assets, n_assets)
+
+    def dot(self, weights):
+        # Sigma @ w for a weights vector (n,) or a block of weight columns (n, m)
+        specific = self.specific_variance.reshape((-1,) + (1,) * (np.ndim(weights) - 1))
+        return self.loadings @ (self.loadings.T @ weights) + specific * weights
+
+    def variance(self, weights):
+        # w^T Sigma w without forming Sigma
+        factor_exposure = self.loadings.T @ weights
+        return float(factor_exposure @ factor_exposure + np.sum(self.specific_variance * weights**2))
+
+    def diagonal(self):
+        return np.sum(self.loadings**2, axis=1) + self.specific_variance
+
+    def scale(self, factor):
+        # diag(s) Sigma diag(s) for a scalar or per-asset scale s
+        factor = np.asarray(factor, dtype=float)
+        row_scale = factor[:, None] if factor.ndim else factor
+        return FactorCovariance(self.loadings * row_scale, self.specific_variance * factor**2)
+
+    def to_dense(self):
+        return self.loadings @ self.loadings.T + np.diag(self.specific_variance)
+
+
+def sample_covariance(returns):
+    """
+    Return the sample covariance matrix of the returns (pairwise, see pairwise_covariance, when some are missing)
+    
+    Args:
+    - returns: daily returns for each assets (T x n)
+    """
+    X = np.asarray(returns, dtype=float)
+    if np.isnan(X).any():
+        return pairwise_covariance(X)
+    return np.atleast_2d(np.cov(X, rowvar=False, ddof=1))
+
+def overlap_counts(returns):
+    """
+    Return the number of days on which both assets of each pair have a return (n x n; the diagonal is each asset's own count)
+    
+    Args:
+    - returns: daily returns for each assets (T x n), NaN where missing
+    """
+    observed = (~np.isnan(np.asarray(returns, dtype=float))).astype(float)
+    return observed.T @ observed
+
+def repair_psd(matrix, min_eigenvalue=1e-10):
+    """
+    Return the matrix made positive semi-definite by eigenvalue clipping, keeping its diagonal.
+
+    Eigenvalues below min_eigenvalue times the largest one are raised to that floor, then the
+    rows and columns are rescaled to restore the original variances.
+    
+    Args:
+    - matrix: symmetric covariance (or correlation) estimate
+    - min_eigenvalue: floor of the eigenvalues, relative to the largest one
+    """
+    matrix = (np.asarray(matrix, dtype=float) + np.asarray(matrix, dtype=float).T) / 2
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    floor = min_eigenvalue * max(eigenvalues[-1], 0.0)
+    if eigenvalues[0] >= floor:
+        return matrix
+
+    repaired = (eigenvectors * np.maximum(eigenvalues, floor)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(matrix) / np.diag(repaired))
+    return repaired * np.outer(scale, scale)
+
+def pairwise_covariance(returns, min_periods=2, repair=True):
+    """
+    Return the pairwise-complete sample covariance of returns with missing values.
+
+    Each pair uses every day on which both assets have a return, so a late listing only shortens its
+    own pairs instead of the whole panel. All pairs are computed at once from three matrix products
+    over the zero-filled returns and their observation mask. Pairs sharing fewer than min_periods days
+    are treated as uncorrelated, and since pairwise estimates need not be jointly PSD, the result
+    goes through repair_psd.
+    
+    Args:
+    - returns: daily returns for each assets (T x n), NaN where missing
+    - min_periods: minimum number of common days of a pair
+    - repair: make the estimate positive semi-definite
+    """
+    X = np.asarray(returns, dtype=float)
+    observed = ~np.isnan(X)
+    mask = observed.astype(float)
+
+    # Centering by each asset's own mean first keeps the products well conditioned
+    X = np.where(observed, X, 0.0)
+    X -= X.sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+    X *= mask
+
+    counts = mask.T @ mask
+    sums = X.T @ mask  # sums[i, j]: sum of asset i's returns on the days asset j has one too
+    cross = X.T @ X
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = (cross - sums * sums.T / counts) / (counts - 1)
+    covariance[counts < max(min_periods, 2)] = 0.0
+
+    return repair_psd(covariance) if repair else covariance
+
+def ledoit_wolf_covariance(returns):
+    """
+    Return the Ledoit-Wolf covariance estimate, shrunk towards a scaled identity matrix.
+
+    The shrinkage intensity is chosen analytically (Ledoit & Wolf, 2004), which keeps the
+    estimate well-conditioned even when the asset count approaches the history length.
+    
+    Args:
+    - returns: daily returns for each assets (T x n)
+    """
+    X = np.asarray(returns, dtype=float)
+    X = X - X.mean(axis=0)
+    n_samples, n_features = X.shape
+
+    emp_cov = X.T @ X / n_samples
+    mu = np.trace(emp_cov) / n_features
+
+    # beta: variance of the sample covariance entries, delta: distance to the target
+    X2 = X**2
+    beta = np.sum(np.sum(X2, axis=1)**2) / n_samples - np.sum(emp_cov**2)
+    beta /= n_features * n_samples
+    delta = (np.sum(emp_cov**2) - 2 * mu * np.trace(emp_cov) + n_features * mu**2) / n_features
+
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+
+    shrunk_cov = (1 - shrinkage) * emp_cov
+    shrunk_cov.flat[::n_features + 1] += shrinkage * mu
+    return shrunk_cov
+
+def ewma_covariance(returns, decay=0.94):
+    """
+    Return the exponentially weighted (RiskMetrics) covariance matrix of the returns
+    
+    Args:
+    - returns: daily returns for each assets (T x n), oldest observation first
+    - decay: weight decay per observation (0.94 is the RiskMetrics daily value)
+    """
+    X = np.asarray(returns, dtype=float)
+
+    weights = decay ** np.arange(len(X) - 1, -1, -1)
+    weights /= weights.sum()
+
+    X = X - weights @ X
+    return (X * weights[:, None]).T @ X
+
+def factor_covariance(returns, n_factors=5, n_iter=4, seed=0):
+    """
+    Return a statistical (PCA) factor model of the covariance in structured form.
+
+    The leading factors are found with a randomized truncated SVD, so fitting costs
+    O(T*n*k) and never forms the n x n sample covariance.
+    
+    Args:
+    - returns: daily returns for each assets (T x n)
+    - n_factors: number of statistical factors k
+    - n_iter: power iterations of the randomized SVD (more is more accurate)
+    - seed: seed of the random projection
+
+    Returns:
+    - FactorCovariance with B B^T + diag(d) matching the sample variances on the diagonal
+    """
+    X = np.asarray(returns, dtype=float)
+    X = X - X.mean(axis=0)
+    n_samples, n_features = X.shape
+    n_factors = min(n_factors, n_samples - 1, n_features)
+
+    # Randomized range finder (Halko, Martinsson & Tropp) with power iterations
+    rng = np.random.default_rng(seed)
+    Q, _ = np.linalg.qr(X @ rng.standard_normal((n_features, n_factors + 10)))
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(X.T @ Q)
+        Q, _ = np.linalg.qr(X @ Q)
+
+    _, singular_values, Vt = np.linalg.svd(Q.T @ X, full_matrices=False)
+    loadings = Vt[:n_factors].T * (singular_values[:n_factors] / np.sqrt(n_samples - 1))
+
+    # Idiosyncratic variance is whatever the factors leave unexplained (kept strictly positive)
+    total_variance = np.sum(X**2, axis=0) / (n_samples - 1)
+    specific_variance = np.maximum(total_variance - np.sum(loadings**2, axis=1), 1e-4 * total_variance + 1e-12)
+
+    return FactorCovariance(loadings, specific_variance)
+
+# Pluggable covariance estimators, selected by name
+COVARIANCE_ESTIMATORS = {
+    'sample': sample_covariance,
+    'pairwise': pairwise_covariance,
+    'ledoit_wolf': ledoit_wolf_covariance,
+    'ewma': ewma_covariance,
+    'factor': factor_covariance,
+}
+
+def estimate_covariance(returns, method='sample', **kwargs):
+    """
+    Return the covariance matrix of the returns using the named estimator
+    
+    Args:
+    - returns: daily returns for each assets (T x n)
+    - method: one of COVARIANCE_ESTIMATORS ('sample', 'pairwise', 'ledoit_wolf', 'ewma', 'factor')
+    - kwargs: extra arguments forwarded to the estimator
+    """
+    if method not in COVARIANCE_ESTIMATORS:
+        raise ValueError(f"Unknown covariance estimator '{method}', expected one of {list(COVARIANCE_ESTIMATORS)}.")
+
+    if method not in ('sample', 'pairwise'):
+        # The other estimators need complete observations: keep the days on which every asset has a return
+        complete = ~np.isnan(np.asarray(returns, dtype=float)).any(axis=1)
+        if not complete.all():
+            returns = returns[complete]
+
+    return COVARIANCE_ESTIMATORS[method](returns, **kwargs)
+
+def covariance_to_correlation(covariance):
+    """
+    Split a covariance matrix into volatilities and a correlation matrix
+    
+    Args:
+    - covariance: dense covariance array or FactorCovariance
+
+    Returns:
+    - sigma: standard deviation of each asset
+    - correlation_matrix: same representation as the input, in correlation units
+    """
+    if isinstance(covariance, FactorCovariance):
+        sigma = np.sqrt(covariance.diagonal())
+        return sigma, covariance.scale(1 / sigma)
+
+    covariance = np.asarray(covariance, dtype=float)
+    sigma = np.sqrt(np.diag(covariance))
+    correlation_matrix = covariance / np.outer(sigma, sigma)
+    np.fill_diagonal(correlation_matrix, 1.0)
+    return sigma, correlation_matrix
 
 def annualize_parameters(mu, sigma, trading_days_per_year):
     """
@@ -1,20 +1,82 @@
 '''
 Purpose: Function to plot the efficient frontier, showing the optimal portfolio risk-return trade-off.
+
+The resampled (Michaud) frontier treats mu and the covariance as estimates: the returns are
+bootstrapped, every resample gets its own frontier, and the weights of each frontier point are
+averaged. The resamples are processed in chunks: a chunk's bootstrap moments are count-weighted
+matrix products, and all its frontiers are solved together by qp_solver.solve_qp_batch.
 '''
-from matplotlib import pyplot as plt
 import numpy as np
-from portfolio_optimizer import optimize_portfolio
+from concurrent.futures import ProcessPoolExecutor
+from portfolio_optimizer import optimize_portfolio, build_covariance, build_portfolio_qp, portfolio_performance, solved_weights
+
+# Resamples solved together by one batched ADMM call of the resampled frontier
+RESAMPLE_CHUNK_SIZE = 32
+
+# Iterations of a batched frontier solve: the few points still unsolved by then (near the degenerate end points)
+# are solved one at a time instead of keeping the whole batch iterating
+BATCH_MAX_ITER = 1000
+
+def efficient_frontier_qp(mu_annualized, sigma_annualized, correlation_matrix, target_returns):
+    """
+    Trace the frontier with one ADMM solver: only the target-return row changes between points,
+    so the factorization is reused and every solve is warm-started from the previous point.
+
+    Returns:
+    - list of (optimal_weights, portfolio_volatility) for each target return
+
+    Raises:
+    - ValueError: a target return is outside [min mu, max mu] or a point did not converge
+    """
+    from qp_solver import ADMMSolver
 
-def plot_effifient_frontier(mu_annualized, sigma_annualized, correlation_matrix, risk_tolerance, plot=True):
+    num_assets = len(mu_annualized)
+    covariance = build_covariance(sigma_annualized, correlation_matrix)
+    P, q, A, l, u = build_portfolio_qp(mu_annualized, covariance, target_return=target_returns[0])
+    solver = ADMMSolver(P, q, A, l, u)
+
+    # The target-return row follows the asset bound rows and the budget row
+    target_row = num_assets + 1
+    frontier = []
+    for target in target_returns:
+        if target <= np.min(mu_annualized) or target >= np.max(mu_annualized):
+            # The end points are the single-asset portfolios (the only long-only portfolios with that return),
+            # where ADMM converges slowly if at all; targets beyond them are infeasible
+            if target < np.min(mu_annualized) or target > np.max(mu_annualized):
+                raise ValueError(f"Target return {target} is outside the range of the expected returns.")
+            optimal_weights = np.zeros(num_assets)
+            optimal_weights[np.argmin(mu_annualized) if target <= np.min(mu_annualized) else np.argmax(mu_annualized)] = 1.0
+        else:
+            l[target_row] = u[target_row] = target
+            solver.update(l=l, u=u)
+            optimal_weights = solved_weights(solver.solve(), num_assets)
+        _, portfolio_volatility = portfolio_performance(optimal_weights, mu_annualized, sigma_annualized, correlation_matrix, covariance=covariance)
+        frontier.append((optimal_weights, portfolio_volatility))
+
+    return frontier
+
+def plot_effifient_frontier(mu_annualized, sigma_annualized, correlation_matrix, risk_tolerance, plot=True, method='slsqp', return_weights=False, save_path=None):
     # Generate the Efficient Frontier
     target_returns = np.linspace(min(mu_annualized), max(mu_annualized), 100)
     portfolio_volatilities = []
+    frontier_weights = []
 
-    for target in target_returns:
-        optimal_weights, (expected_return, portfolio_volatility) = optimize_portfolio(mu_annualized, sigma_annualized, correlation_matrix, risk_tolerance, target_return=target)
-        portfolio_volatilities.append(portfolio_volatility)
+    if method == 'qp':
+        # Large universes: one reusable QP solver for the whole frontier
+        for optimal_weights, portfolio_volatility in efficient_frontier_qp(mu_annualized, sigma_annualized, correlation_matrix, target_returns):
+            frontier_weights.append(optimal_weights)
+            portfolio_volatilities.append(portfolio_volatility)
+
+    else:
+        for target in target_returns:
+            optimal_weights, (expected_return, portfolio_volatility) = optimize_portfolio(mu_annualized, sigma_annualized, correlation_matrix, risk_tolerance, target_return=target)
+            frontier_weights.append(optimal_weights)
+            portfolio_volatilities.append(portfolio_volatility)
     
     if(plot):
+        # Plotting backend is imported lazily so headless callers never pay for matplotlib
+        from matplotlib import pyplot as plt
+
         # Plot the Efficient Frontier
         plt.figure(figsize=(10, 6))
         plt.plot(portfolio_volatilities, target_returns, label="Efficient Frontier", color="b")
@@ -22,6 +84,168 @@ def plot_effifient_frontier(mu_annualized, sigma_annualized, correlation_matrix,
         plt.xlabel("Portfolio Volatility (Risk)")
         plt.ylabel("Portfolio Expected Return")
         plt.grid(True)
-        plt.show()
+        if save_path is None:
+            plt.show()
+        else:
+            # Headless runs write the figure to a file instead of opening a (blocking) window
+            plt.savefig(save_path)
+            plt.close()
+
+    if return_weights:
+        # Weights of every frontier point (points x assets), e.g. for risk annotation
+        return portfolio_volatilities, np.array(frontier_weights)
 
     return  portfolio_volatilities
+
+
+def bootstrap_counts(n_obs, n_resamples, seed=42):
+    """
+    Return how often each bootstrap resample draws each day, as weights (n_resamples x n_obs) summing to 1 per resample
+    """
+    draws = np.random.RandomState(seed).randint(n_obs, size=(n_resamples, n_obs))
+    counts = np.bincount((draws + n_obs * np.arange(n_resamples)[:, None]).ravel(), minlength=n_resamples * n_obs)
+    return counts.reshape(n_resamples, n_obs) / n_obs
+
+
+def resample_moments(returns, counts, periods_per_year=252):
+    """
+    Annualized mean and covariance of the resamples encoded by bootstrap_counts weights.
+
+    A resample's moments are count-weighted sums: its second moment is (R' diag(counts) R). All of them
+    come from one batched (resamples x n_assets x days) @ (days x n_assets) product, so memory grows
+    with the resamples passed in (a chunk) instead of a days x n_assets^2 tensor.
+
+    Returns:
+    - (mu, covariance) of shapes (n_resamples, n_assets) and (n_resamples, n_assets, n_assets)
+    """
+    R = np.asarray(returns, dtype=float)
+    n_obs, n_assets = R.shape
+
+    # Centre on the full-sample mean first so the second moments do not cancel catastrophically
+    centered = R - R.mean(axis=0)
+    means = counts @ centered
+    covariance = (centered.T[None] * counts[:, None, :]) @ centered - means[:, :, None] * means[:, None, :]
+    covariance *= n_obs / (n_obs - 1)
+
+    return (means + R.mean(axis=0)) * periods_per_year, covariance * periods_per_year
+
+
+def bootstrap_moments(returns, n_resamples=500, periods_per_year=252, seed=42):
+    """
+    Annualized mean and covariance of every bootstrap resample of the returns.
+
+    Args:
+    - returns: daily returns (T x n_assets)
+    - n_resamples: number of bootstrap resamples
+    - periods_per_year: annualization factor
+    - seed: seed of the resampling
+
+    Returns:
+    - (mu, covariance) of shapes (n_resamples, n_assets) and (n_resamples, n_assets, n_assets)
+    """
+    return resample_moments(returns, bootstrap_counts(len(returns), n_resamples, seed), periods_per_year)
+
+
+def batch_frontier_weights(mu, covariance, n_points, initial_weights=None):
+    """
+    Frontier weights (resamples x points x assets) of a batch of (mu, covariance) estimates, with
+    target returns spanning each estimate's own [min mu, max mu] like plot_effifient_frontier.
+
+    initial_weights (same shape as the result, optional) warm-starts every point, e.g. from a previous frontier.
+    Points the batched solve leaves inaccurate keep their weights projected onto the bounds; points it
+    leaves unsolved are solved again one at a time (portfolio_optimizer.solved_weights raises if that fails too).
+    """
+    from qp_solver import ADMMSolver, solve_qp_batch
+
+    n_resamples, n_assets = mu.shape
+    targets = np.linspace(mu.min(axis=1), mu.max(axis=1), n_points, axis=1)
+
+    # Rows per resample: asset bounds, budget and its own target-return row
+    A = np.concatenate([np.broadcast_to(np.eye(n_assets), (n_resamples, n_assets, n_assets)),
+                        np.ones((n_resamples, 1, n_assets)), mu[:, None, :]], axis=1)
+    l = np.zeros((n_resamples, n_points - 2, n_assets + 2))
+    u = np.ones_like(l)
+    l[:, :, n_assets] = 1.0
+    l[:, :, -1] = u[:, :, -1] = targets[:, 1:-1]
+
+    weights = np.zeros((n_resamples, n_points, n_assets))
+    x0 = None if initial_weights is None else np.asarray(initial_weights, dtype=float)[:, 1:-1]
+    result = solve_qp_batch(2 * covariance, np.zeros_like(mu), A, l, u, x0=x0, max_iter=BATCH_MAX_ITER)
+    weights[:, 1:-1] = np.where((result.status == 'solved_inaccurate')[..., None], result.z[..., :n_assets], result.x)
+
+    for b, k in zip(*np.nonzero(result.status == 'max_iter_reached')):
+        solver = ADMMSolver(2 * covariance[b], np.zeros(n_assets), A[b], l[b, k], u[b, k])
+        weights[b, k + 1] = solved_weights(solver.solve(x0=result.x[b, k]), n_assets)
+
+    # The end points are the single-asset portfolios: the only long-only portfolios with that return
+    weights[np.arange(n_resamples), 0, mu.argmin(axis=1)] = 1.0
+    weights[np.arange(n_resamples), -1, mu.argmax(axis=1)] = 1.0
+    return weights
+
+
+def _resampled_frontier_chunk(returns, counts, n_points, periods_per_year):
+    # Moments and frontiers of one chunk of resamples: only the chunk's covariances and KKT inverses are ever held
+    mu, covariance = resample_moments(returns, counts, periods_per_year)
+    return batch_frontier_weights(mu, covariance, n_points)
+
+
+def resampled_frontier(returns, n_resamples=500, n_points=100, periods_per_year=252, quantiles=(0.05, 0.5, 0.95),
+                       seed=42, max_workers=1, chunk_size=RESAMPLE_CHUNK_SIZE):
+    """
+    Michaud resampled efficient frontier with confidence bands.
+
+    Point i of every resampled frontier is the i-th of n_points target returns spread over that
+    resample's own mu range; the resampled weights of point i are their average. Every portfolio is
+    then evaluated with the full-sample mu and covariance, so the bands show how much estimation
+    error moves the frontier.
+
+    Args:
+    - returns: daily returns (T x n_assets), e.g. `get_return` output
+    - n_resamples: number of bootstrap resamples
+    - n_points: points per frontier (at least 3)
+    - periods_per_year: annualization factor
+    - quantiles: band quantiles
+    - seed: seed of the resampling
+    - max_workers: processes the chunks of resamples are split across (1 solves them in this process, None
+      uses one process per CPU)
+    - chunk_size: resamples whose moments and frontiers are built and solved together
+
+    Returns:
+    - dict of 'weights' (points x assets) and 'expected_returns', 'volatilities' (points) of the resampled
+      frontier, and 'return_bands', 'volatility_bands' (quantile -> points) and 'weight_bands'
+      (quantile -> points x assets) over the resampled frontiers
+    """
+    if n_points < 3 or n_resamples < 1:
+        raise ValueError("A resampled frontier needs at least 3 points and 1 resample.")
+
+    R = np.asarray(returns, dtype=float)
+    counts = bootstrap_counts(len(R), n_resamples, seed)
+
+    # Contiguous chunks of resamples, one batched solve each: memory is bounded by the chunk, not n_resamples
+    chunks = [counts[start:start + chunk_size] for start in range(0, n_resamples, chunk_size)]
+    if max_workers == 1 or len(chunks) == 1:
+        weights = np.concatenate([_resampled_frontier_chunk(R, chunk, n_points, periods_per_year) for chunk in chunks])
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(_resampled_frontier_chunk, [R] * len(chunks), chunks, [n_points] * len(chunks),
+                               [periods_per_year] * len(chunks))
+            weights = np.concatenate(list(results))
+
+    mu = R.mean(axis=0) * periods_per_year
+    covariance = np.cov(R, rowvar=False) * periods_per_year
+
+    def performance(w):
+        return w @ mu, np.sqrt(np.maximum(np.einsum('...i,ij,...j->...', w, covariance, w), 0))
+
+    resampled_weights = weights.mean(axis=0)
+    expected_returns, volatilities = performance(resampled_weights)
+    sample_returns, sample_volatilities = performance(weights)
+
+    return {
+        'weights': resampled_weights,
+        'expected_returns': expected_returns,
+        'volatilities': volatilities,
+        'return_bands': dict(zip(quantiles, np.quantile(sample_returns, quantiles, axis=0))),
+        'volatility_bands': dict(zip(quantiles, np.quantile(sample_volatilities, quantiles, axis=0))),
+        'weight_bands': dict(zip(quantiles, np.quantile(weights, quantiles, axis=0))),
+    }
@@ -0,0 +1,217 @@
+'''
+Purpose: Historical scenario generation (block bootstrap and filtered historical simulation)
+
+Instead of assuming GBM, scenarios resample the actual `get_return` history:
+- 'stationary': stationary bootstrap (Politis-Romano), blocks of geometric length with mean block_length
+- 'block': circular block bootstrap with fixed block_length
+- 'filtered': filtered historical simulation; returns are standardized by a per-asset GARCH(1,1)
+  volatility, the standardized residuals are resampled (stationary bootstrap) and rescaled by a
+  GARCH recursion started from today's volatility
+
+Each whole-day row of the history is resampled, so cross-asset dependence is kept. All paths of a
+batch are built from one index matrix and one fancy-index gather into the contiguous returns array.
+Large runs stream fixed-size chunks so memory stays bounded. Scenario prices have the
+(paths, steps, assets) shape of `simulate_portfolio` and feed the same valuation and VaR pipeline.
+'''
+
+import numpy as np
+from typing import NamedTuple
+
+from risk import historical_var, historical_cvar
+
+SCENARIO_METHODS = ('stationary', 'block', 'filtered')
+
+
+def bootstrap_indices(n_obs, n_paths, n_steps, block_length=10, method='stationary', random_state=None):
+    """
+    Return an (n_paths x n_steps) matrix of row indices into a history of n_obs days.
+
+    Blocks wrap around the end of the history (circular), so every day is equally likely.
+    """
+    random_state = np.random if random_state is None else random_state
+    steps = np.arange(n_steps)
+
+    if method == 'block':
+        new_block = np.zeros((n_paths, n_steps), dtype=bool)
+        new_block[:, ::block_length] = True
+    else:
+        new_block = random_state.random_sample((n_paths, n_steps)) < 1 / block_length
+        new_block[:, 0] = True
+
+    # Position of the latest block start at or before each step, and that block's random start day
+    block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    start_days = random_state.randint(n_obs, size=(n_paths, n_steps))
+    return (np.take_along_axis(start_days, block_start, axis=1) + steps - block_start) % n_obs
+
+
+class GarchModel(NamedTuple):
+    """
+    Per-asset GARCH(1,1) fit: sigma2_t = omega + alpha * e_{t-1}^2 + beta * sigma2_{t-1}, e_t = r_t - mean.
+
+    Fields (arrays with one value per asset unless noted):
+    - omega, alpha, beta, mean: model parameters
+    - variances: (T x n) fitted conditional variances
+    - residuals: (T x n) standardized residuals e_t / sigma_t
+    - next_variance: variance forecast for the day after the sample
+    """
+    omega: np.ndarray
+    alpha: np.ndarray
+    beta: np.ndarray
+    mean: np.ndarray
+    variances: np.ndarray
+    residuals: np.ndarray
+    next_variance: np.ndarray
+
+
+def _garch_variances(errors, omega, alpha, beta, initial_variance):
+    # Conditional variances of one asset through the linear filter y_t = x_t + beta * y_{t-1}
+    from scipy.signal import lfilter
+
+    variances = np.empty_like(errors)
+    variances[0] = initial_variance
+    variances[1:] = lfilter([1.0], [1.0, -beta], omega + alpha * errors[:-1]**2, zi=[beta * initial_variance])[0]
+    return variances
+
+
+def fit_garch(returns):
+    """
+    Fit a GARCH(1,1) model to each asset by Gaussian maximum likelihood with variance targeting.
+
+    Args:
+    - returns: daily returns (T x n_assets), e.g. `get_return` output
+
+    Returns:
+    - GarchModel
+    """
+    from scipy.optimize import minimize
+
+    R = np.asarray(returns, dtype=float)
+    mean = R.mean(axis=0)
+    errors = R - mean
+    sample_variance = errors.var(axis=0)
+
+    parameters = np.empty((R.shape[1], 3))
+    variances = np.empty_like(R)
+    for i in range(R.shape[1]):
+        def negative_log_likelihood(x, e=errors[:, i], s2=sample_variance[i]):
+            # Persistence/share parametrization keeps alpha + beta < 1 with box bounds only
+            persistence, share = x
+            alpha, beta = share * persistence, (1 - share) * persistence
+            variances_i = _garch_variances(e, s2 * (1 - persistence), alpha, beta, s2)
+            return 0.5 * np.sum(np.log(variances_i) + e**2 / variances_i)
+
+        result = minimize(negative_log_likelihood, x0=[0.9, 0.1], bounds=[(0.0, 0.999), (0.0, 1.0)], method='L-BFGS-B')
+        persistence, share = result.x
+        alpha, beta = share * persistence, (1 - share) * persistence
+        omega = sample_variance[i] * (1 - persistence)
+
+        parameters[i] = omega, alpha, beta
+        variances[:, i] = _garch_variances(errors[:, i], omega, alpha, beta, sample_variance[i])
+
+    omega, alpha, beta = parameters.T
+    next_variance = omega + alpha * errors[-1]**2 + beta * variances[-1]
+    return GarchModel(omega, alpha, beta, mean, variances, errors / np.sqrt(variances), next_variance)
+
+
+def bootstrap_returns(returns, n_paths, n_steps, method='stationary', block_length=10, random_state=None, garch=None):
+    """
+    Generate scenario returns by resampling the history.
+
+    Args:
+    - returns: daily returns (T x n_assets), e.g. `get_return` output
+    - n_paths: number of scenario paths
+    - n_steps: number of daily returns per path
+    - method: 'stationary', 'block' or 'filtered' (see module docstring)
+    - block_length: (mean) block length in days; 1 is the plain iid bootstrap
+    - random_state (optional): np.random.RandomState to draw from
+    - garch (optional): GarchModel for 'filtered', fitted once by the caller (fitted here if None)
+
+    Returns:
+    - Scenario returns, shape (n_paths, n_steps, n_assets)
+    """
+    if method not in SCENARIO_METHODS:
+        raise ValueError(f"method must be one of {list(SCENARIO_METHODS)}.")
+
+    random_state = np.random.RandomState(42) if random_state is None else random_state
+
+    if method != 'filtered':
+        R = np.ascontiguousarray(returns, dtype=float)
+        return R[bootstrap_indices(len(R), n_paths, n_steps, block_length, method, random_state)]
+
+    garch = fit_garch(returns) if garch is None else garch
+    residuals = np.ascontiguousarray(garch.residuals)
+    shocks = residuals[bootstrap_indices(len(residuals), n_paths, n_steps, block_length, 'stationary', random_state)]
+
+    # Rescale the resampled shocks by a GARCH recursion started from the next-day forecast
+    variance = np.broadcast_to(garch.next_variance, (n_paths, len(garch.next_variance))).copy()
+    for t in range(n_steps):
+        shocks[:, t] *= np.sqrt(variance)
+        variance = garch.omega + garch.alpha * shocks[:, t]**2 + garch.beta * variance
+    return shocks + garch.mean
+
+
+def scenario_prices(scenario_returns, initial_asset_prices):
+    """
+    Compound scenario returns into prices shaped like `simulate_portfolio` output (first step = initial prices)
+    """
+    n_paths, n_steps, n_assets = scenario_returns.shape
+    prices = np.empty((n_paths, n_steps + 1, n_assets))
+    prices[:, 0] = initial_asset_prices
+    np.cumprod(1 + scenario_returns, axis=1, out=prices[:, 1:])
+    prices[:, 1:] *= np.asarray(initial_asset_prices, dtype=float)
+    return prices
+
+
+def stream_scenarios(returns, initial_asset_prices, n_paths, n_steps=252, method='stationary', block_length=10,
+                     chunk_size=10000, seed=42):
+    """
+    Yield scenario price chunks of at most chunk_size paths, so memory stays bounded for any n_paths.
+
+    Args:
+    - returns, method, block_length: as for bootstrap_returns
+    - initial_asset_prices: prices at the start of every path
+    - n_paths: total number of paths
+    - n_steps: steps per path including the initial prices (as simulate_portfolio)
+    - chunk_size: paths per chunk
+    - seed: seed of the scenario generator (the chunks of one seed are reproducible)
+
+    Yields:
+    - Prices of shape (chunk paths, n_steps, n_assets)
+    """
+    random_state = np.random.RandomState(seed)
+    garch = fit_garch(returns) if method == 'filtered' else None
+
+    for start in range(0, n_paths, chunk_size):
+        chunk_returns = bootstrap_returns(returns, min(chunk_size, n_paths - start), n_steps - 1, method, block_length, random_state, garch)
+        yield scenario_prices(chunk_returns, initial_asset_prices)
+
+
+def scenario_var(weights, returns, initial_asset_prices=None, n_paths=100000, n_steps=252, alpha=0.95, method='stationary',
+                 block_length=10, chunk_size=10000, seed=42):
+    """
+    Historical-scenario VaR and CVaR of a portfolio over the horizon, streaming the scenarios in chunks.
+
+    Only the terminal portfolio return of each path is kept, then the same quantile estimators as
+    risk.risk_metrics are applied.
+
+    Args:
+    - weights: portfolio weights
+    - returns: daily returns (T x n_assets), e.g. `get_return` output
+    - initial_asset_prices (optional): starting prices (all 1 by default, weights are then value weights)
+    - n_paths, n_steps, method, block_length, chunk_size, seed: as for stream_scenarios
+    - alpha: confidence level
+
+    Returns:
+    - (VaR, CVaR) of the horizon return (negative values are losses)
+    """
+    weights = np.asarray(weights, dtype=float)
+    initial_asset_prices = np.ones(len(weights)) if initial_asset_prices is None else np.asarray(initial_asset_prices, dtype=float)
+
+    # Holdings that put the weights on the initial prices
+    holdings = weights / initial_asset_prices
+    terminal_returns = np.concatenate([
+        prices[:, -1] @ holdings - 1
+        for prices in stream_scenarios(returns, initial_asset_prices, n_paths, n_steps, method, block_length, chunk_size, seed)
+    ])
+
+    return float(historical_var(terminal_returns, alpha)), float(historical_cvar(terminal_returns, alpha))
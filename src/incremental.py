@@ -0,0 +1,312 @@
+'''
+Purpose: Incremental statistics and warm-started re-optimization for interactive sessions
+
+Adding one ticker or one trading day changes the estimates only a little, so nothing is recomputed
+from scratch:
+- a new day is a rank-one update of the mean, the scatter matrix and its Cholesky factor (O(n^2))
+- a new ticker borders the scatter matrix with one cross-moment column (O(T*n)) and extends the
+  Cholesky factor by one row; removing one drops its row and column and folds its factor column into
+  the rows after it (one rank-one update)
+- the session keeps the last optimal weights and frontier, and the next solve starts from them
+  (a new asset enters with weight 0)
+
+Sessions live in an in-process cache keyed by session id (least recently used ones are evicted).
+'''
+
+from collections import OrderedDict
+import numpy as np
+
+from efficient_frontier import batch_frontier_weights
+from portfolio_optimizer import build_covariance, optimize_portfolio
+
+# Sessions kept in memory before the least recently used one is dropped
+MAX_SESSIONS = 64
+
+_sessions = OrderedDict()
+
+
+def cholesky_update(L, x):
+    """
+    Return the lower Cholesky factor of L L' + x x' in O(n^2)
+    """
+    L = np.array(L, dtype=float)
+    x = np.array(x, dtype=float)
+    for k in range(len(x)):
+        r = np.hypot(L[k, k], x[k])
+        c, s = r / L[k, k], x[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1:, k] = (L[k + 1:, k] + s * x[k + 1:]) / c
+        x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+    return L
+
+
+class IncrementalMoments:
+    """
+    Running mean, covariance and Cholesky factor of a returns history that grows by days and assets.
+
+    Args:
+    - returns: initial daily returns (T x n_assets), without missing values
+    - periods_per_year: annualization factor
+    """
+
+    def __init__(self, returns, periods_per_year=252):
+        from scipy.linalg import cholesky
+
+        R = np.array(returns, dtype=float)
+        self.periods_per_year = periods_per_year
+        self.n_obs = len(R)
+        self.mean = R.mean(axis=0)
+        centered = R - self.mean
+        self.scatter = centered.T @ centered
+
+        # Ridge-free factor of the scatter matrix (sum of squared deviations)
+        self.cholesky = cholesky(self.scatter, lower=True)
+
+        # History with spare capacity, so appends do not copy it every day
+        self._returns = np.empty((max(2 * self.n_obs, 16), R.shape[1]))
+        self._returns[:self.n_obs] = R
+
+    @property
+    def returns(self):
+        return self._returns[:self.n_obs]
+
+    def append(self, returns_row):
+        """
+        Add one day of returns (one value per asset) with a rank-one update
+        """
+        x = np.asarray(returns_row, dtype=float)
+        if np.isnan(x).any():
+            raise ValueError("A new day must have a return for every asset.")
+
+        # Welford: scatter += (n / (n + 1)) d d' with d the deviation from the old mean
+        deviation = x - self.mean
+        self.n_obs += 1
+        self.mean = self.mean + deviation / self.n_obs
+        update = np.sqrt((self.n_obs - 1) / self.n_obs) * deviation
+        self.scatter += np.outer(update, update)
+        self.cholesky = cholesky_update(self.cholesky, update)
+
+        if self.n_obs > len(self._returns):
+            grown = np.empty((2 * len(self._returns), self._returns.shape[1]))
+            grown[:self.n_obs - 1] = self._returns[:self.n_obs - 1]
+            self._returns = grown
+        self._returns[self.n_obs - 1] = x
+
+    def add_asset(self, returns_column):
+        """
+        Add one asset, given its returns over the same days, by bordering the scatter matrix and its Cholesky factor.
+
+        A younger asset may miss the first days (NaN): its variance and covariances are then estimated
+        pairwise over the days it shares with each asset (as pairwise_covariance), and scaled to the
+        session's history length, instead of cutting the history of every other asset.
+        """
+        from scipy.linalg import solve_triangular
+
+        column = np.asarray(returns_column, dtype=float)
+        observed = ~np.isnan(column)
+        if column.shape != (self.n_obs,) or observed.sum() < 2:
+            raise ValueError("A new asset needs returns on at least two days of the history.")
+
+        # Pairwise-complete moments over the new asset's days (the full history when it has every day)
+        n_observed = observed.sum()
+        new_mean = column[observed].mean()
+        centered = column[observed] - new_mean
+        variance = centered @ centered * (self.n_obs - 1) / (n_observed - 1)
+
+        # Each cross-moment over the days both assets have: a young asset added earlier misses days too
+        history = self.returns
+        both = observed[:, None] & ~np.isnan(history)
+        counts = both.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            history_deviation = np.where(both, history - np.where(both, history, 0.0).sum(axis=0) / counts, 0.0)
+            column_deviation = np.where(both, column[:, None] - (both * np.where(observed, column, 0.0)[:, None]).sum(axis=0) / counts, 0.0)
+            cross = (history_deviation * column_deviation).sum(axis=0) * (self.n_obs - 1) / (counts - 1)
+        cross[counts < 2] = 0.0
+
+        # [[L, 0], [l', d]] with L l = cross and d^2 = variance - l'l
+        border = solve_triangular(self.cholesky, cross, lower=True)
+        if border @ border > (1 - 1e-8) * variance:
+            # Pairwise covariances need not be consistent with the rest: shrink them until the matrix stays PSD
+            shrink = np.sqrt((1 - 1e-8) * variance / (border @ border))
+            border, cross = border * shrink, cross * shrink
+        diagonal = np.sqrt(variance - border @ border)
+
+        n_assets = len(self.mean)
+        cholesky = np.zeros((n_assets + 1, n_assets + 1))
+        cholesky[:n_assets, :n_assets] = self.cholesky
+        cholesky[n_assets, :n_assets] = border
+        cholesky[n_assets, n_assets] = diagonal
+        self.cholesky = cholesky
+
+        self.scatter = np.block([[self.scatter, cross[:, None]], [cross[None, :], np.array([[variance]])]])
+        self.mean = np.append(self.mean, new_mean)
+        self._returns = np.column_stack([self._returns, np.zeros(len(self._returns))])
+        self._returns[:self.n_obs, -1] = column
+
+    def remove_asset(self, index):
+        """
+        Drop the asset in column `index`: its row and column leave the scatter matrix, and the factor rows
+        after it absorb its column with one rank-one update (O(n^2), no re-factorization)
+        """
+        n_assets = len(self.mean)
+        if not 0 <= index < n_assets or n_assets < 2:
+            raise ValueError("Can only remove one of the assets, and at least one must remain.")
+
+        # Deleting row k of L leaves [[L11, 0, 0], [L31, l, L33]]; L33 L33' + l l' is the new trailing block
+        keep = np.arange(n_assets) != index
+        trailing = cholesky_update(self.cholesky[index + 1:, index + 1:], self.cholesky[index + 1:, index])
+        cholesky = self.cholesky[np.ix_(keep, keep)]
+        cholesky[index:, index:] = trailing
+        self.cholesky = cholesky
+
+        self.scatter = self.scatter[np.ix_(keep, keep)]
+        self.mean = self.mean[keep]
+        self._returns = self._returns[:, keep]
+
+    @property
+    def covariance(self):
+        # Sample covariance of daily returns
+        return self.scatter / (self.n_obs - 1)
+
+    @property
+    def mu_annualized(self):
+        return self.mean * self.periods_per_year
+
+    @property
+    def sigma_annualized(self):
+        return np.sqrt(np.diag(self.covariance) * self.periods_per_year)
+
+    @property
+    def correlation_matrix(self):
+        std = np.sqrt(np.diag(self.scatter))
+        return self.scatter / np.outer(std, std)
+
+
+class PortfolioSession:
+    """
+    Interactive optimization state: the incremental estimates plus the last solutions to warm-start from.
+
+    Args:
+    - assets: tickers of the columns of returns
+    - returns: daily returns (DataFrame with a date index, or T x n_assets array)
+    """
+
+    def __init__(self, assets, returns):
+        self.assets = list(assets)
+        self.index = getattr(returns, 'index', None)
+        self.moments = IncrementalMoments(returns)
+        self.weights = None
+        self.frontier_weights = None
+
+    def add_asset(self, asset, returns_column):
+        """
+        Add a ticker ("what if I add X"); a Series is aligned to the session's dates first
+        """
+        if self.index is not None and hasattr(returns_column, 'reindex'):
+            returns_column = returns_column.reindex(self.index)
+        self.moments.add_asset(returns_column)
+        self.assets.append(asset)
+
+        # The new asset starts from zero weight in every cached solution
+        if self.weights is not None:
+            self.weights = np.append(self.weights, 0.0)
+        if self.frontier_weights is not None:
+            self.frontier_weights = np.column_stack([self.frontier_weights, np.zeros(len(self.frontier_weights))])
+
+    def remove_asset(self, asset):
+        """
+        Remove a ticker ("what if I drop X"); the cached solutions are renormalized over the remaining assets
+        """
+        if asset not in self.assets:
+            raise ValueError(f"{asset} is not in the session.")
+        position = self.assets.index(asset)
+        self.moments.remove_asset(position)
+        del self.assets[position]
+
+        # A solution fully invested in the removed asset restarts from equal weights
+        def renormalize(weights):
+            weights = np.delete(weights, position, axis=-1)
+            totals = weights.sum(axis=-1, keepdims=True)
+            return np.where(totals > 0, weights / np.where(totals > 0, totals, 1), 1 / weights.shape[-1])
+
+        if self.weights is not None:
+            self.weights = renormalize(self.weights)
+        if self.frontier_weights is not None:
+            self.frontier_weights = renormalize(self.frontier_weights)
+
+    def append_day(self, returns_row, date=None):
+        """
+        Add the newest trading day of returns (one value per asset, in session order); a session with dated
+        returns needs its date, later than the last one
+        """
+        if self.index is not None and (date is None or (len(self.index) and date <= self.index[-1])):
+            raise ValueError("A new day needs a date after the last day of the session.")
+        self.moments.append(returns_row)
+        if self.index is not None:
+            self.index = self.index.append(type(self.index)([date]))
+
+    def update(self, returns):
+        """
+        Append the days of `returns` (DataFrame with the session's assets as columns) after the session's last day
+
+        Returns:
+        - number of days appended
+        """
+        if self.index is None:
+            raise ValueError("Only a session opened with dated returns can be updated from new prices.")
+        new_days = returns.loc[returns.index > self.index[-1], self.assets]
+        for date, row in zip(new_days.index, new_days.values):
+            self.append_day(row, date)
+        return len(new_days)
+
+    def optimize(self, risk_tolerance, target_return=None):
+        """
+        optimize_portfolio on the current estimates, warm-started from the previous solution
+
+        Returns:
+        - weights, (portfolio_return, portfolio_volatility)
+        """
+        m = self.moments
+        self.weights, performance = optimize_portfolio(m.mu_annualized, m.sigma_annualized, m.correlation_matrix, risk_tolerance,
+                                                       target_return, initial_weights=self.weights)
+        return self.weights, performance
+
+    def frontier(self, n_points=100):
+        """
+        Efficient frontier on the current estimates (at least 3 points), every point warm-started from the previous frontier
+
+        Returns:
+        - (target_returns, volatilities, frontier_weights)
+        """
+        m = self.moments
+        mu = m.mu_annualized
+        covariance = build_covariance(m.sigma_annualized, m.correlation_matrix)
+
+        warm_start = self.frontier_weights is not None and len(self.frontier_weights) == n_points
+        initial_weights = self.frontier_weights[None] if warm_start else None
+        self.frontier_weights = batch_frontier_weights(mu[None], covariance[None], n_points, initial_weights)[0]
+
+        volatilities = np.sqrt(np.maximum(np.einsum('pi,ij,pj->p', self.frontier_weights, covariance, self.frontier_weights), 0))
+        return np.linspace(mu.min(), mu.max(), n_points), volatilities, self.frontier_weights
+
+
+def get_session(session_id):
+    """
+    Return the cached session (None if unknown or evicted)
+    """
+    session = _sessions.get(session_id)
+    if session is not None:
+        _sessions.move_to_end(session_id)
+    return session
+
+
+def open_session(session_id, assets, returns):
+    """
+    Create (or replace) the cached session of session_id
+    """
+    session = PortfolioSession(assets, returns)
+    _sessions[session_id] = session
+    _sessions.move_to_end(session_id)
+    while len(_sessions) > MAX_SESSIONS:
+        _sessions.popitem(last=False)
+    return session
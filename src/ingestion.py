@@ -0,0 +1,238 @@
+'''
+Purpose: Bulk, concurrent ingestion of prices and option chains into the local store
+
+Large ticker lists are split into shards that are downloaded concurrently under a shared rate
+limiter. Transient failures are retried with exponential backoff, and per-ticker freshness
+(status, last date, fetch time, attempts) is recorded next to the prices, so a partial failure
+never blocks the rest of the universe. Providers are plain objects, so the pipeline can run
+against a local fake provider in tests.
+'''
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+
+from config import DATA_STORE_PATH
+from price_store import write_price_store, open_price_store, write_option_snapshot, OPTION_COLUMNS
+
+
+class YahooProvider:
+    """
+    Market data provider backed by yfinance.
+
+    Any object with the same two methods can be used as a provider:
+    - download_prices(tickers, start, end) -> DataFrame of adjusted close prices (dates x tickers)
+    - option_chain(ticker, max_expirations) -> DataFrame with the OPTION_COLUMNS of price_store
+    """
+
+    def download_prices(self, tickers, start, end):
+        import yfinance as yf
+
+        data = yf.download(list(tickers), start=start, end=end, auto_adjust=False, threads=False, progress=False)['Adj Close']
+        # A single ticker comes back as a Series
+        return data.to_frame(tickers[0]) if data.ndim == 1 else data
+
+    def option_chain(self, ticker, max_expirations=1):
+        import pandas as pd
+        import yfinance as yf
+
+        asset = yf.Ticker(ticker)
+        spot = asset.history(period="1d")['Close'].iloc[-1]
+
+        chains = []
+        for expiration in asset.options[:max_expirations]:
+            chain = asset.option_chain(expiration)
+            for option_type, contracts in (('call', chain.calls), ('put', chain.puts)):
+                chains.append(pd.DataFrame({
+                    'ticker': ticker,
+                    'expiration': expiration,
+                    'option_type': option_type,
+                    'strike': contracts['strike'],
+                    'bid': contracts['bid'],
+                    'ask': contracts['ask'],
+                    'last_price': contracts['lastPrice'],
+                    'implied_volatility': contracts['impliedVolatility'],
+                    'spot': spot,
+                }))
+
+        return pd.concat(chains, ignore_index=True) if chains else pd.DataFrame(columns=list(OPTION_COLUMNS))
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` requests per second on average, bursts up to `burst`.
+    """
+
+    def __init__(self, rate=2.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def call_with_retry(function, *args, retries=3, backoff=1.0, rate_limiter=None):
+    """
+    Call a function, retrying failures with exponential backoff (backoff, 2*backoff, 4*backoff, ...).
+
+    Returns:
+    - (result, attempts)
+
+    Raises:
+    - The last exception once all retries are exhausted
+    """
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return function(*args), attempt + 1
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+def _freshness_path(universe, store_path):
+    return os.path.join(store_path, f'{universe}.freshness.json')
+
+def load_freshness(universe, store_path=DATA_STORE_PATH):
+    """
+    Return the per-ticker freshness records of a universe ({} if it was never ingested)
+    """
+    path = _freshness_path(universe, store_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def ingest_prices(tickers, universe, provider=None, start='2010-01-01', end='2025-01-01', store_path=DATA_STORE_PATH,
+                  shard_size=100, max_workers=8, rate_limiter=None, retries=3, backoff=1.0):
+    """
+    Download prices for many tickers concurrently and write them to the price store.
+
+    Args:
+    - tickers: list of tickers
+    - universe: name of the universe in the store
+    - provider: market data provider (YahooProvider by default)
+    - start, end: date range of the download
+    - store_path: store directory
+    - shard_size: tickers per provider request
+    - max_workers: concurrent shard downloads
+    - rate_limiter: shared RateLimiter (2 requests/second by default)
+    - retries, backoff: retry policy for failed shards
+
+    Returns:
+    - Freshness records per ticker: {'status': 'ok' | 'empty' | 'failed', 'last_date', 'fetched_at', 'attempts', 'error'}
+    """
+    import pandas as pd
+
+    provider = provider or YahooProvider()
+    rate_limiter = rate_limiter or RateLimiter()
+    shards = [list(tickers[i:i + shard_size]) for i in range(0, len(tickers), shard_size)]
+
+    def fetch_shard(shard):
+        try:
+            prices, attempts = call_with_retry(provider.download_prices, shard, start, end,
+                                               retries=retries, backoff=backoff, rate_limiter=rate_limiter)
+            return shard, prices, attempts, None
+        except Exception as error:
+            return shard, None, retries + 1, f'{type(error).__name__}: {error}'
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(fetch_shard, shards))
+
+    freshness = load_freshness(universe, store_path)
+    frames = []
+    for shard, prices, attempts, error in results:
+        for ticker in shard:
+            if error is None and ticker in prices.columns and prices[ticker].notna().any():
+                series = prices[ticker].dropna()
+                freshness[ticker] = {'status': 'ok', 'last_date': str(series.index[-1])[:10], 'fetched_at': _now(),
+                                     'attempts': attempts, 'error': None}
+            else:
+                # Keep the last good date of a ticker that failed this time
+                previous = freshness.get(ticker, {})
+                freshness[ticker] = {'status': 'failed' if error else 'empty', 'last_date': previous.get('last_date'),
+                                     'fetched_at': _now(), 'attempts': attempts, 'error': error}
+
+        if prices is not None:
+            frames.append(prices[[ticker for ticker in shard if ticker in prices.columns]])
+
+    data = pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame()
+    data.index = pd.to_datetime(data.index)
+
+    # Merge into the existing universe: fresh values win, tickers that failed keep their history
+    if os.path.exists(os.path.join(store_path, f'{universe}.json')):
+        existing = open_price_store(universe, store_path).frame()
+        data = data.combine_first(existing)
+
+    ordered = [ticker for ticker in dict.fromkeys(list(tickers) + list(data.columns)) if ticker in data.columns]
+    write_price_store(data[ordered], universe, store_path)
+
+    with open(_freshness_path(universe, store_path) + '.tmp', 'w') as f:
+        json.dump(freshness, f, indent=1)
+    os.replace(_freshness_path(universe, store_path) + '.tmp', _freshness_path(universe, store_path))
+
+    return freshness
+
+
+def ingest_option_chains(tickers, provider=None, as_of=None, store_path=DATA_STORE_PATH, max_expirations=1,
+                         max_workers=8, rate_limiter=None, retries=3, backoff=1.0):
+    """
+    Snapshot the option chains of many tickers concurrently into one columnar file in the store.
+
+    Args:
+    - tickers: list of underlyings
+    - provider: market data provider (YahooProvider by default)
+    - as_of: snapshot timestamp (now, UTC, by default)
+    - max_expirations: number of expirations to capture per ticker
+    - store_path, max_workers, rate_limiter, retries, backoff: as for ingest_prices
+
+    Returns:
+    - (snapshot_path, errors): path of the snapshot file and {ticker: error} for tickers that failed
+    """
+    import pandas as pd
+
+    provider = provider or YahooProvider()
+    rate_limiter = rate_limiter or RateLimiter()
+    as_of = as_of or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def fetch_chain(ticker):
+        try:
+            chain, _ = call_with_retry(provider.option_chain, ticker, max_expirations,
+                                       retries=retries, backoff=backoff, rate_limiter=rate_limiter)
+            return ticker, chain, None
+        except Exception as error:
+            return ticker, None, f'{type(error).__name__}: {error}'
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(fetch_chain, tickers))
+
+    chains = [chain for _, chain, error in results if error is None and len(chain)]
+    errors = {ticker: error for ticker, _, error in results if error is not None}
+
+    snapshot = pd.concat(chains, ignore_index=True) if chains else {name: np.array([], dtype=dtype) for name, dtype in OPTION_COLUMNS.items()}
+    return write_option_snapshot(snapshot, as_of, store_path), errors
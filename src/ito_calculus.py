@@ -21,4 +21,34 @@ def gbm_sde(S0, mu, sigma, T, dt):
         dS = mu * S[t - 1] * dt + sigma * S[t - 1] * dW
         S[t] = S[t - 1] + dS
 
-    return S
\ No newline at end of file
+    return S
+
+def gbm_sde_paths(S0, mu, sigma, T, dt, n_paths=1000, sampling='pseudo', seed=42):
+    """
+    Euler scheme of gbm_sde for many paths at once.
+
+    S0, mu, sigma, T, dt: as for gbm_sde
+    n_paths: Number of simulated paths (a power of 2 for sampling='qmc')
+    sampling: 'pseudo' (pseudo-random increments) or 'qmc' (scrambled Sobol with Brownian bridge ordering)
+    seed: Seed of the path generator
+
+    Returns an array of shape (n_paths, int(T / dt)) whose first column is S0
+    """
+    num_steps = int(T / dt)
+    random_state = np.random.RandomState(seed)
+
+    if sampling == 'qmc':
+        from quasi_monte_carlo import sobol_normals
+        Z = sobol_normals(n_paths, num_steps - 1, 1, random_state)[:, :, 0]
+    elif sampling == 'pseudo':
+        Z = random_state.normal(0, 1, (n_paths, num_steps - 1))
+    else:
+        raise ValueError("sampling must be either 'pseudo' or 'qmc'.")
+
+    # S_t = S_{t-1} (1 + mu dt + sigma dW_t), accumulated as a product over all paths
+    growth = 1 + mu * dt + sigma * np.sqrt(dt) * Z
+    S = np.empty((n_paths, num_steps))
+    S[:, 0] = S0
+    S[:, 1:] = S0 * np.cumprod(growth, axis=1)
+
+    return S
@@ -0,0 +1,388 @@
+'''
+Purpose: Load test of the Flask API and its latency report
+
+The harness starts the API under a multi-process WSGI server against the synthetic data backend
+(SDE_DATA_BACKEND=synthetic, so no network access), then drives it with closed-loop virtual users:
+each user sends a request drawn from a weighted mix of profiles (small/large universes, short/long
+horizons), waits for the answer and sends the next one. Every concurrency level is reported with:
+- p50/p95/p99 latency, throughput and error rate, overall and per profile
+- resident and peak memory of every server worker
+
+The server is gunicorn when installed (requirements-serve.txt). Otherwise a pre-forking server is
+used: the parent imports the app once and forks workers that accept on one shared socket, as
+gunicorn's sync workers do, each serving with werkzeug's WSGI server.
+
+A report can be saved as the baseline and later runs compared against it, failing (exit code 1)
+when latency, throughput or error rate regress beyond the tolerance:
+    python src/load_test.py --users 50,100,200 --duration 60 --save-baseline
+    python src/load_test.py --users 50,100,200 --duration 60
+'''
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+# Request mix: name -> (weight, /optimize payload)
+REQUEST_PROFILES = {
+    'small': (0.6, {'assets': ['SYN0000', 'SYN0001', 'SYN0002'], 'risk_tolerance': 5, 'time_horizon': 1,
+                    'return_expectations': 0.06, 'rebalancing_frequency': 'Quarterly'}),
+    'medium': (0.3, {'assets': [f'SYN{i:04d}' for i in range(20)], 'risk_tolerance': 5, 'time_horizon': 2,
+                     'return_expectations': 0.08, 'rebalancing_frequency': 'Quarterly'}),
+    'large': (0.1, {'assets': [f'SYN{i:04d}' for i in range(50)], 'risk_tolerance': 7, 'time_horizon': 5,
+                    'return_expectations': 0.1, 'rebalancing_frequency': 'Yearly'}),
+}
+
+# Stored baseline report compared against by default
+BASELINE_PATH = 'data/load_baseline.json'
+
+# Allowed relative regression of latency and throughput, and absolute increase of the error rate
+TOLERANCE = 0.2
+ERROR_RATE_TOLERANCE = 0.01
+
+SRC_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve(host='127.0.0.1', port=8000, workers=4):
+    """
+    Serve the API with pre-forked worker processes sharing one listening socket (the gunicorn fallback).
+
+    Runs until SIGTERM or SIGINT, which stop the workers.
+    """
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Request lines of every worker would drown the output
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(1024)
+
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            make_server(host, port, app, fd=listener.fileno()).serve_forever()
+            os._exit(0)
+        pids.append(pid)
+
+    def stop(signum, frame):
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def _free_port(host):
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+def start_server(workers=4, host='127.0.0.1', port=None, server='auto', timeout=60.0, log_path=os.devnull):
+    """
+    Start the API in a subprocess on the synthetic data backend and wait until it accepts connections.
+
+    Args:
+    - workers: worker processes
+    - host, port: address to listen on (a free port if None)
+    - server: 'gunicorn', 'prefork' (the fallback of serve) or 'auto' (gunicorn when installed)
+    - timeout: seconds to wait for the server to start
+    - log_path: file receiving the server's output
+
+    Returns:
+    - (process, base URL)
+    """
+    import importlib.util
+
+    if server == 'auto':
+        server = 'gunicorn' if importlib.util.find_spec('gunicorn') else 'prefork'
+    port = port or _free_port(host)
+
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--pythonpath', SRC_PATH, '--workers', str(workers), '--bind', f'{host}:{port}',
+                   '--timeout', '300', '--preload', 'app:app']
+    elif server == 'prefork':
+        command = [sys.executable, os.path.join(SRC_PATH, 'load_test.py'), 'serve', '--host', host, '--port', str(port), '--workers', str(workers)]
+    else:
+        raise ValueError("server must be 'gunicorn', 'prefork' or 'auto'.")
+
+    env = {**os.environ, 'SDE_DATA_BACKEND': 'synthetic', 'MPLBACKEND': 'Agg',
+           'PYTHONPATH': os.pathsep.join(filter(None, [SRC_PATH, os.environ.get('PYTHONPATH')]))}
+    with open(log_path, 'ab') as log:
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The {server} server exited with code {process.returncode} (see {log_path}).")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process, f'http://{host}:{port}'
+        except OSError:
+            time.sleep(0.1)
+
+    stop_server(process)
+    raise TimeoutError(f"The {server} server did not start within {timeout} seconds.")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def worker_memory(server_pid):
+    """
+    Return the resident and peak memory (MB) of every worker process of a server (Linux /proc).
+
+    Returns:
+    - list of {'pid', 'rss_mb', 'peak_rss_mb'}; empty where /proc is not available
+    """
+    if not os.path.isdir('/proc'):
+        return []
+
+    workers = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The parent pid follows the parenthesized command name
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            if parent != server_pid:
+                continue
+            with open(f'/proc/{entry}/status') as f:
+                status = dict(line.split(':', 1) for line in f if ':' in line)
+        except (OSError, ValueError, IndexError):
+            continue
+        workers.append({'pid': int(entry), 'rss_mb': int(status['VmRSS'].split()[0]) / 1024,
+                        'peak_rss_mb': int(status['VmHWM'].split()[0]) / 1024})
+
+    return sorted(workers, key=lambda worker: worker['pid'])
+
+
+def _post(url, payload, timeout):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status < 400
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def run_load(base_url, users, duration=None, n_requests=None, profiles=None, seed=0, timeout=300.0):
+    """
+    Drive the API with closed-loop virtual users.
+
+    Args:
+    - base_url: URL of the running API
+    - users: number of concurrent users
+    - duration (optional): seconds to keep sending requests
+    - n_requests (optional): stop after this many requests in total instead
+    - profiles: request mix, as REQUEST_PROFILES (the default)
+    - seed: seed of the profile draws, one generator per user
+    - timeout: per-request timeout in seconds
+
+    Returns:
+    - list of (profile name, latency in seconds, success), in completion order
+    """
+    if duration is None and n_requests is None:
+        raise ValueError("Give a duration or a number of requests.")
+
+    profiles = profiles or REQUEST_PROFILES
+    names = list(profiles)
+    weights = np.array([profiles[name][0] for name in names], dtype=float)
+    weights /= weights.sum()
+
+    samples = []
+    lock = threading.Lock()
+    deadline = None if duration is None else time.monotonic() + duration
+
+    def user(index):
+        random_state = np.random.RandomState([seed, index])
+        while deadline is None or time.monotonic() < deadline:
+            with lock:
+                if n_requests is not None and len(samples) + pending[0] >= n_requests:
+                    return
+                pending[0] += 1
+
+            name = names[random_state.choice(len(names), p=weights)]
+            start = time.perf_counter()
+            ok = _post(f'{base_url}/optimize', profiles[name][1], timeout)
+            latency = time.perf_counter() - start
+
+            with lock:
+                pending[0] -= 1
+                samples.append((name, latency, ok))
+
+    pending = [0]
+    threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples
+
+
+def summarize(samples, elapsed):
+    """
+    Summarize load test samples.
+
+    Args:
+    - samples: (profile name, latency in seconds, success) tuples from run_load
+    - elapsed: wall time of the run in seconds
+
+    Returns:
+    - dict with 'requests', 'errors', 'error_rate', 'throughput' (requests/s), 'p50_ms', 'p95_ms', 'p99_ms'
+      (latencies of the successful requests), and the same statistics per profile under 'profiles'
+    """
+    def statistics(group):
+        latencies = np.array([latency for _, latency, ok in group if ok]) * 1000
+        errors = sum(not ok for _, _, ok in group)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+        return {
+            'requests': len(group),
+            'errors': errors,
+            'error_rate': errors / len(group) if group else 0.0,
+            'throughput': len(group) / elapsed if elapsed > 0 else np.nan,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+        }
+
+    summary = statistics(samples)
+    summary['profiles'] = {name: statistics([sample for sample in samples if sample[0] == name])
+                           for name in sorted({sample[0] for sample in samples})}
+    return summary
+
+
+def load_test(users_levels=(50, 100, 200), duration=60.0, workers=4, server='auto', warmup=True, log_path=os.devnull):
+    """
+    Start the server, run every concurrency level in turn and return the report.
+
+    Returns:
+    - dict: 'server', 'workers', and 'levels' mapping each number of users (as a string) to its summary,
+      with the memory of every worker measured at the end of the level under 'worker_memory'
+    """
+    process, base_url = start_server(workers, server=server, log_path=log_path)
+    try:
+        if warmup:
+            # First requests of each worker pay for imports and caches; keep them out of the measurements
+            run_load(base_url, workers, n_requests=workers * len(REQUEST_PROFILES))
+
+        levels = {}
+        for users in users_levels:
+            start = time.perf_counter()
+            samples = run_load(base_url, users, duration=duration)
+            levels[str(users)] = {**summarize(samples, time.perf_counter() - start), 'worker_memory': worker_memory(process.pid)}
+    finally:
+        stop_server(process)
+
+    return {'server': server, 'workers': workers, 'levels': levels}
+
+
+def compare_to_baseline(report, baseline, tolerance=TOLERANCE, error_rate_tolerance=ERROR_RATE_TOLERANCE):
+    """
+    Compare a report with a baseline report, level by level.
+
+    Returns:
+    - list of regression messages (empty when every level is within tolerance)
+    """
+    regressions = []
+    for users, level in report['levels'].items():
+        reference = baseline['levels'].get(users)
+        if reference is None:
+            continue
+
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if level[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{users} users: {metric} {level[metric]:.0f} > baseline {reference[metric]:.0f} (+{tolerance:.0%})")
+        if level['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append(f"{users} users: throughput {level['throughput']:.2f}/s < baseline {reference['throughput']:.2f}/s (-{tolerance:.0%})")
+        if level['error_rate'] > reference['error_rate'] + error_rate_tolerance:
+            regressions.append(f"{users} users: error rate {level['error_rate']:.2%} > baseline {reference['error_rate']:.2%}")
+
+    return regressions
+
+
+def format_report(report):
+    """
+    Return a report as a printable table
+    """
+    lines = [f"{'Users':>6}{'Requests':>10}{'Errors':>8}{'Req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Worker RSS MB':>16}"]
+    for users, level in report['levels'].items():
+        memory = ', '.join(f"{worker['rss_mb']:.0f}" for worker in level['worker_memory']) or '-'
+        lines.append(f"{users:>6}{level['requests']:>10}{level['errors']:>8}{level['throughput']:>9.2f}"
+                     f"{level['p50_ms']:>10.0f}{level['p95_ms']:>10.0f}{level['p99_ms']:>10.0f}  {memory}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test of the portfolio API')
+    subcommands = parser.add_subparsers(dest='command')
+
+    serve_parser = subcommands.add_parser('serve', help='serve the API with pre-forked workers')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--workers', type=int, default=4)
+
+    parser.add_argument('--users', default='50,100,200', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds per concurrency level')
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--server', choices=('auto', 'gunicorn', 'prefork'), default='auto')
+    parser.add_argument('--report', help='write the JSON report to this file')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline report to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed relative regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'serve':
+        serve(args.host, args.port, args.workers)
+        return 0
+
+    report = load_test([int(users) for users in args.users.split(',')], args.duration, args.workers, args.server)
+    print(format_report(report))
+
+    for path in [args.report] + ([args.baseline] if args.save_baseline else []):
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=1)
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
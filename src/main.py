@@ -1,29 +1,55 @@
 """
 Purpose: Entry point
+
+The pipeline runs as named stages (see STAGES). `--stages` runs a subset against the cached prices in
+data/raw_data.csv, and `--profile DIR` writes a speedscope flame graph per stage and a peak-memory table.
+`--plots DIR` saves the plots to DIR instead of opening windows, for machines without a display.
+
+`--batch SPECS` runs headless instead: every portfolio spec of a CSV/JSONL file runs across a process
+pool and the results table is written to `--output` (see batch.py).
 """
+import argparse
 import numpy as np
-import yfinance as yf
-from matplotlib import pyplot as plt
 from data_handler import annualize_parameters, fetch_data, get_return,get_correlation_matrix
 from portfolio_optimizer import optimize_portfolio
 from rebalance import continuous_monitoring_and_rebalancing
+from rebalance_policies import compare_rebalancing_policies
 from simulations import simulate_portfolio, simulation_value
+from noise_cache import shared_noise_cache
 from ito_calculus import gbm_sde
 from optimal_stopping import optimal_stopping_rule
-from risk_neutral_pricing import risk_neutral_price
+from pricing_batch import run_pricing_batch
+from price_store import list_option_snapshots
+from ingestion import ingest_option_chains
 from efficient_frontier import plot_effifient_frontier
-from config import ASSETS, RISK_TOLERANCE, TIME_HORIZON, RETURN_EXPECTATIONS, REBALANCING_FREQUENCY
+from config import RunConfig
 from utils import calculate_sharpe_ratio
 
 
 
-def main():
+def _plot_path(state, filename):
+    # File to save a plot to when running headless (None opens a window)
+    plot_dir = state.get('plot_dir')
+    if plot_dir is None:
+        return None
+    import os
+    os.makedirs(plot_dir, exist_ok=True)
+    return os.path.join(plot_dir, filename)
+
+
+def stage_data(state, config, cached=False):
     trading_days_per_year = 252
+    assets = list(config.assets)
 
-    # Fetch and process data
-    data = fetch_data(ASSETS)
+    # Fetch and process data (or reuse the prices saved by the last fetch)
+    if cached:
+        import pandas as pd
+        data = pd.read_csv(CACHED_PRICES_PATH, index_col=0, parse_dates=True)[assets]
+    else:
+        data = fetch_data(assets)
 
-    returns = get_return(data)
+    # Every asset keeps its whole history: a late listing does not truncate the others
+    returns = get_return(data, complete=False)
 
     # Estimate the expected return (mean of daily returns) and volatility (std of returns)
     mu = returns.mean()
@@ -35,21 +61,30 @@ def main():
     # Calculate the correlation matrix of the returns
     correlation_matrix = get_correlation_matrix(returns)
 
+    state.update(assets=assets, data=data, returns=returns, sigma=sigma, mu_annualized=mu_annualized,
+                 sigma_annualized=sigma_annualized, correlation_matrix=correlation_matrix)
 
-    optimal_weights, (expected_return, portfolio_volatility) = optimize_portfolio(mu_annualized.values, sigma_annualized.values, correlation_matrix, RISK_TOLERANCE/10, RETURN_EXPECTATIONS)
 
-    
+def stage_optimize(state, config):
+    state['optimal_weights'], state['performance'] = optimize_portfolio(state['mu_annualized'].values, state['sigma_annualized'].values,
+                                                                        state['correlation_matrix'], config.risk_tolerance/10, config.return_expectations)
+
+
+def stage_simulate(state, config):
+    assets, data, mu_annualized, sigma_annualized = state['assets'], state['data'], state['mu_annualized'], state['sigma_annualized']
+    optimal_weights, (expected_return, portfolio_volatility) = state['optimal_weights'], state['performance']
 
     # Initial asset prices (last observed price for each asset)
     S0 = data.iloc[-1].values
-    dt = 1/252  # Time step (daily data)
-    N = 252  # Number of time steps (252 for one year)
 
     # Simualate portfolio performance
-    simulated_path_prices = simulate_portfolio(len(ASSETS), S0, mu_annualized, sigma_annualized, TIME_HORIZON, dt)
+    simulated_path_prices = simulate_portfolio(len(assets), S0, mu_annualized, sigma_annualized, config=config, noise_cache=shared_noise_cache(),
+                                               returns=state['returns'].dropna())
+    state['simulated_path_prices'] = simulated_path_prices
 
     # Simualate portfolio values
-    simulation_portfolio_values = simulation_value(size_assets=len(ASSETS), simulated_paths_prices=simulated_path_prices, time_horizon=TIME_HORIZON, plot=True)
+    simulation_portfolio_values = simulation_value(size_assets=len(assets), simulated_paths_prices=simulated_path_prices, plot=True, config=config,
+                                                   save_path=_plot_path(state, 'simulation.png'))
     
     # Calculate expected portfolio returns (mean of portfolio values)
     simulation_expected_return = np.mean(simulation_portfolio_values[:, -1]) - 1  # Final value - initial value
@@ -62,7 +97,7 @@ def main():
     print("\n\n------------------Result------------------")
     print("Annualized Expected Returns (μ):\n", mu_annualized)
     print("\nAnnualized Volatilities (σ):\n", sigma_annualized)
-    print("\nCorrelation Matrix:\n", correlation_matrix)
+    print("\nCorrelation Matrix:\n", state['correlation_matrix'])
     print(f"\nOptimal Portfolio Weights: {optimal_weights}")
     print(f"\nExpected Portfolio Return: {expected_return * 100:.2f}%")
     print(f"\nPortfolio Volatility: {portfolio_volatility * 100:.2f}%")
@@ -70,60 +105,173 @@ def main():
     print(f"\nSimulated Portfolio Risk (Standard Deviation): {simulation_portfolio_risk * 100:.2f}%\n")
 
 
+def stage_frontier(state, config):
     # Plot Efficient Frontier
-    plot_effifient_frontier(mu_annualized.values, sigma_annualized.values, correlation_matrix, RISK_TOLERANCE/10)
+    plot_effifient_frontier(state['mu_annualized'].values, state['sigma_annualized'].values, state['correlation_matrix'], config.risk_tolerance/10,
+                            save_path=_plot_path(state, 'efficient_frontier.png'))
+
 
+def stage_stopping(state, config):
     # Perform Optimal Stopping (e.g, check if rebalancing is needed)
-    decision_points = optimal_stopping_rule(simulated_path_prices)
+    state['decision_points'] = optimal_stopping_rule(state['simulated_path_prices'])
 
     # print(f"Optimal Stopping Decision Points: {decision_points}") 
 
-    continuous_monitoring_and_rebalancing(data,RISK_TOLERANCE/10, rebalance_frequency= REBALANCING_FREQUENCY)
 
-    for i in range(len(ASSETS)-1): # Note: First 2 select for stock expect bonds or commodities
-        # Retrieve the stock data
-        asset = yf.Ticker(ASSETS[i])
+def stage_rebalance(state, config):
+    # Compare rebalancing policies (buy and hold, quarterly, yearly, threshold) over all simulated paths
+    policy_summary = compare_rebalancing_policies(state['simulated_path_prices'], state['optimal_weights'])
+    print("\nRebalancing Policies (simulated terminal wealth):")
+    for policy, stats in policy_summary.items():
+        print(f"{policy}: mean {stats['mean_terminal_wealth']:.4f}, std {stats['std_terminal_wealth']:.4f}, "
+              f"turnover {stats['mean_turnover']:.4f}, costs {stats['mean_costs']:.6f}"
+              f"{' (never rebalances over this horizon: same as buy and hold)' if stats['identical_to_buy_and_hold'] and policy != 'Buy and hold' else ''}")
 
-        # Get the current stock price
-        current_price = asset.history(period="1d")['Close'].iloc[0]
+    continuous_monitoring_and_rebalancing(state['data'], config=config)
 
-        # Get the available expiration dates for options
-        expiration_dates = asset.options
 
-        # Choose the first one
-        chosen_expiration_date = expiration_dates[0]
+def stage_options(state, config):
+    # Options are priced offline from the latest chain snapshot in the store; capture one if there is none yet
+    stocks = state['assets'][:-1] # Note: First 2 select for stock expect bonds or commodities
+    if not list_option_snapshots():
+        ingest_option_chains(stocks)
 
-        # Get the options chain for the chosen expiration date
-        options_chain = asset.option_chain(chosen_expiration_date)
+    option_results, _ = run_pricing_batch(r=0.05, volatility=dict(state['sigma_annualized']))
 
-        # Extract the call options data
-        calls = options_chain.calls
+    for ticker in stocks:
+        # Closest call strike to the current stock price
+        calls = np.flatnonzero((option_results['ticker'] == ticker) & (option_results['option_type'] == 'call'))
+        if len(calls) == 0:
+            continue
+        best_call = calls[np.abs(option_results['strike'][calls] - option_results['spot'][calls]).argmin()]
 
-        # Find the closest strike price to the current stock price
-        best_call_strike = calls['strike'].iloc[(calls['strike'] - current_price).abs().argmin()]
+        print(f"Option Price for {ticker}(Note: Risk-Nuetral): {option_results['price'][best_call]}")
 
-        option_price = risk_neutral_price(S0=S0[i], K=best_call_strike, T=TIME_HORIZON, r=0.05, sigma=sigma[ASSETS[i]], option_type="call")
-    
-        print(f"Option Price for {ASSETS[i]}(Note: Risk-Nuetral): {option_price}")
-    
 
+def stage_gbm(state, config):
+    data = state['data']
 
-    sharpe_ratio = calculate_sharpe_ratio(returns, sigma)
+    sharpe_ratio = calculate_sharpe_ratio(state['returns'], state['sigma'])
     print(f"\nSharpe Ratio: {sharpe_ratio}\n")
 
-    for asset in ASSETS:
+    for asset in state['assets']:
         # Verify data for each asset
         last_row = data[asset].tail(1)
         # Extract the initial price from the last row
         initial_price = last_row.values[0]
 
         # Generate asset price paths using GBM
-        temp = gbm_sde(S0=initial_price, mu=mu_annualized[asset], sigma=sigma_annualized[asset], T=TIME_HORIZON, dt=dt)
+        temp = gbm_sde(S0=initial_price, mu=state['mu_annualized'][asset], sigma=state['sigma_annualized'][asset], T=config.time_horizon, dt=config.time_step)
         print(f"Simulated price paths for {asset}:")
         print(temp)
 
 
+# Pipeline stages in run order: name -> (stage function, stages it needs first)
+STAGES = {
+    'data': (stage_data, ()),
+    'optimize': (stage_optimize, ('data',)),
+    'simulate': (stage_simulate, ('data', 'optimize')),
+    'frontier': (stage_frontier, ('data',)),
+    'stopping': (stage_stopping, ('data', 'optimize', 'simulate')),
+    'rebalance': (stage_rebalance, ('data', 'optimize', 'simulate')),
+    'options': (stage_options, ('data',)),
+    'gbm': (stage_gbm, ('data',)),
+}
+
+# Prices written by the last fetch_data call
+CACHED_PRICES_PATH = 'data/raw_data.csv'
+
+
+def main(config=RunConfig(), stages=None, profile_dir=None, cached=None, plot_dir=None):
+    """
+    Run the pipeline, or only some of its stages.
+
+    Args:
+    - config: run configuration
+    - stages (optional): names of the stages to run (all if None); the stages they depend on run
+      first, unprofiled
+    - profile_dir (optional): directory for the speedscope report (profile.speedscope.json) and the
+      peak-memory table (memory.txt) of the selected stages
+    - cached (optional): read the prices from CACHED_PRICES_PATH instead of downloading them
+      (default: True exactly when stages are selected without 'data')
+    - plot_dir (optional): directory to save the plots to instead of showing them
+    """
+    selected = list(STAGES) if stages is None else list(stages)
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}; choose from {list(STAGES)}")
+    if cached is None:
+        cached = stages is not None and 'data' not in selected
+
+    # Selected stages plus their dependencies, in pipeline order
+    required = set(selected).union(*(STAGES[name][1] for name in selected))
+    run_order = [name for name in STAGES if name in required]
+
+    profiler = None
+    if profile_dir is not None:
+        from profiling import StageProfiler
+        profiler = StageProfiler()
+
+    state = {'plot_dir': plot_dir}
+    for name in run_order:
+        function, _ = STAGES[name]
+        kwargs = {'cached': cached} if name == 'data' else {}
+
+        if profiler is not None and name in selected:
+            with profiler.stage(name):
+                function(state, config, **kwargs)
+        else:
+            function(state, config, **kwargs)
+
+    if profiler is not None:
+        import os
+
+        profiler.write_speedscope(os.path.join(profile_dir, 'profile.speedscope.json'))
+        table = profiler.memory_table()
+        with open(os.path.join(profile_dir, 'memory.txt'), 'w') as f:
+            f.write(table + '\n')
+        print(f"\nProfile written to {profile_dir} (open profile.speedscope.json in https://www.speedscope.app)\n{table}")
+
+    return state
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='SDE portfolio optimizer pipeline')
+    parser.add_argument('--stages', type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+                        help=f"comma-separated stages to run ({','.join(STAGES)}); others only run if needed")
+    parser.add_argument('--profile', metavar='DIR', help='write a per-stage speedscope profile and peak-memory table to DIR')
+    parser.add_argument('--cached', action='store_true', default=None, help=f'read prices from {CACHED_PRICES_PATH} instead of downloading')
+    parser.add_argument('--plots', metavar='DIR', help='save plots to DIR instead of opening windows')
+
+    batch = parser.add_argument_group('batch mode')
+    batch.add_argument('--batch', metavar='SPECS', help='run every portfolio spec of a CSV or JSONL file instead of the pipeline')
+    batch.add_argument('--output', default='results/batch.jsonl', help='results table (.jsonl or .parquet)')
+    batch.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    batch.add_argument('--prices', metavar='CSV', help='prices to use (default: the cached prices with --cached, else downloaded)')
+    batch.add_argument('--universe', help='read the prices from this price store universe')
+    return parser.parse_args(argv)
+
+
+def run_batch_cli(args):
+    """
+    Batch mode: run the specs file and write the results table (and plots) without any display
+    """
+    from batch import load_batch_prices, read_specs, run_batch
+
+    specs = read_specs(args.batch)
+    prices = load_batch_prices(specs, prices_path=args.prices or (CACHED_PRICES_PATH if args.cached else None), universe=args.universe)
+    results = run_batch(specs, prices, output_path=args.output, max_workers=args.workers, plot_dir=args.plots)
+
+    failed = results['error'].notna()
+    print(f"{len(results)} specs, {int(failed.sum())} failed; results written to {args.output}")
+    for spec_id, error in results.loc[failed, ['id', 'error']].itertuples(index=False):
+        print(f"  {spec_id}: {error}")
+    return results
 
     
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.batch:
+        run_batch_cli(args)
+    else:
+        main(stages=args.stages, profile_dir=args.profile, cached=args.cached, plot_dir=args.plots)
@@ -0,0 +1,158 @@
+'''
+Purpose: Cache of the standard normal shocks behind the Monte Carlo simulations
+
+With a fixed seed, every simulation of the same shape draws the same standard normal shocks: the
+mean, volatility and correlation of the universe only rescale them afterwards. The cache draws the
+shocks of a (model, sampling, seed, shape, dtype) key once and hands the same read-only buffer to
+every later run, which applies its own Cholesky factor, drift and volatility to it.
+
+With a directory, each entry is a .npy file opened as a read-only memory map, so every process (API
+workers, batch pool workers) shares one copy through the OS page cache, and entries survive restarts.
+File names carry CACHE_FORMAT_VERSION, and the directory is kept under max_bytes by deleting the least
+recently used files (and files of other versions) whenever an entry is written. Without a directory,
+entries live in this process only. An entry larger than max_bytes is drawn for its caller and never
+cached, so a few large requests cannot pin memory in every worker. Either way an entry is never written after creation,
+so the stages of a run (simulation, stopping, rebalancing) and concurrent requests all read it safely.
+'''
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from config import NOISE_CACHE_PATH
+from simulations import standard_shocks
+
+# Entries kept open (mapped or in memory) per cache, least recently used dropped first
+MAX_ENTRIES = 16
+
+# Size of the cache directory (1 GiB) before the least recently used files are deleted; a larger entry is
+# returned to its caller without being cached (neither written nor kept open)
+MAX_BYTES = 1 << 30
+
+# Part of every file name: bump it whenever standard_shocks draws differently, so stale shocks are never served
+CACHE_FORMAT_VERSION = 1
+
+# Cache shared by the API, the CLI and the batch workers of this process
+_shared_cache = None
+
+
+class NoiseCache:
+    """
+    Read-only standard normal shocks keyed by (model, sampling, seed, shape, dtype).
+
+    Args:
+    - path (optional): directory of the memory-mapped entries (process memory if None)
+    - max_entries: entries kept open at once
+    - max_bytes: size of the files in path before the least recently used ones are deleted
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, key):
+        model, sampling, seed, n_simulations, n_steps, n_assets, n_factors, dtype = key
+        return os.path.join(self.path, f'v{CACHE_FORMAT_VERSION}-{model}-{sampling}-{seed}-{n_simulations}x{n_steps}x{n_assets}+{n_factors}-{dtype}.npy')
+
+    def _evict(self, keep):
+        # Delete files of other versions, then the least recently used entries, until the directory fits in max_bytes.
+        # Processes still mapping a deleted file keep reading it; the others draw it again.
+        prefix = f'v{CACHE_FORMAT_VERSION}-'
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.npy') and entry.path != keep:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.name.startswith(prefix), stat.st_mtime, stat.st_size, entry.path))
+
+        total = os.path.getsize(keep) + sum(size for _, _, size, _ in files)
+        for current, _, size, path in sorted(files):
+            if current and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _create(self, key):
+        model, sampling, seed, n_simulations, n_steps, n_assets, n_factors, dtype = key
+        if model != 'gbm':
+            raise ValueError(f"No shocks are cached for model {model!r}.")
+
+        # Same draws as simulate_portfolio's own generator for this seed
+        shocks = standard_shocks(n_simulations, n_steps, n_assets, n_factors, np.random.RandomState(seed), sampling, dtype)
+        if self.path is None or shocks.nbytes > self.max_bytes:
+            shocks.flags.writeable = False
+            return shocks
+
+        # Write to a temporary file and rename, so other processes never map a half-written entry
+        path = self._file(key)
+        os.makedirs(self.path, exist_ok=True)
+        with open(f'{path}.{os.getpid()}.tmp', 'wb') as f:
+            np.save(f, shocks)
+        os.replace(f'{path}.{os.getpid()}.tmp', path)
+        shocks = np.load(path, mmap_mode='r')
+        self._evict(keep=path)
+        return shocks
+
+    def shocks(self, n_simulations, n_steps, n_assets, n_factors=0, seed=42, sampling='pseudo', dtype=np.float64, model='gbm'):
+        """
+        Return the read-only (n_simulations, n_steps, n_assets + n_factors) standard normal shocks of the key,
+        drawing them on first use (see simulations.standard_shocks)
+        """
+        key = (model, sampling, int(seed), int(n_simulations), int(n_steps), int(n_assets), int(n_factors), np.dtype(dtype).name)
+
+        with self._lock:
+            shocks = self._entries.get(key)
+            if shocks is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return shocks
+
+            shocks = None
+            if self.path is not None:
+                try:
+                    # Drawn earlier by another process (or a previous run); touched as recently used
+                    shocks = np.load(self._file(key), mmap_mode='r')
+                    os.utime(self._file(key))
+                    self.hits += 1
+                except FileNotFoundError:
+                    shocks = None
+            if shocks is None:
+                shocks = self._create(key)
+                self.misses += 1
+                if shocks.nbytes > self.max_bytes:
+                    return shocks
+
+            self._entries[key] = shocks
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return shocks
+
+    def clear(self):
+        """
+        Close every open entry (files on disk are kept)
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+def shared_noise_cache():
+    """
+    Return the process-wide cache, memory-mapped under config.NOISE_CACHE_PATH (the SDE_NOISE_CACHE_PATH
+    environment variable overrides it)
+    """
+    global _shared_cache
+    path = os.environ.get('SDE_NOISE_CACHE_PATH', NOISE_CACHE_PATH)
+    if _shared_cache is None or _shared_cache.path != path:
+        _shared_cache = NoiseCache(path)
+    return _shared_cache
@@ -0,0 +1,105 @@
+'''
+Purpose: The optimization, simulation and risk pipeline of one run configuration
+
+The API (app.portfolio) and the headless batch (batch.evaluate_spec) both call run_portfolio and only
+format its PortfolioRun differently, so a change to the estimator, the optimizer switch, the CVaR
+branch, the simulation or the risk metrics reaches both at once.
+'''
+
+from typing import NamedTuple
+import numpy as np
+
+from data_handler import annualize_parameters, asset_prices, get_return, get_correlation_matrix
+from portfolio_optimizer import optimize_portfolio, optimize_portfolio_large, portfolio_performance
+from simulations import simulate_portfolio
+from risk import risk_metrics
+from noise_cache import shared_noise_cache
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class PortfolioRun(NamedTuple):
+    """
+    Results of one run of the pipeline.
+
+    - assets: tickers, in the order of every array below
+    - weights: optimal weights
+    - expected_return, volatility: annualized performance of the optimal portfolio
+    - mu_annualized, sigma_annualized (Series), correlation_matrix: the estimates it was optimized on
+    - initial_prices: last prices on which every asset has a price (start of the simulated paths)
+    - simulated_prices: simulated price paths (n_simulations, n_steps, n_assets)
+    - frontier_volatilities, frontier_weights: efficient frontier (None unless requested)
+    - metrics: risk_metrics of the optimal portfolio (row 0) then of every frontier point
+    """
+    assets: list
+    weights: np.ndarray
+    expected_return: float
+    volatility: float
+    mu_annualized: object
+    sigma_annualized: object
+    correlation_matrix: object
+    initial_prices: np.ndarray
+    simulated_prices: np.ndarray
+    frontier_volatilities: object
+    frontier_weights: object
+    metrics: dict
+
+
+def run_portfolio(config, prices=None, frontier=True):
+    """
+    Optimize, simulate and measure the risk of one run configuration.
+
+    Args:
+    - config: run configuration (universe, risk tolerance, target, estimator, objective, simulation settings)
+    - prices (optional): historical prices containing (at least) the configuration's assets; loaded with
+      data_handler.asset_prices if None
+    - frontier: also trace the efficient frontier and annotate its points with the risk metrics
+
+    Returns:
+    - PortfolioRun
+    """
+    assets = list(config.assets)
+    data = asset_prices(assets) if prices is None else prices[assets]
+
+    # Every asset keeps its whole history (a late listing does not truncate the others); the scenario-based
+    # CVaR and risk metrics use the days on which every asset has a return
+    returns = get_return(data, complete=False)
+    complete_returns = returns.dropna()
+    mu_annualized, sigma_annualized = annualize_parameters(returns.mean(), returns.std(), TRADING_DAYS_PER_YEAR)
+    correlation_matrix = get_correlation_matrix(returns, method=config.covariance_estimator)
+
+    # SLSQP degrades past a few hundred assets, so large universes go through the QP solver
+    large_universe = len(assets) > config.large_universe_threshold
+    if config.objective == 'cvar':
+        from cvar_optimizer import optimize_cvar
+
+        # Minimize CVaR directly over the historical daily return scenarios (target is a daily return)
+        weights, _ = optimize_cvar(complete_returns, alpha=config.cvar_confidence, target_return=config.return_expectations / TRADING_DAYS_PER_YEAR)
+        expected_return, volatility = portfolio_performance(weights, mu_annualized.values, sigma_annualized.values, correlation_matrix)
+    else:
+        optimizer = optimize_portfolio_large if large_universe else optimize_portfolio
+        weights, (expected_return, volatility) = optimizer(mu_annualized.values, sigma_annualized.values, correlation_matrix,
+                                                           config.risk_tolerance/10, target_return=config.return_expectations)
+    weights = np.asarray(weights, dtype=float)
+
+    # Shocks of the same seed and shape are shared by every run (each applies its own mu, sigma and correlation)
+    initial_prices = data.dropna().iloc[-1].values
+    simulated_prices = simulate_portfolio(len(assets), initial_prices, mu_annualized, sigma_annualized, correlation_matrix=correlation_matrix,
+                                          config=config, noise_cache=shared_noise_cache(), returns=complete_returns)
+
+    frontier_volatilities = frontier_weights = None
+    portfolios = weights[None]
+    if frontier:
+        from efficient_frontier import plot_effifient_frontier
+
+        frontier_volatilities, frontier_weights = plot_effifient_frontier(mu_annualized.values, sigma_annualized.values, correlation_matrix,
+                                                                          config.risk_tolerance/10, plot=False,
+                                                                          method='qp' if large_universe else 'slsqp', return_weights=True)
+        portfolios = np.vstack([weights, frontier_weights])
+
+    # Risk metrics of the optimal portfolio and every frontier point in one pass over the returns
+    metrics = risk_metrics(portfolios, complete_returns.values, alpha=config.cvar_confidence,
+                           risk_free_rate=config.risk_free_rate / TRADING_DAYS_PER_YEAR)
+
+    return PortfolioRun(assets, weights, float(expected_return), float(volatility), mu_annualized, sigma_annualized, correlation_matrix,
+                        initial_prices, simulated_prices, frontier_volatilities, frontier_weights, metrics)
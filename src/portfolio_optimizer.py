@@ -1,8 +1,32 @@
 import numpy as np
-from scipy.optimize import minimize
+
+def build_covariance(sigma, correlation_matrix):
+    """
+    Combine volatilities and correlations into a covariance matrix once, outside the objective.
+
+    Args:
+    - sigma: Standard deviations of asset returns.
+    - correlation_matrix: Dense correlation matrix, or a structured (FactorCovariance) one.
+
+    Returns:
+    - The covariance, in the same representation as the correlation matrix.
+    """
+    if hasattr(correlation_matrix, 'scale'):
+        return correlation_matrix.scale(sigma)
+
+    return np.asarray(correlation_matrix) * np.outer(sigma, sigma)
+
+def portfolio_variance(weights, covariance):
+    """
+    Return w^T Sigma w for a dense or structured covariance.
+    """
+    if hasattr(covariance, 'variance'):
+        return covariance.variance(weights)
+
+    return np.dot(weights.T, np.dot(covariance, weights))
 
 # Portfolio performance metrics: return and volatility (risk)
-def portfolio_performance(weights, mu, sigma, correlation_matrix, risk_tolerance = None):
+def portfolio_performance(weights, mu, sigma, correlation_matrix, risk_tolerance = None, covariance=None):
     """
     Calculate the portfolio performance metrics (return and volatility).
     
@@ -12,18 +36,20 @@ def portfolio_performance(weights, mu, sigma, correlation_matrix, risk_tolerance
     - sigma: Standard deviations of asset returns.
     - correlation_matrix: Correlation matrix between asset returns.
     - risk_tolerance: Risk tolerance factor (higher values indicate more risk taken for higher return).
+    - covariance: Precomputed covariance (skips combining sigma and correlation_matrix).
     
     Returns:
     - portfolio_return: Expected portfolio return.
     - portfolio_volatility: Expected portfolio volatility (risk).
     """
+    if covariance is None:
+        covariance = build_covariance(sigma, correlation_matrix)
     
     # Calculate the portfolio return (weighted sum of individual asset returns)
     portfolio_return = np.dot(weights, mu)
     
     # Calculate the portfolio volatility (standard deviation of the portfolio)
-    portfolio_variance = np.dot(weights.T, np.dot(correlation_matrix * np.outer(sigma, sigma), weights))
-    portfolio_volatility = np.sqrt(portfolio_variance)
+    portfolio_volatility = np.sqrt(portfolio_variance(weights, covariance))
     
     # Objective function to minimize: Risk-adjusted return (maximize return for given risk tolerance)
     if(risk_tolerance):
@@ -34,7 +60,7 @@ def portfolio_performance(weights, mu, sigma, correlation_matrix, risk_tolerance
 
 
 # Optimization function: minimize portfolio volatility for a given return
-def optimize_portfolio(mu, sigma, correlation_matrix, risk_tolerance, target_return=None):
+def optimize_portfolio(mu, sigma, correlation_matrix, risk_tolerance, target_return=None, initial_weights=None):
     """
     Optimizes the portfolio using Mean-Variance Optimization.
     Returns the optimal portfolio weights, the expected return, and volatility.
@@ -45,34 +71,208 @@ def optimize_portfolio(mu, sigma, correlation_matrix, risk_tolerance, target_ret
     - correlation_matrix: correlation matrix of the returns
     - risk_tolerance (float): The investor's risk tolerance, where higher values prefer higher returns over risk.
     - target_return (float): The desired target return for the portfolio.
+    - initial_weights (optional): warm start, e.g. the previous solution of an interactive session
 
     Returns:
     - result.x: The optimal portfolio weights.
     - portfolio_return: The expected return for the optimal portfolio.
     - portfolio_volatility: The volatility (risk) for the optimal portfolio.
     """
+    # scipy.optimize is imported on first use to keep API/CLI startup fast
+    from scipy.optimize import minimize
+
     num_assets = len(mu)
     
-    # Initial guess for portfolio weights (equal allocation)
-    initial_weights = np.ones(num_assets) / num_assets
+    # Initial guess for portfolio weights (equal allocation unless warm-started)
+    if initial_weights is None:
+        initial_weights = np.ones(num_assets) / num_assets
     
     # Bounds for portfolio weights (between 0 and 1)
     bounds = tuple((0, 1) for asset in range(num_assets))
     
     # Constraint to ensure the sum of portfolio weights equals 1
-    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
+    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)})
     
     # If target return is given, we add a constraint for that
     if target_return:
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1},
-                       {'type': 'eq', 'fun': lambda x: np.dot(x, mu) - target_return})
+        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)},
+                       {'type': 'eq', 'fun': lambda x: np.dot(x, mu) - target_return, 'jac': lambda x: np.asarray(mu, dtype=float)})
     
+    # Covariance is built once here rather than at every objective call
+    covariance = build_covariance(sigma, correlation_matrix)
+
+    def objective(w):
+        return portfolio_performance(w, mu, sigma, correlation_matrix, risk_tolerance, covariance=covariance)
+
+    def objective_gradient(w):
+        # d/dw (sqrt(w'Sw) - rt * w'mu) = Sw / vol - rt * mu
+        portfolio_volatility = np.sqrt(max(portfolio_variance(w, covariance), 1e-16))
+        return covariance.dot(w) / portfolio_volatility - risk_tolerance * mu
+
     # Minimize portfolio volatility (risk)
-    result = minimize(lambda w: portfolio_performance(w, mu, sigma, correlation_matrix,risk_tolerance),
+    result = minimize(objective,
                       initial_weights,
                       method='SLSQP',
+                      jac=objective_gradient if risk_tolerance else None,
                       bounds=bounds,
                       constraints=constraints)
     
-    return result.x, portfolio_performance(result.x, mu, sigma, correlation_matrix)
+    return result.x, portfolio_performance(result.x, mu, sigma, correlation_matrix, covariance=covariance)
+
+
+def build_portfolio_qp(mu, covariance, risk_tolerance=None, target_return=None, lower_bounds=0.0, upper_bounds=1.0,
+                       group_matrix=None, group_lower=None, group_upper=None, current_weights=None, max_turnover=None):
+    """
+    Build the quadratic program of the large-universe mean-variance problem.
+
+    minimize  w' Sigma w - risk_tolerance * mu' w
+    subject to sum(w) = 1, lower_bounds <= w <= upper_bounds, group_lower <= G w <= group_upper,
+               mu' w = target_return (if given), sum|w - current_weights| <= max_turnover (if given)
+
+    Turnover is linearized with auxiliary variables t >= |w - current_weights|, so the decision
+    vector is [w, t] when a turnover limit is set.
+
+    Returns:
+    - P, q, A, l, u: problem data in the form expected by qp_solver (A is scipy sparse)
+    """
+    from scipy import sparse
+
+    mu = np.asarray(mu, dtype=float)
+    num_assets = len(mu)
+    covariance = covariance.to_dense() if hasattr(covariance, 'to_dense') else np.asarray(covariance, dtype=float)
+
+    P = 2 * covariance
+    q = -(risk_tolerance or 0.0) * mu
+
+    # Rows: per-asset bounds, budget, optional target return and sector/group limits
+    rows = [sparse.identity(num_assets, format='csr'), sparse.csr_matrix(np.ones((1, num_assets)))]
+    lower = [np.broadcast_to(np.asarray(lower_bounds, dtype=float), num_assets), [1.0]]
+    upper = [np.broadcast_to(np.asarray(upper_bounds, dtype=float), num_assets), [1.0]]
+
+    if target_return is not None:
+        rows.append(sparse.csr_matrix(mu[None, :]))
+        lower.append([target_return])
+        upper.append([target_return])
+
+    if group_matrix is not None:
+        group_matrix = sparse.csr_matrix(group_matrix, dtype=float)
+        n_groups = group_matrix.shape[0]
+        rows.append(group_matrix)
+        lower.append(np.full(n_groups, -np.inf) if group_lower is None else np.broadcast_to(group_lower, n_groups))
+        upper.append(np.full(n_groups, np.inf) if group_upper is None else np.broadcast_to(group_upper, n_groups))
+
+    A = sparse.vstack(rows, format='csr')
+    l, u = np.concatenate(lower), np.concatenate(upper)
+
+    if max_turnover is not None:
+        current_weights = np.zeros(num_assets) if current_weights is None else np.asarray(current_weights, dtype=float)
+        identity = sparse.identity(num_assets, format='csr')
+
+        # Existing rows only act on w; append t >= |w - w0|, t >= 0 and sum(t) <= max_turnover
+        A = sparse.vstack([
+            sparse.hstack([A, sparse.csr_matrix((A.shape[0], num_assets))]),
+            sparse.hstack([identity, -identity]),
+            sparse.hstack([identity, identity]),
+            sparse.hstack([sparse.csr_matrix((num_assets, num_assets)), identity]),
+            sparse.hstack([sparse.csr_matrix((1, num_assets)), sparse.csr_matrix(np.ones((1, num_assets)))]),
+        ], format='csr')
+        l = np.concatenate([l, np.full(num_assets, -np.inf), current_weights, np.zeros(num_assets), [-np.inf]])
+        u = np.concatenate([u, current_weights, np.full(num_assets, np.inf), np.full(num_assets, np.inf), [max_turnover]])
+
+        P = np.block([[P, np.zeros((num_assets, num_assets))], [np.zeros((num_assets, 2 * num_assets))]])
+        q = np.concatenate([q, np.zeros(num_assets)])
+
+    return P, q, A, l, u
+
+def solved_weights(result, num_assets):
+    """
+    Return the asset weights of a build_portfolio_qp solve, raising ValueError when it did not converge.
+
+    An unsolved iterate (infeasible target or constraints, iteration limit) can break the weight
+    bounds and the budget, so it is never returned as a portfolio. A 'solved_inaccurate' solve (close
+    to the tolerances, typically near the ends of the frontier) returns its weights projected onto
+    their bounds, i.e. z of the asset bound rows.
+    """
+    if result.status == 'solved':
+        return result.x[:num_assets]
+    if result.status == 'solved_inaccurate':
+        return result.z[:num_assets]
+
+    raise ValueError(f"The portfolio QP was not solved ({result.status}); check that the target return and constraints are feasible.")
+
+def optimize_portfolio_large(mu, sigma, correlation_matrix, risk_tolerance, target_return=None, lower_bounds=0.0, upper_bounds=1.0,
+                             group_matrix=None, group_lower=None, group_upper=None, current_weights=None, max_turnover=None,
+                             max_assets=None, initial_weights=None, **solver_options):
+    """
+    Large-universe Mean-Variance Optimization solved as a QP with the ADMM solver.
+
+    Unlike optimize_portfolio (SLSQP on volatility - risk_tolerance * return) this minimizes
+    the variance form w'Sigma w - risk_tolerance * w'mu, which scales to thousands of assets.
+    With a target return both minimize variance at that return.
+    
+    Args:
+    - mu: expected returns for each asset
+    - sigma: standard deviation of returns
+    - correlation_matrix: dense or structured (FactorCovariance) correlation matrix
+    - risk_tolerance (float): weight of the expected return in the objective
+    - target_return (float, optional): required portfolio return
+    - lower_bounds, upper_bounds: per-asset weight bounds (scalars or arrays)
+    - group_matrix: sector/group exposure matrix (n_groups x n_assets, dense or scipy sparse)
+    - group_lower, group_upper: bounds of the group exposures
+    - current_weights: current holdings (reference for the turnover limit)
+    - max_turnover: limit on sum(|w - current_weights|)
+    - max_assets: cardinality limit (at least 1), enforced heuristically by dropping the smallest positions and re-solving
+    - initial_weights: warm start for the solver
+    - solver_options: settings forwarded to qp_solver.ADMMSolver
+
+    Returns:
+    - weights: optimal portfolio weights
+    - (portfolio_return, portfolio_volatility)
+
+    Raises:
+    - ValueError: the problem is infeasible (e.g. an unreachable target return) or the solver did not converge
+    """
+    from qp_solver import ADMMSolver
+
+    if max_assets is not None and max_assets < 1:
+        raise ValueError("max_assets must be at least 1.")
+
+    mu = np.asarray(mu, dtype=float)
+    num_assets = len(mu)
+    covariance = build_covariance(sigma, correlation_matrix)
+
+    P, q, A, l, u = build_portfolio_qp(mu, covariance, risk_tolerance, target_return, lower_bounds, upper_bounds,
+                                       group_matrix, group_lower, group_upper, current_weights, max_turnover)
+    solver = ADMMSolver(P, q, A, l, u, **solver_options)
+
+    x0 = None
+    if initial_weights is not None:
+        x0 = np.zeros(P.shape[0])
+        x0[:num_assets] = initial_weights
+        if max_turnover is not None:
+            x0[num_assets:] = np.abs(x0[:num_assets] - (0 if current_weights is None else current_weights))
+
+    weights = solved_weights(solver.solve(x0=x0), num_assets)
+
+    # Cardinality heuristic: repeatedly exclude the smallest positions (half the excess at a time)
+    if max_assets is not None:
+        excluded = np.zeros(num_assets, dtype=bool)
+        while np.count_nonzero(weights > 1e-6) > max_assets:
+            held = np.flatnonzero(~excluded)
+            n_drop = max(1, (np.count_nonzero(weights > 1e-6) - max_assets + 1) // 2)
+            excluded[held[np.argsort(weights[held])[:n_drop]]] = True
+
+            # Excluded assets are pinned to zero through their bound rows (the first num_assets rows)
+            l_new, u_new = l.copy(), u.copy()
+            l_new[:num_assets][excluded] = 0.0
+            u_new[:num_assets][excluded] = 0.0
+            solver.update(l=l_new, u=u_new)
+            weights = solved_weights(solver.solve(), num_assets)
+
+        # Drop solver-tolerance residue on the excluded assets and restore the budget
+        weights = np.where(weights > 1e-6, weights, 0.0)
+        if weights.sum() <= 0:
+            raise ValueError(f"No portfolio of at most {max_assets} assets satisfies the constraints.")
+        weights /= weights.sum()
 
+    return weights, portfolio_performance(weights, mu, sigma, correlation_matrix, covariance=covariance)
@@ -0,0 +1,33 @@
+'''
+Purpose: Precision policy of the numerical stack
+
+- 'double': everything in float64 (default)
+- 'mixed': the bulk, memory-bandwidth bound tensors (simulated paths, scenario and return matrices,
+  their valuation) are stored and processed in float32, while accumulations (means, variances,
+  compounding, quantile interpolation) and the optimizers stay in float64
+
+Functions that accept float32 input keep it in float32 instead of silently upcasting the whole
+array, and request float64 explicitly where they accumulate.
+'''
+
+import numpy as np
+
+# Storage dtype of the bulk tensors under each policy
+PRECISIONS = {'double': np.float64, 'mixed': np.float32}
+
+
+def storage_dtype(precision='double'):
+    """
+    Return the dtype of simulated paths and scenario matrices under a precision policy
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {list(PRECISIONS)}.")
+    return np.dtype(PRECISIONS[precision])
+
+
+def as_storage_array(values):
+    """
+    Return values as a floating array, keeping float32 input in float32 (anything else becomes float64)
+    """
+    values = np.asarray(values)
+    return values if values.dtype == np.float32 else values.astype(np.float64, copy=False)
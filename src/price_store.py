@@ -0,0 +1,242 @@
+'''
+Purpose: Shared, read-only, memory-mapped price matrix store (one float array per universe)
+
+Each universe is kept as two files in the store directory:
+- <universe>.<version>.prices: raw float64 matrix (dates x tickers) in column-major order, so every
+  ticker's history is contiguous and can be handed out as a zero-copy view
+- <universe>.json: metadata with the date index, the ticker -> column map, shape, dtype and the name
+  of the values file of this version
+
+A new version writes its own values file first and is published by one atomic rename of the metadata,
+so a reader sees either the old (metadata, values) pair or the new one, never a mix of the two.
+
+Option-chain snapshots live next to the prices as columnar .npz files (options/<as_of>.npz), one
+array per column, holding the contracts of every ticker captured at that time.
+
+Every process (gunicorn worker, Monte Carlo pool worker) maps the same file read-only, so the OS page
+cache holds one copy of the prices regardless of the number of workers. A PriceStore pickles as
+(universe, path) only and re-attaches on unpickling instead of copying the data. open_price_store
+re-attaches whenever the metadata file has been replaced, so every process picks up a version
+published by another one.
+'''
+
+import json
+import os
+import re
+import time
+import numpy as np
+
+from config import DATA_STORE_PATH
+
+# Stores already attached in this process, keyed by (store path, universe)
+_open_stores = {}
+
+
+def write_price_store(prices, universe, store_path=DATA_STORE_PATH):
+    """
+    Write a price panel into the store, replacing any previous version of the universe.
+
+    Args:
+    - prices: DataFrame of prices indexed by date with one column per ticker
+    - universe: name of the universe (file name stem)
+    - store_path: directory of the store
+
+    Returns:
+    - Path of the written price file
+    """
+    os.makedirs(store_path, exist_ok=True)
+    values_name = f'{universe}.{time.time_ns():016x}.prices'
+    values_path = os.path.join(store_path, values_name)
+    metadata_path = os.path.join(store_path, f'{universe}.json')
+
+    values = np.asfortranarray(prices.to_numpy(dtype=np.float64))
+    metadata = {
+        'dates': [str(date)[:10] for date in prices.index],
+        'tickers': [str(ticker) for ticker in prices.columns],
+        'shape': list(values.shape),
+        'dtype': 'float64',
+        'values': values_name,
+    }
+
+    # The values file of this version is complete before the metadata naming it is renamed into place
+    with open(values_path + '.tmp', 'wb') as f:
+        f.write(values.tobytes(order='F'))
+    os.replace(values_path + '.tmp', values_path)
+    with open(metadata_path + '.tmp', 'w') as f:
+        json.dump(metadata, f)
+    os.replace(metadata_path + '.tmp', metadata_path)
+
+    # Older versions are unlinked; processes that mapped one keep reading it until they re-attach
+    for name in os.listdir(store_path):
+        if name != values_name and re.fullmatch(re.escape(universe) + r'(\.[0-9a-f]{16})?\.prices', name):
+            os.remove(os.path.join(store_path, name))
+
+    # Drop a stale mapping of the previous version held by this process
+    _open_stores.pop((os.path.abspath(store_path), universe), None)
+
+    return values_path
+
+
+class PriceStore:
+    """
+    Read-only view of one universe in the store.
+
+    Attributes:
+    - values: memory-mapped (dates x tickers) float64 matrix, not writeable
+    - dates: numpy datetime64[D] array of the row dates
+    - tickers: list of tickers in column order
+    - columns: ticker -> column index map
+    """
+
+    def __init__(self, universe, store_path=DATA_STORE_PATH):
+        self.universe = universe
+        self.store_path = os.path.abspath(store_path)
+
+        for attempt in range(3):
+            # Identity of the metadata file read (taken first: a later replacement only causes one extra re-attach)
+            self.metadata_version = _metadata_version(self.store_path, universe)
+            with open(os.path.join(self.store_path, f'{universe}.json')) as f:
+                metadata = json.load(f)
+
+            shape = tuple(metadata['shape'])
+            try:
+                if 0 in shape:
+                    values = np.empty(shape, dtype=metadata['dtype'], order='F')
+                else:
+                    values = np.memmap(os.path.join(self.store_path, metadata.get('values', f'{universe}.prices')), dtype=metadata['dtype'],
+                                       mode='r', shape=shape, order='F')
+                break
+            except FileNotFoundError:
+                # A newer version was published (and this one removed) between reading the metadata and mapping it
+                if attempt == 2:
+                    raise
+
+        self.values = values
+        self.dates = np.array(metadata['dates'], dtype='datetime64[D]')
+        self.tickers = metadata['tickers']
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __reduce__(self):
+        # Pickle by reference: workers re-attach to the mapping instead of receiving a copy
+        return open_price_store, (self.universe, self.store_path)
+
+    def _rows(self, start=None, end=None):
+        # Row slice covering [start, end] (inclusive ISO dates)
+        first = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left'))
+        last = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right'))
+        return slice(first, last)
+
+    def column(self, ticker, start=None, end=None):
+        """
+        Return the price history of one ticker as a zero-copy view
+        """
+        return self.values[self._rows(start, end), self.columns[ticker]]
+
+    def matrix(self, tickers=None, start=None, end=None):
+        """
+        Return the (dates x tickers) price matrix.
+
+        All tickers, or tickers forming a contiguous run of columns, come back as a zero-copy view;
+        any other selection has to gather (copy) the requested columns.
+        """
+        rows = self._rows(start, end)
+        if tickers is None:
+            return self.values[rows]
+
+        index = np.array([self.columns[ticker] for ticker in tickers], dtype=int)
+        if len(index) and np.array_equal(index, np.arange(index[0], index[0] + len(index))):
+            return self.values[rows, index[0]:index[0] + len(index)]
+
+        return self.values[rows][:, index]
+
+    def frame(self, tickers=None, start=None, end=None):
+        """
+        Return the prices as a DataFrame backed by matrix() (no copy when matrix() is a view)
+        """
+        import pandas as pd
+
+        rows = self._rows(start, end)
+        return pd.DataFrame(self.matrix(tickers, start, end), index=pd.DatetimeIndex(self.dates[rows].astype('datetime64[ns]'), name='Date'),
+                            columns=list(self.tickers if tickers is None else tickers), copy=False)
+
+
+def _metadata_version(store_path, universe):
+    # Every publication renames a new metadata file into place, which changes its inode and mtime
+    stat = os.stat(os.path.join(store_path, f'{universe}.json'))
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def open_price_store(universe, store_path=DATA_STORE_PATH):
+    """
+    Attach to a universe in the store, reusing this process's existing mapping unless a newer version
+    has been published since (by any process)
+    """
+    key = (os.path.abspath(store_path), universe)
+    store = _open_stores.get(key)
+    if store is None or store.metadata_version != _metadata_version(key[0], universe):
+        store = _open_stores[key] = PriceStore(universe, store_path)
+    return store
+
+
+# Columns of an option-chain snapshot and their storage dtypes
+OPTION_COLUMNS = {
+    'ticker': str,
+    'expiration': 'datetime64[D]',
+    'option_type': str,
+    'strike': np.float64,
+    'bid': np.float64,
+    'ask': np.float64,
+    'last_price': np.float64,
+    'implied_volatility': np.float64,
+    'spot': np.float64,
+}
+
+
+def write_option_snapshot(chains, as_of, store_path=DATA_STORE_PATH):
+    """
+    Write an option-chain snapshot as one columnar .npz file.
+
+    Args:
+    - chains: DataFrame (or dict of arrays) with the OPTION_COLUMNS, one row per contract
+    - as_of: snapshot timestamp (ISO string, e.g. '2025-01-02T15:30')
+    - store_path: directory of the store
+
+    Returns:
+    - Path of the written snapshot
+    """
+    options_path = os.path.join(store_path, 'options')
+    os.makedirs(options_path, exist_ok=True)
+
+    columns = {name: np.asarray(chains[name]).astype(dtype) for name, dtype in OPTION_COLUMNS.items()}
+    columns['as_of'] = np.array(as_of, dtype='datetime64[s]')
+
+    snapshot_path = os.path.join(options_path, f"{str(columns['as_of']).replace(':', '-')}.npz")
+    with open(snapshot_path + '.tmp', 'wb') as f:
+        np.savez(f, **columns)
+    os.replace(snapshot_path + '.tmp', snapshot_path)
+
+    return snapshot_path
+
+
+def list_option_snapshots(store_path=DATA_STORE_PATH):
+    """
+    Return the snapshot files in the store, oldest first
+    """
+    options_path = os.path.join(store_path, 'options')
+    if not os.path.isdir(options_path):
+        return []
+    return sorted(os.path.join(options_path, name) for name in os.listdir(options_path) if name.endswith('.npz'))
+
+
+def load_option_snapshot(snapshot_path=None, store_path=DATA_STORE_PATH):
+    """
+    Load an option-chain snapshot as a dict of column arrays (the latest one by default)
+    """
+    if snapshot_path is None:
+        snapshots = list_option_snapshots(store_path)
+        if not snapshots:
+            raise FileNotFoundError(f"No option-chain snapshots in {store_path}")
+        snapshot_path = snapshots[-1]
+
+    with np.load(snapshot_path) as snapshot:
+        return {name: snapshot[name] for name in snapshot.files}
@@ -0,0 +1,104 @@
+'''
+Purpose: Offline batch pricing of option-chain snapshots (price and Greeks of every contract)
+
+Reads a columnar option-chain snapshot from the store (see ingestion.ingest_option_chains),
+prices every contract in one vectorized Black-Scholes call and writes the results back as one
+columnar file (pricing/<as_of>.npz). Nothing touches the network and the snapshot time is the
+pricing date, so re-running a batch on the same snapshot gives the same file.
+'''
+
+import os
+import numpy as np
+
+from config import DATA_STORE_PATH, RISK_FREE_RATE
+from price_store import load_option_snapshot
+from risk_neutral_pricing import black_scholes
+
+# Day count of the time to maturity
+DAYS_PER_YEAR = 365
+
+
+def time_to_maturity(expiration, as_of):
+    """
+    Return the time from the snapshot time to each expiration, in years
+    """
+    expiration = np.asarray(expiration, dtype='datetime64[D]').astype('datetime64[s]')
+    return (expiration - np.datetime64(as_of, 's')) / np.timedelta64(1, 'D') / DAYS_PER_YEAR
+
+
+def price_option_snapshot(snapshot, r=RISK_FREE_RATE, volatility=None):
+    """
+    Price every contract of a snapshot.
+
+    Args:
+    - snapshot: dict of column arrays (load_option_snapshot output)
+    - r: risk-free interest rate
+    - volatility (dict, optional): annualized volatility per ticker; by default each contract is
+      priced with its own quoted implied volatility
+
+    Returns:
+    - dict of column arrays: the snapshot's contract columns plus 'time_to_maturity', 'price',
+      'delta', 'gamma', 'vega', 'theta' and 'rho'
+    """
+    tickers = snapshot['ticker']
+
+    if volatility is None:
+        sigma = snapshot['implied_volatility']
+    else:
+        # One lookup per distinct ticker, then a gather over all contracts
+        unique_tickers, index = np.unique(tickers, return_inverse=True)
+        sigma = np.array([volatility.get(ticker, np.nan) for ticker in unique_tickers], dtype=float)[index]
+
+    T = time_to_maturity(snapshot['expiration'], snapshot['as_of'])
+    greeks = black_scholes(snapshot['spot'], snapshot['strike'], T, r, sigma, snapshot['option_type'] == 'call')
+
+    results = {name: values for name, values in snapshot.items() if name != 'as_of'}
+    results['time_to_maturity'] = T
+    results.update(greeks)
+    return results
+
+
+def _write_npz(f, arrays):
+    # np.savez stamps every zip entry with the current time; a fixed timestamp makes reruns byte-identical
+    import zipfile
+
+    with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, array in arrays.items():
+            with archive.open(zipfile.ZipInfo(f'{name}.npy', date_time=(1980, 1, 1, 0, 0, 0)), 'w', force_zip64=True) as entry:
+                np.lib.format.write_array(entry, np.asanyarray(array), allow_pickle=False)
+
+
+def write_pricing_results(results, as_of, store_path=DATA_STORE_PATH):
+    """
+    Write batch pricing results as one columnar .npz file (pricing/<as_of>.npz), byte-identical for identical results
+
+    Returns:
+    - Path of the written file
+    """
+    pricing_path = os.path.join(store_path, 'pricing')
+    os.makedirs(pricing_path, exist_ok=True)
+
+    as_of = np.array(as_of, dtype='datetime64[s]')
+    results_path = os.path.join(pricing_path, f"{str(as_of).replace(':', '-')}.npz")
+    with open(results_path + '.tmp', 'wb') as f:
+        _write_npz(f, {'as_of': as_of, **results})
+    os.replace(results_path + '.tmp', results_path)
+
+    return results_path
+
+
+def run_pricing_batch(snapshot_path=None, store_path=DATA_STORE_PATH, r=RISK_FREE_RATE, volatility=None):
+    """
+    Price an option-chain snapshot (the latest one by default) and store the results.
+
+    Args:
+    - snapshot_path (optional): snapshot file to price
+    - store_path: directory of the store
+    - r, volatility: see price_option_snapshot
+
+    Returns:
+    - (results, results_path)
+    """
+    snapshot = load_option_snapshot(snapshot_path, store_path)
+    results = price_option_snapshot(snapshot, r=r, volatility=volatility)
+    return results, write_pricing_results(results, snapshot['as_of'], store_path)
@@ -0,0 +1,141 @@
+'''
+Purpose: Per-stage profiling of the CLI pipeline (flame graphs and peak memory)
+
+Every profiled stage records:
+- an evented call trace (each Python and builtin call opening and closing, with timestamps) taken
+  through sys.setprofile, written as one profile of a speedscope file (https://www.speedscope.app)
+  so each stage opens as its own flame graph
+- its wall time and the peak memory allocated while it ran (tracemalloc)
+
+Tracing every call slows the pipeline down, so wall times under --profile are inflated; use them to
+compare stages, and the flame graphs to find where each stage spends its time.
+'''
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# Trace events per buffer chunk (open/close flag, frame, nanoseconds)
+EVENT_CHUNK = 1 << 20
+
+
+class StageProfiler:
+    """
+    Collects one call trace and one memory row per pipeline stage.
+
+    Args:
+    - trace_calls: record the call trace (False keeps only wall time and memory)
+    """
+
+    def __init__(self, trace_calls=True):
+        self.trace_calls = trace_calls
+        self.frames = []
+        self._frame_index = {}
+        self.profiles = []
+        self.memory = []
+
+    def _frame(self, name, file, line):
+        key = (name, file, line)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({'name': name, 'file': file, 'line': line})
+        return index
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profile the block as the stage `name`
+        """
+        # Events go to fixed-size numpy chunks, so the trace's own memory is known exactly and
+        # subtracted from the stage's peak
+        chunks = []
+        position = [EVENT_CHUNK]
+        stack = []
+        clock = time.perf_counter_ns
+        start = clock()
+
+        def record(kind, index):
+            if position[0] == EVENT_CHUNK:
+                chunks.append(np.empty((EVENT_CHUNK, 3), dtype=np.int64))
+                position[0] = 0
+            chunks[-1][position[0]] = (kind, index, clock() - start)
+            position[0] += 1
+
+        def hook(frame, event, arg):
+            if event == 'call':
+                code = frame.f_code
+                index = self._frame(getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+            elif event == 'c_call':
+                index = self._frame(getattr(arg, '__qualname__', repr(arg)), getattr(arg, '__module__', None) or '<builtin>', 0)
+            elif stack:
+                # return, c_return or c_exception of the innermost open frame
+                record(0, stack.pop())
+                return
+            else:
+                # Returns of frames entered before the stage started
+                return
+            stack.append(index)
+            record(1, index)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        if self.trace_calls:
+            sys.setprofile(hook)
+        try:
+            yield
+        finally:
+            sys.setprofile(None)
+            end = clock() - start
+            current, peak = tracemalloc.get_traced_memory()
+            trace_bytes = sum(chunk.nbytes for chunk in chunks)
+            if started_tracing:
+                tracemalloc.stop()
+
+            self.memory.append({'stage': name, 'seconds': end / 1e9, 'peak_mb': (peak - baseline - trace_bytes) / 2**20,
+                                'retained_mb': (current - baseline - trace_bytes) / 2**20})
+
+            if self.trace_calls:
+                trace = np.concatenate(chunks)[:(len(chunks) - 1) * EVENT_CHUNK + position[0]] if chunks else np.zeros((0, 3), dtype=np.int64)
+                events = [{'type': 'O' if kind else 'C', 'frame': index, 'at': at} for kind, index, at in trace.tolist()]
+
+                # Close frames still open when tracing stopped (the with-block exit itself)
+                events.extend({'type': 'C', 'frame': index, 'at': end} for index in reversed(stack))
+
+                self.profiles.append({'type': 'evented', 'name': name, 'unit': 'nanoseconds',
+                                      'startValue': 0, 'endValue': end, 'events': events})
+
+    def write_speedscope(self, path, name='SDE-Portfolio-Optimizer'):
+        """
+        Write the stage traces as a speedscope JSON file (one profile per stage)
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        report = {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'shared': {'frames': self.frames},
+            'profiles': self.profiles,
+            'name': name,
+            'activeProfileIndex': 0,
+            'exporter': 'profiling.StageProfiler',
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f)
+
+    def memory_table(self):
+        """
+        Return the per-stage wall time and memory as a printable table
+        """
+        lines = [f"{'Stage':<12}{'Seconds':>10}{'Peak MB':>12}{'Retained MB':>14}"]
+        for row in self.memory:
+            lines.append(f"{row['stage']:<12}{row['seconds']:>10.3f}{row['peak_mb']:>12.2f}{row['retained_mb']:>14.2f}")
+        return '\n'.join(lines)
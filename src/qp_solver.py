@@ -0,0 +1,308 @@
+'''
+Purpose: ADMM (OSQP-style) solver for convex quadratic programs used by the large-universe optimizer
+
+Solves
+    minimize    0.5 x^T P x + q^T x
+    subject to  l <= A x <= u
+
+with the operator-splitting iteration of Stellato et al. (2020). The linear system of every
+iteration shares one matrix, which is factorized once and reused across iterations, warm starts
+and bound updates (e.g. the target-return row while tracing a frontier). A sparse P keeps the
+system sparse (sparse LU); a dense P (a sample covariance) uses a dense Cholesky factorization.
+
+An infeasible problem is detected from the dual iterates (the primal infeasibility certificate of
+OSQP) instead of running to the iteration limit.
+'''
+
+import numpy as np
+from typing import NamedTuple
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve
+from scipy.sparse.linalg import factorized
+
+# Bounds at or beyond this magnitude are treated as infinite
+INFINITY = 1e20
+
+# A solve stopped by the iteration limit is 'solved_inaccurate' when its residuals are within this factor of the tolerances
+INACCURATE_FACTOR = 100
+
+
+class QPResult(NamedTuple):
+    """
+    Result of an ADMM solve.
+
+    Fields:
+    - x: primal solution
+    - y: dual variables of the rows of A
+    - z: A x projected onto [l, u]
+    - status: 'solved', 'solved_inaccurate' (iteration limit hit within INACCURATE_FACTOR times the
+      tolerances), 'primal_infeasible' or 'max_iter_reached'
+    - iterations: number of ADMM iterations run
+    """
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    status: str
+    iterations: int
+
+
+class ADMMSolver:
+    """
+    Reusable ADMM solver for 0.5 x'Px + q'x subject to l <= Ax <= u.
+
+    Args:
+    - P: positive semidefinite matrix (dense array, scipy sparse matrix, or an object with `to_dense()`)
+    - q: linear cost vector
+    - A: constraint matrix (dense or scipy sparse)
+    - l, u: lower and upper bounds of A x (use +/- np.inf for one-sided rows)
+    - rho: initial ADMM step size (equality rows use 1e3 * rho)
+    - sigma: regularization of the x-update
+    - alpha: over-relaxation parameter in (0, 2)
+    - max_iter: iteration limit
+    - eps_abs, eps_rel: absolute and relative tolerances on the primal and dual residuals
+    - eps_prim_inf: tolerance of the primal infeasibility certificate
+    - adaptive_rho_interval: iterations between step size adaptations (0 disables it)
+    """
+
+    def __init__(self, P, q, A, l, u, rho=1.0, sigma=1e-6, alpha=1.6, max_iter=10000,
+                 eps_abs=1e-6, eps_rel=1e-6, eps_prim_inf=1e-5, adaptive_rho_interval=50):
+        self.P = P.to_dense() if hasattr(P, 'to_dense') else P
+        self.P = sparse.csc_matrix(self.P, dtype=float) if sparse.issparse(self.P) else np.asarray(self.P, dtype=float)
+        self.A = sparse.csr_matrix(A, dtype=float)
+        self.AT = self.A.T.tocsr()
+        self.sigma = sigma
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.eps_abs = eps_abs
+        self.eps_rel = eps_rel
+        self.eps_prim_inf = eps_prim_inf
+        self.adaptive_rho_interval = adaptive_rho_interval
+
+        self.n, self.m = self.P.shape[0], self.A.shape[0]
+        self.rho_base = rho
+        self.update(q=q, l=l, u=u)
+        self._factorize()
+
+        # Last solution, used to warm start the next solve
+        self._x = np.zeros(self.n)
+        self._z = np.zeros(self.m)
+        self._y = np.zeros(self.m)
+
+    def update(self, q=None, l=None, u=None):
+        """
+        Change the linear cost and/or the constraint bounds without refactorizing
+        (unless the set of equality rows changes).
+        """
+        if q is not None:
+            self.q = np.asarray(q, dtype=float)
+        if l is not None:
+            self.l = np.clip(np.asarray(l, dtype=float), -INFINITY, INFINITY)
+        if u is not None:
+            self.u = np.clip(np.asarray(u, dtype=float), -INFINITY, INFINITY)
+
+        # Equality rows get a much larger step size, inactive (free) rows a tiny one
+        equality = np.abs(self.u - self.l) < 1e-9
+        free = (self.l <= -INFINITY) & (self.u >= INFINITY)
+        rho_scale = np.where(equality, 1e3, np.where(free, 1e-6, 1.0))
+
+        if not hasattr(self, 'rho_scale') or not np.array_equal(rho_scale, self.rho_scale):
+            self.rho_scale = rho_scale
+            if hasattr(self, 'factor'):
+                self._factorize()
+
+    def _factorize(self):
+        # KKT matrix of the reduced x-update: P + sigma I + A' diag(rho) A
+        self.rho = self.rho_base * self.rho_scale
+        if sparse.issparse(self.P):
+            kkt = (self.P + self.sigma * sparse.identity(self.n) + self.AT @ sparse.diags(self.rho) @ self.A).tocsc()
+            self.factor = factorized(kkt)
+        else:
+            factor = cho_factor(self.P + self.sigma * np.eye(self.n) + (self.AT @ sparse.diags(self.rho) @ self.A).toarray())
+            self.factor = lambda rhs: cho_solve(factor, rhs)
+
+    def _primal_infeasible(self, delta_y):
+        # Certificate: A'dy = 0 and u'max(dy, 0) + l'min(dy, 0) < 0; dy must not push against an infinite bound
+        delta_y = np.where(self.u >= INFINITY, np.minimum(delta_y, 0), delta_y)
+        delta_y = np.where(self.l <= -INFINITY, np.maximum(delta_y, 0), delta_y)
+        norm = np.max(np.abs(delta_y), initial=0)
+        if norm <= self.eps_prim_inf:
+            return False
+
+        support = np.where(self.u < INFINITY, self.u, 0) @ np.maximum(delta_y, 0) + np.where(self.l > -INFINITY, self.l, 0) @ np.minimum(delta_y, 0)
+        return np.max(np.abs(self.AT @ delta_y), initial=0) <= self.eps_prim_inf * norm and support < -self.eps_prim_inf * norm
+
+    def solve(self, x0=None, y0=None):
+        """
+        Run ADMM, warm-started from the previous solution (or from x0/y0 when given).
+
+        Returns:
+        - QPResult
+        """
+        x = self._x.copy() if x0 is None else np.asarray(x0, dtype=float).copy()
+        y = self._y.copy() if y0 is None else np.asarray(y0, dtype=float).copy()
+        z = np.clip(self.A @ x, self.l, self.u)
+
+        status = 'max_iter_reached'
+        iteration = 0
+        for iteration in range(1, self.max_iter + 1):
+            # x-update through the cached factorization, then relaxed z- and y-updates
+            x_tilde = self.factor(self.sigma * x - self.q + self.AT @ (self.rho * z - y))
+            z_tilde = self.A @ x_tilde
+
+            x = self.alpha * x_tilde + (1 - self.alpha) * x
+            z_relaxed = self.alpha * z_tilde + (1 - self.alpha) * z
+            z_new = np.clip(z_relaxed + y / self.rho, self.l, self.u)
+            delta_y = self.rho * (z_relaxed - z_new)
+            y = y + delta_y
+            z = z_new
+
+            if iteration % 10 and iteration != self.max_iter:
+                continue
+
+            # Convergence check on scaled primal and dual residuals
+            Ax, Px, ATy = self.A @ x, self.P @ x, self.AT @ y
+            primal_residual = np.max(np.abs(Ax - z), initial=0)
+            dual_residual = np.max(np.abs(Px + self.q + ATy), initial=0)
+            primal_scale = max(np.max(np.abs(Ax), initial=0), np.max(np.abs(z), initial=0))
+            dual_scale = max(np.max(np.abs(Px), initial=0), np.max(np.abs(ATy), initial=0), np.max(np.abs(self.q), initial=0))
+
+            tolerance_ratio = max(primal_residual / (self.eps_abs + self.eps_rel * primal_scale),
+                                  dual_residual / (self.eps_abs + self.eps_rel * dual_scale))
+            if tolerance_ratio <= 1:
+                status = 'solved'
+                break
+            if iteration == self.max_iter and tolerance_ratio <= INACCURATE_FACTOR:
+                status = 'solved_inaccurate'
+                break
+
+            if self._primal_infeasible(delta_y):
+                status = 'primal_infeasible'
+                break
+
+            # Rebalance the step size when one residual dominates the other (refactorizes)
+            if self.adaptive_rho_interval and iteration % self.adaptive_rho_interval == 0:
+                ratio = np.sqrt((primal_residual / (primal_scale + 1e-12)) / (dual_residual / (dual_scale + 1e-12) + 1e-12))
+                if ratio > 5 or ratio < 0.2:
+                    self.rho_base = float(np.clip(self.rho_base * ratio, 1e-6, 1e6))
+                    self._factorize()
+
+        self._x, self._y, self._z = x, y, z
+        return QPResult(x, y, z, status, iteration)
+
+
+def solve_qp(P, q, A, l, u, x0=None, y0=None, **kwargs):
+    """
+    Solve 0.5 x'Px + q'x subject to l <= Ax <= u in one call.
+
+    Args:
+    - P, q, A, l, u: problem data (see ADMMSolver)
+    - x0, y0: optional warm start
+    - kwargs: solver settings forwarded to ADMMSolver
+
+    Returns:
+    - QPResult
+    """
+    return ADMMSolver(P, q, A, l, u, **kwargs).solve(x0=x0, y0=y0)
+
+
+def solve_qp_batch(P, q, A, l, u, x0=None, y0=None, rho=1.0, sigma=1e-6, alpha=1.6, max_iter=10000, eps_abs=1e-6, eps_rel=1e-6,
+                   adaptive_rho_interval=50):
+    """
+    Solve many small QPs sharing one structure with a single vectorized ADMM iteration.
+
+    Problem b has its own P[b], q[b] and A[b], and K bound sets l[b, k], u[b, k] (e.g. the target
+    returns of one frontier). The KKT matrix of every problem is inverted once (per step size change)
+    and shared by its K bound sets; every iteration is a handful of batched matrix products, so
+    thousands of small problems cost about as much as one Python-level ADMM loop.
+
+    Args:
+    - P: (B, n, n) positive semidefinite matrices
+    - q: (B, n) linear costs
+    - A: (B, m, n) dense constraint matrices
+    - l, u: (B, K, m) bounds; the bound sets of one problem must share their equality rows
+    - x0, y0: optional warm start, shapes (B, K, n) and (B, K, m)
+    - rho, sigma, alpha, max_iter, eps_abs, eps_rel, adaptive_rho_interval: as for ADMMSolver
+
+    Returns:
+    - QPResult whose x, y, z have shapes (B, K, n), (B, K, m), (B, K, m) and whose status is a
+      (B, K) array of 'solved' / 'solved_inaccurate' / 'max_iter_reached' (see QPResult)
+    """
+    P, q, A = (np.asarray(array, dtype=float) for array in (P, q, A))
+    l = np.clip(np.asarray(l, dtype=float), -INFINITY, INFINITY)
+    u = np.clip(np.asarray(u, dtype=float), -INFINITY, INFINITY)
+    n_problems, n_sets, m = l.shape
+    n = P.shape[1]
+
+    # Per-row step size scale, as ADMMSolver.update, from each problem's first bound set
+    equality = np.abs(u[:, 0] - l[:, 0]) < 1e-9
+    free = (l[:, 0] <= -INFINITY) & (u[:, 0] >= INFINITY)
+    rho_scale = np.where(equality, 1e3, np.where(free, 1e-6, 1.0))
+    rho_base = np.full(n_problems, float(rho))
+
+    def factorize(rho_base, rho_scale, P, A):
+        # Inverse KKT matrices P + sigma I + A' diag(rho) A; symmetric, so they multiply row-stacked iterates unchanged
+        rho_rows = rho_base[:, None] * rho_scale
+        kkt = P + sigma * np.eye(n) + np.einsum('bmi,bm,bmj->bij', A, rho_rows, A)
+        return np.linalg.inv(kkt), rho_rows[:, None, :]
+
+    x_out = np.zeros((n_problems, n_sets, n))
+    y_out = np.zeros((n_problems, n_sets, m))
+    z_out = np.zeros((n_problems, n_sets, m))
+    tolerance_ratio_out = np.full((n_problems, n_sets), np.inf)
+
+    # Working set: problems with an unconverged bound set; finished problems are written out and dropped
+    active = np.arange(n_problems)
+    AT = A.transpose(0, 2, 1)
+    kkt_inverse, rho_vector = factorize(rho_base, rho_scale, P, A)
+    x = x_out.copy() if x0 is None else np.array(np.broadcast_to(x0, x_out.shape), dtype=float)
+    y = y_out.copy() if y0 is None else np.array(np.broadcast_to(y0, y_out.shape), dtype=float)
+    z = np.clip(x @ AT, l, u)
+
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        rhs = sigma * x - q[:, None, :] + (rho_vector * z - y) @ A
+        x_tilde = rhs @ kkt_inverse
+        z_tilde = x_tilde @ AT
+
+        x = alpha * x_tilde + (1 - alpha) * x
+        z_relaxed = alpha * z_tilde + (1 - alpha) * z
+        z_new = np.clip(z_relaxed + y / rho_vector, l, u)
+        y = y + rho_vector * (z_relaxed - z_new)
+        z = z_new
+
+        if iteration % 10 and iteration != max_iter:
+            continue
+
+        Ax, Px, ATy = x @ AT, x @ P, y @ A
+        primal_residual = np.max(np.abs(Ax - z), axis=2)
+        dual_residual = np.max(np.abs(Px + q[:, None, :] + ATy), axis=2)
+        primal_scale = np.maximum(np.max(np.abs(Ax), axis=2), np.max(np.abs(z), axis=2))
+        dual_scale = np.maximum(np.maximum(np.max(np.abs(Px), axis=2), np.max(np.abs(ATy), axis=2)), np.max(np.abs(q), axis=1)[:, None])
+
+        tolerance_ratio = np.maximum(primal_residual / (eps_abs + eps_rel * primal_scale), dual_residual / (eps_abs + eps_rel * dual_scale))
+        converged = tolerance_ratio <= 1
+        x_out[active], y_out[active], z_out[active], tolerance_ratio_out[active] = x, y, z, tolerance_ratio
+
+        done = converged.all(axis=1)
+        if done.all():
+            break
+        if done.any():
+            keep = ~done
+            active = active[keep]
+            x, y, z, l, u, P, q, A, AT = (array[keep] for array in (x, y, z, l, u, P, q, A, AT))
+            kkt_inverse, rho_vector, rho_base, rho_scale = (array[keep] for array in (kkt_inverse, rho_vector, rho_base, rho_scale))
+            converged, primal_residual, dual_residual, primal_scale, dual_scale = (
+                array[keep] for array in (converged, primal_residual, dual_residual, primal_scale, dual_scale))
+
+        if adaptive_rho_interval and iteration % adaptive_rho_interval == 0:
+            # One step size per problem, driven by its worst unconverged bound set
+            primal_ratio = np.max(np.where(converged, 0, primal_residual / (primal_scale + 1e-12)), axis=1)
+            dual_ratio = np.max(np.where(converged, 0, dual_residual / (dual_scale + 1e-12)), axis=1)
+            ratio = np.sqrt(primal_ratio / (dual_ratio + 1e-12))
+            adapt = (ratio > 5) | (ratio < 0.2)
+            if adapt.any():
+                rho_base[adapt] = np.clip(rho_base[adapt] * ratio[adapt], 1e-6, 1e6)
+                kkt_inverse[adapt], rho_vector[adapt] = factorize(rho_base[adapt], rho_scale[adapt], P[adapt], A[adapt])
+
+    status = np.where(tolerance_ratio_out <= 1, 'solved', np.where(tolerance_ratio_out <= INACCURATE_FACTOR, 'solved_inaccurate', 'max_iter_reached'))
+    return QPResult(x_out, y_out, z_out, status, iteration)
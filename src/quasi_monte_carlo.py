@@ -0,0 +1,138 @@
+'''
+Purpose: Quasi-Monte Carlo shocks (scrambled Sobol + Brownian bridge) for the path simulations
+
+Plain pseudo-random paths converge at O(N^-1/2). Scrambled Sobol points fill the unit cube much more
+evenly, but their quality degrades with dimension, so the Brownian bridge assigns the first (best)
+Sobol coordinates to the coarse structure of each path: the terminal value first, then the midpoint,
+then the quarter points and so on. Statistics driven mostly by the terminal value (portfolio mean,
+VaR) then converge close to O(N^-1).
+
+Scrambling makes each point set an unbiased random sample, so independent scrambles ("replicates")
+give an error estimate, which a single QMC point set cannot.
+'''
+
+import numpy as np
+
+# Highest dimension supported by scipy's Sobol direction numbers
+MAX_SOBOL_DIMENSION = 21201
+
+
+def brownian_bridge_schedule(n_steps):
+    """
+    Return the Brownian bridge construction order for a path of n_steps equal steps.
+
+    Returns:
+    - (bridge_index, left_index, right_index, left_weight, right_weight, std) arrays of length n_steps:
+      point bridge_index[i] is built at stage i from the known points left_index[i] - 1 (or time 0)
+      and right_index[i], with the conditional weights and standard deviation (in units of one step)
+    """
+    times = np.arange(1, n_steps + 1, dtype=float)
+    known = np.zeros(n_steps, dtype=bool)
+    bridge_index, left_index, right_index = (np.zeros(n_steps, dtype=int) for _ in range(3))
+    left_weight, right_weight, std = (np.zeros(n_steps) for _ in range(3))
+
+    # Stage 0: the terminal point
+    known[-1] = True
+    bridge_index[0] = n_steps - 1
+    std[0] = np.sqrt(times[-1])
+
+    j = 0
+    for i in range(1, n_steps):
+        # Next gap [j, k] of unknown points, filled at its midpoint l
+        while known[j]:
+            j += 1
+        k = j
+        while not known[k]:
+            k += 1
+        l = j + ((k - 1 - j) >> 1)
+        known[l] = True
+
+        left_time = times[j - 1] if j > 0 else 0.0
+        bridge_index[i], left_index[i], right_index[i] = l, j, k
+        left_weight[i] = (times[k] - times[l]) / (times[k] - left_time)
+        right_weight[i] = (times[l] - left_time) / (times[k] - left_time)
+        std[i] = np.sqrt((times[l] - left_time) * (times[k] - times[l]) / (times[k] - left_time))
+
+        j = k + 1
+        if j >= n_steps:
+            j = 0
+
+    return bridge_index, left_index, right_index, left_weight, right_weight, std
+
+
+def brownian_bridge_increments(Z):
+    """
+    Turn standard normals in bridge order into standard normal Brownian increments.
+
+    Args:
+    - Z: array (n_paths, n_steps, n_dims); Z[:, i] drives construction stage i of every dimension
+
+    Returns:
+    - Array of the same shape whose cumulative sum over steps is a Brownian path (in units of one step)
+    """
+    n_steps = Z.shape[1]
+    bridge_index, left_index, right_index, left_weight, right_weight, std = brownian_bridge_schedule(n_steps)
+
+    W = np.empty_like(Z)
+    W[:, -1] = std[0] * Z[:, 0]
+    for i in range(1, n_steps):
+        l, j, k = bridge_index[i], left_index[i], right_index[i]
+        W[:, l] = right_weight[i] * W[:, k] + std[i] * Z[:, i]
+        if j > 0:
+            W[:, l] += left_weight[i] * W[:, j - 1]
+
+    return np.diff(W, axis=1, prepend=0)
+
+
+def sobol_normals(n_paths, n_steps, n_dims, random_state=None):
+    """
+    Draw Brownian increments (n_paths, n_steps, n_dims) from a scrambled Sobol sequence with Brownian bridge ordering.
+
+    Sobol coordinates are assigned bridge stage first, then dimension, so every dimension's terminal value
+    uses the leading coordinates. Past MAX_SOBOL_DIMENSION coordinates (the finest bridge stages of very
+    large problems) the shocks fall back to pseudo-random normals.
+
+    Args:
+    - n_paths: number of paths (a power of 2 keeps the Sobol balance properties)
+    - n_steps: number of time steps
+    - n_dims: number of independent Brownian motions (assets, factors)
+    - random_state (optional): np.random.RandomState seeding the scramble and any pseudo-random fallback
+    """
+    import warnings
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+
+    random_state = np.random if random_state is None else random_state
+    total_dims = n_steps * n_dims
+    sobol_dims = min(total_dims, MAX_SOBOL_DIMENSION)
+
+    sampler = qmc.Sobol(sobol_dims, scramble=True, seed=int(random_state.randint(2**31 - 1)))
+    with warnings.catch_warnings():
+        # Non power-of-2 sample sizes are allowed, only slightly less balanced
+        warnings.simplefilter('ignore', UserWarning)
+        uniforms = sampler.random(n_paths)
+
+    Z = np.empty((n_paths, total_dims))
+    Z[:, :sobol_dims] = ndtri(np.clip(uniforms, 1e-12, 1 - 1e-12))
+    if total_dims > sobol_dims:
+        Z[:, sobol_dims:] = random_state.normal(0, 1, (n_paths, total_dims - sobol_dims))
+
+    return brownian_bridge_increments(Z.reshape(n_paths, n_steps, n_dims))
+
+
+def qmc_estimate(statistic, n_replicates=8, seed=42):
+    """
+    Randomized QMC estimate of a statistic with its standard error.
+
+    Args:
+    - statistic: function of a seed returning a float or array, e.g. the mean or VaR of a
+      simulate_portfolio(..., sampling='qmc', seed=seed) run
+    - n_replicates: number of independent scrambles
+    - seed: seed of the replicate seeds
+
+    Returns:
+    - (estimate, standard_error): the replicate mean and its standard error
+    """
+    seeds = np.random.RandomState(seed).randint(2**31 - 1, size=n_replicates)
+    values = np.array([statistic(int(replicate_seed)) for replicate_seed in seeds], dtype=float)
+    return values.mean(axis=0), values.std(axis=0, ddof=1) / np.sqrt(n_replicates)
@@ -4,10 +4,18 @@ Purpose: Rebalance portfolio weights at specified interval (quarterly, yearly, o
 
 import numpy as np
 import time
+from typing import NamedTuple
 from portfolio_optimizer import optimize_portfolio
 from optimal_stopping import optimal_stopping_rule
 
-def continuous_monitoring_and_rebalancing(data, risk_tolerance, rebalance_frequency='quarterly', threshold=0.03):
+# Trading days between calendar rebalances
+REBALANCE_PERIODS = {'Quarterly': 63, 'Yearly': 252}
+
+def continuous_monitoring_and_rebalancing(data, risk_tolerance=None, rebalance_frequency='quarterly', threshold=0.03, config=None):
+    # A run configuration supplies the risk tolerance (scaled from 1-10), frequency and stopping threshold
+    if config is not None:
+        risk_tolerance, rebalance_frequency, threshold = config.risk_tolerance / 10, config.rebalancing_frequency, config.rebalance_threshold
+
     print("Continuous monitoring and rebalancing started\n")
     
     # Calculate daily returns
@@ -24,7 +32,7 @@ def continuous_monitoring_and_rebalancing(data, risk_tolerance, rebalance_freque
     optimal_weights, (initial_return, initial_volatility) = optimize_portfolio(mu.values, sigma.values, correlation_matrix, risk_tolerance)
     
     # Set the rebalance period
-    rebalance_periods = {'Quarterly': 63, 'Yearly': 252}  
+    rebalance_periods = REBALANCE_PERIODS
 
     for i in range(0, len(data), rebalance_periods[rebalance_frequency]):
         # Extract the data up to the current point
@@ -40,14 +48,16 @@ def continuous_monitoring_and_rebalancing(data, risk_tolerance, rebalance_freque
         new_optimal_weights, (new_return, new_volatility) = optimize_portfolio(mu_new.values, sigma_new.values, correlation_matrix_new, risk_tolerance)
         
         # Integrate optimal stopping rule (decision points) here to check for significant price changes
-        decision_points = optimal_stopping_rule(data_slice.values, threshold)
+        # The slice is one multi-asset path, so each decision point carries that day's price vector
+        decision_points = optimal_stopping_rule([data_slice.values], threshold)
         
         if decision_points:
             for dp in decision_points:
                 t, price = dp
                 print(f"Decision point triggered at day {i+t}. Significant price change detected: {price}")
-                # Rebalance portfolio based on decision points
-                new_optimal_weights = adjust_weights_based_on_price_change(new_optimal_weights, price)
+                # Rebalance portfolio based on decision points: drift since the previous day against the targets
+                previous_price = data_slice.values[t - 1]
+                new_optimal_weights = adjust_weights_based_on_price_change(new_optimal_weights, price, threshold, previous_price)
         
         # Print portfolio details after rebalancing
         print(f"Rebalancing at day {i + rebalance_periods[rebalance_frequency]}")
@@ -58,29 +68,130 @@ def continuous_monitoring_and_rebalancing(data, risk_tolerance, rebalance_freque
 
         time.sleep(1)  # Simulate the passage of time [Todo: If using daily time remove]
 
-def adjust_weights_based_on_price_change(new_optimal_weights, price, threshold=0.03):
+class RebalanceResult(NamedTuple):
     """
-    Adjust portfolio weights based on significant price changes.
-    new_optimal_weights: Current portfolio weights
-    price: The current price of the asset
-    threshold: The percentage change in price to trigger a weight adjustment
+    Outcome of rebalance_holdings for a batch of portfolios.
+
+    Fields:
+    - holdings: shares held after rebalancing (portfolios x assets)
+    - traded: traded value per portfolio
+    - costs: transaction costs paid per portfolio (taken out of its wealth)
+    - rebalanced: boolean mask of the portfolios that traded
     """
-    adjusted_weights = new_optimal_weights.copy()
-    
-    # Calculate price change percentage from previous value
-    price_change_percentage = (price - adjusted_weights) / adjusted_weights
-    
-    # Iterate through each price change percentage and adjust portfolio weights if any exceed the threshold
-    for i, price_change in enumerate(price_change_percentage):
-        if abs(price_change) > threshold:
-            if price_change > 0:
-                # Reduce weight for assets with significant positive price change (take profits)
-                adjusted_weights[i] *= (1 - threshold)
-            else:
-                # Increase weight for assets with significant negative price change (buy)
-                adjusted_weights[i] *= (1 + threshold)
-
-    # Normalize the weights so they sum to 1
-    adjusted_weights /= adjusted_weights.sum()
-
-    return adjusted_weights
\ No newline at end of file
+    holdings: np.ndarray
+    traded: np.ndarray
+    costs: np.ndarray
+    rebalanced: np.ndarray
+
+
+def holdings_from_weights(weights, prices, wealth=1.0):
+    """
+    Return the shares that put `wealth` on `weights` at `prices` (broadcasts over portfolios)
+    """
+    return np.asarray(wealth, dtype=float)[..., None] * np.asarray(weights, dtype=float) / np.asarray(prices, dtype=float)
+
+
+def portfolio_drift(holdings, prices, target_weights):
+    """
+    Current weights of held shares and their drift from the targets.
+
+    Args:
+    - holdings: shares (assets, or portfolios x assets)
+    - prices: current prices, broadcastable to holdings
+    - target_weights: target weights, broadcastable to holdings
+
+    Returns:
+    - (weights, drift, wealth): current weights, weights minus targets, and portfolio values
+    """
+    values = np.asarray(holdings, dtype=float) * prices
+    wealth = values.sum(axis=-1)
+    weights = values / wealth[..., None]
+    return weights, weights - target_weights, wealth
+
+
+def _project_to_band(weights, lower, upper, iterations=60):
+    # Nearest weights to `weights` inside [lower, upper] that sum to 1: clip(weights + shift) with the
+    # budget-restoring shift of every row found by bisection
+    low = np.min(lower - weights, axis=-1, keepdims=True)
+    high = np.max(upper - weights, axis=-1, keepdims=True)
+    for _ in range(iterations):
+        shift = (low + high) / 2
+        over = np.clip(weights + shift, lower, upper).sum(axis=-1, keepdims=True) > 1
+        high = np.where(over, shift, high)
+        low = np.where(over, low, shift)
+    return np.clip(weights + (low + high) / 2, lower, upper)
+
+
+def rebalance_holdings(holdings, prices, target_weights, threshold=0.0, band=0.0, transaction_cost=0.0):
+    """
+    Threshold/band rebalancing of many portfolios at once.
+
+    A portfolio trades when its largest absolute weight drift exceeds `threshold`. It then trades to
+    the nearest weights within `band` of the targets (the no-trade region): assets inside the band
+    are only adjusted to keep the budget, band=0 trades fully back to the targets. Costs are paid out
+    of the portfolio's wealth.
+
+    Args:
+    - holdings: shares (portfolios x assets, or one portfolio)
+    - prices: current prices, broadcastable to holdings
+    - target_weights: target weights, broadcastable to holdings
+    - threshold: drift that triggers a rebalance (0 rebalances every drifted portfolio)
+    - band: half-width of the no-trade region around the targets
+    - transaction_cost: proportional cost per unit of traded value
+
+    Returns:
+    - RebalanceResult (with the leading portfolio axis of holdings)
+    """
+    holdings = np.atleast_2d(np.asarray(holdings, dtype=float))
+    prices = np.broadcast_to(np.asarray(prices, dtype=float), holdings.shape)
+    target_weights = np.broadcast_to(np.asarray(target_weights, dtype=float), holdings.shape)
+
+    weights, drift, wealth = portfolio_drift(holdings, prices, target_weights)
+    rebalanced = np.max(np.abs(drift), axis=-1) > threshold
+
+    new_holdings = holdings.copy()
+    traded = np.zeros(len(holdings))
+    costs = np.zeros(len(holdings))
+    if rebalanced.any():
+        targets = target_weights[rebalanced]
+        if band:
+            new_weights = _project_to_band(weights[rebalanced], np.maximum(targets - band, 0), targets + band)
+        else:
+            new_weights = targets
+
+        values = holdings[rebalanced] * prices[rebalanced]
+        wealth = wealth[rebalanced]
+        traded[rebalanced] = np.abs(wealth[:, None] * new_weights - values).sum(axis=1)
+        costs[rebalanced] = transaction_cost * traded[rebalanced]
+        new_holdings[rebalanced] = (wealth - costs[rebalanced])[:, None] * new_weights / prices[rebalanced]
+
+    return RebalanceResult(new_holdings, traded, costs, rebalanced)
+
+
+def adjust_weights_based_on_price_change(new_optimal_weights, price, threshold=0.03, previous_price=None, band=0.0):
+    """
+    Weights of a portfolio after a price move, rebalanced if they drifted too far.
+
+    The shares are bought at `previous_price` with the target weights `new_optimal_weights`, revalued at
+    `price`, and traded back (to within `band`) when a weight drifts by more than `threshold`.
+    Works on one portfolio or on a (portfolios x assets) batch.
+
+    Args:
+    - new_optimal_weights: target weights
+    - price: current prices
+    - threshold: weight drift that triggers a rebalance
+    - previous_price (optional): prices the target weights were set at (no drift if None)
+    - band: half-width of the no-trade region around the targets
+
+    Returns:
+    - Portfolio weights after the move and any rebalance (same shape as new_optimal_weights)
+    """
+    target_weights = np.asarray(new_optimal_weights, dtype=float)
+    price = np.asarray(price, dtype=float)
+    previous_price = price if previous_price is None else np.asarray(previous_price, dtype=float)
+
+    holdings = holdings_from_weights(target_weights, previous_price)
+    result = rebalance_holdings(holdings, price, target_weights, threshold, band)
+    adjusted_weights, _, _ = portfolio_drift(result.holdings, price, target_weights)
+
+    return adjusted_weights.reshape(target_weights.shape)
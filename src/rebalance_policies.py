@@ -0,0 +1,141 @@
+'''
+Purpose: Evaluate rebalancing policies across all simulated price paths at once
+
+Each policy is run on every Monte Carlo path from `simulate_portfolio` simultaneously: holdings are
+a (paths x assets) share matrix, and at every time step the rebalance decision is a boolean mask over
+paths, so trades only touch the paths that rebalance. Policies are compared by the distribution of
+terminal wealth, turnover and transaction costs instead of one historical backtest.
+
+Policies:
+- calendar: rebalance every `period` steps (REBALANCE_PERIODS: 63 quarterly, 252 yearly); a period
+  at least as long as the paths never fires, so 'Yearly' on a one-year horizon is buy and hold (the
+  summary flags such policies with 'identical_to_buy_and_hold')
+- threshold: rebalance when any asset moves more than `threshold` in one step (the optimal_stopping_rule trigger)
+- drift: rebalance when any weight drifts more than `drift_threshold` from its target
+
+Trades go through rebalance.rebalance_holdings, so any policy can stop at the edge of a no-trade
+`band` around the targets instead of trading fully back.
+'''
+
+import numpy as np
+
+from precision import as_storage_array
+from rebalance import REBALANCE_PERIODS, holdings_from_weights, portfolio_drift, rebalance_holdings
+
+
+def evaluate_rebalancing_policy(prices, target_weights, period=None, threshold=None, drift_threshold=None, band=0.0,
+                                transaction_cost=0.001, initial_wealth=1.0):
+    """
+    Run one rebalancing policy on every simulated path.
+
+    Args:
+    - prices: simulated prices, shape (n_paths, n_steps, n_assets)
+    - target_weights: weights the portfolio is rebalanced to (also the initial allocation)
+    - period (int, optional): calendar rebalancing every `period` steps
+    - threshold (float, optional): rebalance when the largest one-step price change exceeds it
+    - drift_threshold (float, optional): rebalance when the largest weight drift exceeds it
+    - band: half-width of the no-trade region the trades stop at (0 trades back to the targets)
+    - transaction_cost: proportional cost per unit of traded value
+    - initial_wealth: starting portfolio value
+
+    With no trigger the policy is buy and hold.
+
+    Returns:
+    - dict of per-path arrays: 'terminal_wealth', 'turnover' (traded value over wealth, summed over
+      rebalances), 'costs' (transaction costs paid) and 'rebalances' (number of rebalances)
+    """
+    # float32 paths are read as they are; holdings and wealth accumulate in float64
+    prices = as_storage_array(prices)
+    target_weights = np.asarray(target_weights, dtype=float)
+    n_paths, n_steps, _ = prices.shape
+
+    holdings = holdings_from_weights(target_weights, prices[:, 0, :].astype(np.float64), np.full(n_paths, initial_wealth))
+    turnover = np.zeros(n_paths)
+    costs = np.zeros(n_paths)
+    rebalances = np.zeros(n_paths, dtype=int)
+
+    for t in range(1, n_steps):
+        price = prices[:, t, :]
+
+        if period is not None and t % period == 0:
+            rebalance = np.ones(n_paths, dtype=bool)
+        else:
+            rebalance = np.zeros(n_paths, dtype=bool)
+
+        if threshold is not None:
+            rebalance |= np.max(np.abs(price / prices[:, t - 1, :] - 1), axis=1) > threshold
+
+        if drift_threshold is not None:
+            _, drift, _ = portfolio_drift(holdings, price, target_weights)
+            rebalance |= np.max(np.abs(drift), axis=1) > drift_threshold
+
+        if not rebalance.any():
+            continue
+
+        # Trade the triggered paths (to the targets or the band edge), paying costs out of wealth
+        wealth = np.sum(holdings[rebalance] * price[rebalance], axis=1)
+        result = rebalance_holdings(holdings[rebalance], price[rebalance], target_weights, band=band, transaction_cost=transaction_cost)
+
+        holdings[rebalance] = result.holdings
+        turnover[rebalance] += result.traded / wealth
+        costs[rebalance] += result.costs
+        rebalances[rebalance] += result.rebalanced
+
+    return {
+        'terminal_wealth': np.sum(holdings * prices[:, -1, :], axis=1),
+        'turnover': turnover,
+        'costs': costs,
+        'rebalances': rebalances,
+    }
+
+
+def default_policies(threshold=0.1):
+    """
+    Return the standard policy set: buy and hold, the calendar frequencies and the price-change threshold
+    """
+    policies = {'Buy and hold': {}}
+    policies.update({frequency: {'period': period} for frequency, period in REBALANCE_PERIODS.items()})
+    policies[f'Threshold {threshold:.0%}'] = {'threshold': threshold}
+    return policies
+
+
+def compare_rebalancing_policies(prices, target_weights, policies=None, transaction_cost=0.001, quantiles=(0.05, 0.5, 0.95),
+                                 initial_wealth=1.0):
+    """
+    Evaluate several rebalancing policies on the same simulated paths and summarize each one.
+
+    Args:
+    - prices: simulated prices, shape (n_paths, n_steps, n_assets)
+    - target_weights: target portfolio weights
+    - policies (dict, optional): policy name -> keyword arguments of evaluate_rebalancing_policy
+      (default_policies() if None)
+    - transaction_cost: proportional transaction cost
+    - quantiles: terminal wealth quantiles to report
+    - initial_wealth: starting portfolio value (a policy's own 'initial_wealth' overrides it)
+
+    Returns:
+    - dict of policy name -> summary dict with the mean, standard deviation and quantiles of terminal
+      wealth, the probability of ending below the initial wealth, the mean turnover, costs and number
+      of rebalances, and 'identical_to_buy_and_hold' (True when the policy never rebalanced on any path,
+      e.g. a calendar period longer than the horizon)
+    """
+    policies = default_policies() if policies is None else policies
+
+    summary = {}
+    for name, policy in policies.items():
+        policy = {'transaction_cost': transaction_cost, 'initial_wealth': initial_wealth, **policy}
+        result = evaluate_rebalancing_policy(prices, target_weights, **policy)
+        wealth = result['terminal_wealth']
+
+        summary[name] = {
+            'mean_terminal_wealth': float(wealth.mean()),
+            'std_terminal_wealth': float(wealth.std()),
+            'terminal_wealth_quantiles': dict(zip(quantiles, np.quantile(wealth, quantiles).tolist())),
+            'probability_of_loss': float(np.mean(wealth < policy['initial_wealth'])),
+            'mean_turnover': float(result['turnover'].mean()),
+            'mean_costs': float(result['costs'].mean()),
+            'mean_rebalances': float(result['rebalances'].mean()),
+            'identical_to_buy_and_hold': not result['rebalances'].any(),
+        }
+
+    return summary
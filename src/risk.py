@@ -0,0 +1,132 @@
+'''
+Purpose: Vectorized risk analytics (VaR, CVaR, drawdown, Sharpe, Sortino) for many portfolios at once
+
+Every function works on a matrix of portfolio returns with one column per portfolio, obtained from
+a weights matrix (portfolios x assets) and the asset return matrix with a single matrix multiply.
+Quantiles use np.partition (O(T) per portfolio) instead of full sorts.
+
+Sign convention: VaR and CVaR are reported as returns (negative values are losses), matching the
+historical VaR of the API (np.percentile(portfolio_returns, 5)).
+
+float32 return matrices (mixed precision policy) are processed in float32; means, variances,
+compounding and quantile interpolation accumulate in float64 and the metrics are float64.
+'''
+
+import numpy as np
+from precision import as_storage_array
+
+def portfolio_return_matrix(weights, returns):
+    """
+    Return the portfolio returns for every portfolio (T x n_portfolios)
+
+    Args:
+    - weights: portfolio weights, shape (n_portfolios, n_assets) or (n_assets,)
+    - returns: asset returns (T x n_assets), e.g. `get_return` output
+    """
+    returns = as_storage_array(returns)
+    return returns @ np.atleast_2d(np.asarray(weights, dtype=float)).T.astype(returns.dtype)
+
+def _lower_tail(portfolio_returns, alpha):
+    # Order statistics around the (1 - alpha) quantile, without sorting whole columns
+    n_obs = portfolio_returns.shape[0]
+    position = (1 - alpha) * (n_obs - 1)
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+    partitioned = np.partition(portfolio_returns, [lower, upper], axis=0)
+    return partitioned, lower, upper, position
+
+def historical_var(portfolio_returns, alpha=0.95):
+    """
+    Return the historical VaR of each column (the (1 - alpha) quantile, linear interpolation as np.percentile)
+    """
+    partitioned, lower, upper, position = _lower_tail(as_storage_array(portfolio_returns), alpha)
+    lower_value, upper_value = partitioned[lower].astype(np.float64), partitioned[upper].astype(np.float64)
+    return lower_value + (position - lower) * (upper_value - lower_value)
+
+def historical_cvar(portfolio_returns, alpha=0.95):
+    """
+    Return the historical CVaR (expected shortfall) of each column: the mean of the returns at or below the VaR
+    """
+    portfolio_returns = as_storage_array(portfolio_returns)
+    n_tail = max(1, int(np.ceil((1 - alpha) * portfolio_returns.shape[0] - 1e-9)))
+    tail = np.partition(portfolio_returns, n_tail - 1, axis=0)[:n_tail]
+    return tail.mean(axis=0, dtype=np.float64)
+
+def _normal_quantile(alpha):
+    from scipy.special import ndtri
+    return ndtri(1 - alpha)
+
+def parametric_var(portfolio_returns, alpha=0.95):
+    """
+    Return the Gaussian (variance-covariance) VaR of each column
+    """
+    portfolio_returns = as_storage_array(portfolio_returns)
+    return portfolio_returns.mean(axis=0, dtype=np.float64) + _normal_quantile(alpha) * portfolio_returns.std(axis=0, ddof=1, dtype=np.float64)
+
+def cornish_fisher_var(portfolio_returns, alpha=0.95):
+    """
+    Return the Cornish-Fisher (modified) VaR of each column, adjusting the Gaussian quantile for skewness and excess kurtosis
+    """
+    portfolio_returns = as_storage_array(portfolio_returns)
+    mean = portfolio_returns.mean(axis=0, dtype=np.float64)
+    std = portfolio_returns.std(axis=0, ddof=1, dtype=np.float64)
+
+    standardized = (portfolio_returns - mean.astype(portfolio_returns.dtype)) / np.where(std > 0, std, 1).astype(portfolio_returns.dtype)
+    skewness = np.mean(standardized**3, axis=0, dtype=np.float64)
+    excess_kurtosis = np.mean(standardized**4, axis=0, dtype=np.float64) - 3
+
+    z = _normal_quantile(alpha)
+    z_cf = (z + (z**2 - 1) * skewness / 6 + (z**3 - 3 * z) * excess_kurtosis / 24
+            - (2 * z**3 - 5 * z) * skewness**2 / 36)
+    return mean + z_cf * std
+
+def max_drawdown(portfolio_returns):
+    """
+    Return the maximum drawdown of each column (a negative fraction of the running peak)
+    """
+    # Compounding accumulates in float64 whatever the storage precision
+    wealth = np.cumprod(1 + as_storage_array(portfolio_returns), axis=0, dtype=np.float64)
+    running_peak = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=0)
+    return np.min(wealth / running_peak - 1, axis=0)
+
+def sharpe_ratio(portfolio_returns, risk_free_rate=0):
+    """
+    Return the Sharpe ratio of each column (per period, same convention as utils.calculate_sharpe_ratio)
+    """
+    portfolio_returns = as_storage_array(portfolio_returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (portfolio_returns.mean(axis=0, dtype=np.float64) - risk_free_rate) / portfolio_returns.std(axis=0, ddof=1, dtype=np.float64)
+
+def sortino_ratio(portfolio_returns, risk_free_rate=0):
+    """
+    Return the Sortino ratio of each column: excess return over the downside deviation
+    """
+    portfolio_returns = as_storage_array(portfolio_returns)
+    downside = np.minimum(portfolio_returns - portfolio_returns.dtype.type(risk_free_rate), 0)
+    downside_deviation = np.sqrt(np.mean(downside**2, axis=0, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (portfolio_returns.mean(axis=0, dtype=np.float64) - risk_free_rate) / downside_deviation
+
+def risk_metrics(weights, returns, alpha=0.95, risk_free_rate=0):
+    """
+    Compute every risk metric for many portfolios with one matrix multiply.
+
+    Args:
+    - weights: portfolio weights, shape (n_portfolios, n_assets) or (n_assets,)
+    - returns: asset returns (T x n_assets)
+    - alpha: confidence level of the VaR/CVaR
+    - risk_free_rate: per-period risk-free rate for the Sharpe and Sortino ratios
+
+    Returns:
+    - dict of metric name -> array with one value per portfolio
+    """
+    portfolio_returns = portfolio_return_matrix(weights, returns)
+
+    return {
+        'historical_var': historical_var(portfolio_returns, alpha),
+        'historical_cvar': historical_cvar(portfolio_returns, alpha),
+        'parametric_var': parametric_var(portfolio_returns, alpha),
+        'cornish_fisher_var': cornish_fisher_var(portfolio_returns, alpha),
+        'max_drawdown': max_drawdown(portfolio_returns),
+        'sharpe_ratio': sharpe_ratio(portfolio_returns, risk_free_rate),
+        'sortino_ratio': sortino_ratio(portfolio_returns, risk_free_rate),
+    }
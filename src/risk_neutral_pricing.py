@@ -2,7 +2,6 @@
 purpose: implement Risk-Neutral Pricing for derivative options
 '''
 
-from scipy.stats import norm
 import numpy as np
 
 
@@ -25,6 +24,9 @@ def risk_neutral_price(S0, K, T, r, sigma, option_type='call'):
     if option_type not in ['call', 'put']:
         raise ValueError("option_type must be either 'call' or 'put'.")
 
+    # scipy.stats is slow to import, so load it only when an option is actually priced
+    from scipy.stats import norm
+
     # Calculate d1 and d2 for the Black-Scholes formula
     d1 = (np.log(S0 / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
     d2 = d1 - sigma * np.sqrt(T)
@@ -35,4 +37,53 @@ def risk_neutral_price(S0, K, T, r, sigma, option_type='call'):
     elif option_type == 'put':
         price = (K * np.exp(-r * T) * norm.cdf(-d2) - S0 * norm.cdf(-d1))
     
-    return price
\ No newline at end of file
+    return price
+
+def black_scholes(S0, K, T, r, sigma, is_call=True):
+    """
+    Vectorized Black-Scholes price and Greeks for many European options at once.
+
+    All arguments broadcast against each other (scalars or arrays). Contracts with a non-positive
+    price, strike, maturity or volatility get NaN instead of raising, so one bad quote does not
+    abort a whole chain.
+
+    Args:
+    - S0: underlying prices
+    - K: strike prices
+    - T: times to maturity in years
+    - r: risk-free interest rate
+    - sigma: volatilities of the underlying
+    - is_call: True for calls, False for puts
+
+    Returns:
+    - dict of arrays: 'price', 'delta', 'gamma', 'vega', 'theta' (per year), 'rho'
+    """
+    from scipy.special import ndtr
+
+    S0, K, T, r, sigma, is_call = np.broadcast_arrays(np.asarray(S0, dtype=float), np.asarray(K, dtype=float),
+                                                      np.asarray(T, dtype=float), np.asarray(r, dtype=float),
+                                                      np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool))
+
+    valid = (S0 > 0) & (K > 0) & (T > 0) & (sigma > 0)
+    S0, K, T, sigma = (np.where(valid, x, 1.0) for x in (S0, K, T, sigma))
+
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(S0 / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    discounted_strike = K * np.exp(-r * T)
+    density = np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi)
+
+    # Puts through the reflected arguments: N(-d) and sign -1
+    sign = np.where(is_call, 1.0, -1.0)
+    N1, N2 = ndtr(sign * d1), ndtr(sign * d2)
+
+    greeks = {
+        'price': sign * (S0 * N1 - discounted_strike * N2),
+        'delta': sign * N1,
+        'gamma': density / (S0 * sigma * sqrt_T),
+        'vega': S0 * density * sqrt_T,
+        'theta': -S0 * density * sigma / (2 * sqrt_T) - sign * r * discounted_strike * N2,
+        'rho': sign * K * T * np.exp(-r * T) * N2,
+    }
+
+    return {name: np.where(valid, value, np.nan) for name, value in greeks.items()}
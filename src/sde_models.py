@@ -0,0 +1,335 @@
+'''
+Purpose: Price path models beyond constant-parameter GBM (jumps, stochastic volatility, regimes)
+
+Every model returns prices with the shape of `simulate_portfolio`, (n_simulations, n_steps, n_assets),
+so the paths feed the same valuation and statistics pipeline (simulation_value, rebalancing policies,
+risk metrics, CVaR). Paths start at the initial prices and are vectorized over paths and assets: only
+the time recursion of Heston and of the regime chain is a Python loop, and the random draws (jump
+counts and sizes, regime transitions) are made for all paths in one batch.
+
+- Merton jump-diffusion: GBM plus compound Poisson jumps with normal log sizes
+- Heston: mean-reverting stochastic variance (full-truncation Euler scheme)
+- Markov regime-switching GBM: regime-dependent mean and covariance, fitted from `get_return` output
+  with the EM (Baum-Welch) algorithm
+
+simulate_portfolio(..., model=...) (or RunConfig.model) dispatches to these models through SDE_MODELS,
+so every pipeline (API, CLI, batch) can simulate with them.
+'''
+
+import time
+import numpy as np
+from typing import NamedTuple
+
+from simulations import correlated_normals, simulate_portfolio
+
+
+def _log_prices(initial_asset_prices, log_returns):
+    # Prices at t = 0, dt, ..., (n_steps - 1) dt from the per-step log returns of the last n_steps - 1 steps
+    log_paths = np.zeros(log_returns.shape[:1] + (log_returns.shape[1] + 1,) + log_returns.shape[2:])
+    np.cumsum(log_returns, axis=1, out=log_paths[:, 1:])
+    return np.asarray(initial_asset_prices, dtype=float) * np.exp(log_paths)
+
+
+def simulate_merton_jump_diffusion(initial_asset_prices, mu_annualized, sigma_annualized, time_step=1/252, n_simulations=1000, n_steps=252,
+                                   jump_intensity=1.0, jump_mean=-0.05, jump_std=0.1, correlation_matrix=None, seed=42):
+    """
+    Simulate Merton jump-diffusion paths.
+
+        dS/S = (mu - lambda * k) dt + sigma dW + (e^J - 1) dN,   J ~ N(jump_mean, jump_std^2),  k = E[e^J - 1]
+
+    The drift is compensated, so the expected growth is still mu. Jump counts of every path, step and asset
+    are drawn in one Poisson batch, and the sum of n normal jump sizes is drawn as one normal with n times
+    the variance.
+
+    Args:
+    - initial_asset_prices, mu_annualized, sigma_annualized: as for simulate_portfolio
+    - time_step, n_simulations, n_steps: time grid and number of paths
+    - jump_intensity: expected jumps per year (scalar or per asset)
+    - jump_mean, jump_std: mean and standard deviation of the log jump size (scalars or per asset)
+    - correlation_matrix (optional): correlation of the diffusion shocks (jumps are independent)
+    - seed: seed of the path generator
+
+    Returns:
+    - Simulated prices, shape (n_simulations, n_steps, n_assets)
+    """
+    mu_annualized, sigma_annualized = np.asarray(mu_annualized, dtype=float), np.asarray(sigma_annualized, dtype=float)
+    n_assets = len(mu_annualized)
+    random_state = np.random.RandomState(seed)
+    shape = (n_simulations, n_steps - 1, n_assets)
+
+    diffusion = correlated_normals(n_simulations, n_steps - 1, n_assets, correlation_matrix, random_state)
+    jump_counts = random_state.poisson(np.broadcast_to(jump_intensity * time_step, n_assets), size=shape)
+    jumps = jump_counts * jump_mean + np.sqrt(jump_counts) * jump_std * random_state.normal(0, 1, shape)
+
+    compensator = jump_intensity * (np.exp(jump_mean + 0.5 * np.asarray(jump_std)**2) - 1)
+    drift = (mu_annualized - 0.5 * sigma_annualized**2 - compensator) * time_step
+
+    return _log_prices(initial_asset_prices, drift + sigma_annualized * np.sqrt(time_step) * diffusion + jumps)
+
+
+def simulate_heston(initial_asset_prices, mu_annualized, sigma_annualized, time_step=1/252, n_simulations=1000, n_steps=252,
+                    kappa=2.0, theta=None, vol_of_vol=0.3, rho=-0.7, initial_variance=None, correlation_matrix=None, seed=42):
+    """
+    Simulate Heston stochastic volatility paths (full-truncation Euler scheme).
+
+        dS/S = mu dt + sqrt(v) dW_S,   dv = kappa (theta - v) dt + vol_of_vol sqrt(v) dW_v,   d<W_S, W_v> = rho dt
+
+    Args:
+    - initial_asset_prices, mu_annualized, sigma_annualized: as for simulate_portfolio
+    - time_step, n_simulations, n_steps: time grid and number of paths
+    - kappa: speed of mean reversion of the variance
+    - theta: long-run variance (sigma_annualized**2 by default)
+    - vol_of_vol: volatility of the variance
+    - rho: correlation between price and variance shocks (negative for the leverage effect)
+    - initial_variance: starting variance (theta by default)
+    - correlation_matrix (optional): correlation of the price shocks across assets
+    - seed: seed of the path generator
+
+    All model parameters are scalars or per-asset arrays.
+
+    Returns:
+    - Simulated prices, shape (n_simulations, n_steps, n_assets)
+    """
+    mu_annualized, sigma_annualized = np.asarray(mu_annualized, dtype=float), np.asarray(sigma_annualized, dtype=float)
+    n_assets = len(mu_annualized)
+    theta = sigma_annualized**2 if theta is None else np.asarray(theta, dtype=float)
+    variance = np.broadcast_to(theta if initial_variance is None else initial_variance, (n_simulations, n_assets)).astype(float)
+    random_state = np.random.RandomState(seed)
+
+    price_shocks = correlated_normals(n_simulations, n_steps - 1, n_assets, correlation_matrix, random_state)
+    variance_shocks = rho * price_shocks + np.sqrt(1 - np.asarray(rho)**2) * random_state.normal(0, 1, price_shocks.shape)
+
+    log_returns = np.empty_like(price_shocks)
+    sqrt_dt = np.sqrt(time_step)
+    for t in range(n_steps - 1):
+        # Full truncation: negative variances are used as zero in the drift and diffusion terms
+        positive_variance = np.maximum(variance, 0)
+        volatility = np.sqrt(positive_variance)
+        log_returns[:, t] = (mu_annualized - 0.5 * positive_variance) * time_step + volatility * sqrt_dt * price_shocks[:, t]
+        variance = variance + kappa * (theta - positive_variance) * time_step + vol_of_vol * volatility * sqrt_dt * variance_shocks[:, t]
+
+    return _log_prices(initial_asset_prices, log_returns)
+
+
+class RegimeSwitchingModel(NamedTuple):
+    """
+    Gaussian Markov regime-switching model of daily log returns.
+
+    Fields:
+    - transition_matrix: (k x k) regime transition probabilities (rows sum to 1)
+    - means: (k x n) mean daily log return of each asset in each regime
+    - covariances: (k x n x n) daily log return covariance in each regime
+    - initial_probabilities: (k,) regime probabilities at the start of the sample
+    - current_probabilities: (k,) filtered regime probabilities at the last observation
+    - log_likelihood: log likelihood of the fitted sample
+    """
+    transition_matrix: np.ndarray
+    means: np.ndarray
+    covariances: np.ndarray
+    initial_probabilities: np.ndarray
+    current_probabilities: np.ndarray
+    log_likelihood: float
+
+
+def _regime_log_densities(X, means, covariances):
+    # log N(x_t; mean_k, cov_k) for every observation and regime, shape (T x k)
+    n_obs, n_assets = X.shape
+    log_densities = np.empty((n_obs, len(means)))
+    for k, (mean, covariance) in enumerate(zip(means, covariances)):
+        L = np.linalg.cholesky(covariance)
+        standardized = np.linalg.solve(L, (X - mean).T)
+        log_densities[:, k] = -0.5 * (np.sum(standardized**2, axis=0) + n_assets * np.log(2 * np.pi)) - np.sum(np.log(np.diag(L)))
+    return log_densities
+
+
+def fit_regime_switching(returns, n_regimes=2, max_iter=200, tolerance=1e-6):
+    """
+    Fit a Markov regime-switching Gaussian model to daily returns with the EM (Baum-Welch) algorithm.
+
+    Args:
+    - returns: daily simple returns (T x n_assets), e.g. `get_return` output; the model is fitted on log returns
+    - n_regimes: number of regimes
+    - max_iter: iteration limit of EM
+    - tolerance: stop when the log likelihood improves by less than this
+
+    Returns:
+    - RegimeSwitchingModel, regimes ordered from the lowest to the highest volatility
+    """
+    X = np.log1p(np.asarray(returns, dtype=float))
+    n_obs, n_assets = X.shape
+    ridge = 1e-10 * np.eye(n_assets)
+
+    # Start from a split of the days by the size of their equal-weight move (calm to turbulent)
+    order = np.argsort(np.abs(X.mean(axis=1) - X.mean()))
+    groups = np.array_split(order, n_regimes)
+    means = np.array([X[group].mean(axis=0) for group in groups])
+    covariances = np.array([np.cov(X[group], rowvar=False).reshape(n_assets, n_assets) + ridge for group in groups])
+    transition_matrix = np.full((n_regimes, n_regimes), 0.05 / max(n_regimes - 1, 1)) + np.eye(n_regimes) * (0.95 - 0.05 / max(n_regimes - 1, 1))
+    initial_probabilities = np.full(n_regimes, 1 / n_regimes)
+
+    previous_log_likelihood = -np.inf
+    for _ in range(max_iter):
+        # E-step: scaled forward-backward recursions
+        log_densities = _regime_log_densities(X, means, covariances)
+        offsets = log_densities.max(axis=1)
+        densities = np.exp(log_densities - offsets[:, None])
+
+        alpha = np.empty((n_obs, n_regimes))
+        scale = np.empty(n_obs)
+        alpha[0] = initial_probabilities * densities[0]
+        scale[0] = alpha[0].sum()
+        alpha[0] /= scale[0]
+        for t in range(1, n_obs):
+            alpha[t] = (alpha[t - 1] @ transition_matrix) * densities[t]
+            scale[t] = alpha[t].sum()
+            alpha[t] /= scale[t]
+
+        beta = np.ones((n_obs, n_regimes))
+        for t in range(n_obs - 2, -1, -1):
+            beta[t] = transition_matrix @ (densities[t + 1] * beta[t + 1]) / scale[t + 1]
+
+        gamma = alpha * beta
+        gamma /= gamma.sum(axis=1, keepdims=True)
+        transitions = transition_matrix * (alpha[:-1].T @ (densities[1:] * beta[1:] / scale[1:, None]))
+
+        log_likelihood = float(np.sum(np.log(scale)) + np.sum(offsets))
+
+        # M-step
+        initial_probabilities = gamma[0]
+        transition_matrix = transitions / transitions.sum(axis=1, keepdims=True)
+        weights = gamma / gamma.sum(axis=0)
+        means = weights.T @ X
+        covariances = np.array([(weights[:, k, None] * (X - means[k])).T @ (X - means[k]) + ridge for k in range(n_regimes)])
+
+        if log_likelihood - previous_log_likelihood < tolerance:
+            break
+        previous_log_likelihood = log_likelihood
+
+    # Order the regimes by total variance, so regime 0 is the calm one
+    order = np.argsort([np.trace(covariance) for covariance in covariances])
+    return RegimeSwitchingModel(transition_matrix[np.ix_(order, order)], means[order], covariances[order],
+                                initial_probabilities[order], alpha[-1][order], log_likelihood)
+
+
+def simulate_regime_switching(initial_asset_prices, model, n_simulations=1000, n_steps=252, seed=42, return_regimes=False):
+    """
+    Simulate regime-switching GBM paths from a fitted RegimeSwitchingModel.
+
+    Every path starts from the filtered regime probabilities at the end of the fitted sample. The regime
+    chains of all paths advance together with one batch of uniforms, then each regime's correlated log
+    returns are drawn for all (path, step) cells in that regime at once.
+
+    Args:
+    - initial_asset_prices: prices at t = 0
+    - model: RegimeSwitchingModel (see fit_regime_switching), in daily units
+    - n_simulations, n_steps: number of paths and of daily steps
+    - seed: seed of the path generator
+    - return_regimes: also return the simulated regimes (n_simulations x (n_steps - 1))
+
+    Returns:
+    - Simulated prices, shape (n_simulations, n_steps, n_assets) (and the regimes if requested)
+    """
+    random_state = np.random.RandomState(seed)
+    n_regimes, n_assets = model.means.shape
+
+    # Batched regime chains: one uniform per path and step, inverted through the cumulative transition rows
+    cumulative_transitions = np.cumsum(model.transition_matrix, axis=1)
+    uniforms = random_state.random_sample((n_simulations, n_steps - 1))
+    regimes = np.empty((n_simulations, n_steps - 1), dtype=int)
+    regime = np.minimum(np.searchsorted(np.cumsum(model.current_probabilities), random_state.random_sample(n_simulations)), n_regimes - 1)
+    for t in range(n_steps - 1):
+        regime = np.minimum((uniforms[:, t, None] > cumulative_transitions[regime]).sum(axis=1), n_regimes - 1)
+        regimes[:, t] = regime
+
+    shocks = random_state.normal(0, 1, (n_simulations, n_steps - 1, n_assets))
+    log_returns = np.empty_like(shocks)
+    for k in range(n_regimes):
+        in_regime = regimes == k
+        L = np.linalg.cholesky(model.covariances[k])
+        log_returns[in_regime] = shocks[in_regime] @ L.T + model.means[k]
+
+    prices = _log_prices(initial_asset_prices, log_returns)
+    return (prices, regimes) if return_regimes else prices
+
+
+def _simulate_fitted_regime_switching(initial_asset_prices, mu_annualized, sigma_annualized, time_step=1/252, n_simulations=1000, n_steps=252,
+                                      correlation_matrix=None, seed=42, returns=None, model=None, n_regimes=2):
+    # Pipeline entry of the regime-switching model: fitted to the historical returns unless a fitted model is given
+    # (its moments are daily, so mu, sigma, the correlation and the time step are not used)
+    if model is None:
+        if returns is None:
+            raise ValueError("The 'regime_switching' model needs historical returns (or a fitted model) to fit its regimes.")
+        model = fit_regime_switching(returns, n_regimes)
+    return simulate_regime_switching(initial_asset_prices, model, n_simulations, n_steps, seed)
+
+
+# Path models selectable with simulate_portfolio(model=...) besides the default 'gbm'
+SDE_MODELS = {
+    'merton': simulate_merton_jump_diffusion,
+    'heston': simulate_heston,
+    'regime_switching': _simulate_fitted_regime_switching,
+}
+
+
+def simulate_sde_model(model, initial_asset_prices, mu_annualized, sigma_annualized, time_step=1/252, n_simulations=1000, n_steps=252,
+                       correlation_matrix=None, seed=42, returns=None, **parameters):
+    """
+    Simulate paths with one of the SDE_MODELS.
+
+    Args:
+    - model: 'merton', 'heston' or 'regime_switching'
+    - initial_asset_prices, mu_annualized, sigma_annualized, time_step, n_simulations, n_steps, correlation_matrix, seed:
+      as for simulate_portfolio
+    - returns (optional): historical daily returns, to fit the regime-switching model
+    - parameters: model settings (e.g. jump_intensity, kappa, or a fitted regime model as `model`)
+
+    Returns:
+    - Simulated prices, shape (n_simulations, n_steps, n_assets)
+    """
+    if model not in SDE_MODELS:
+        raise ValueError(f"Unknown simulation model {model!r}; use 'gbm' or one of {sorted(SDE_MODELS)}.")
+    if model == 'regime_switching':
+        parameters['returns'] = returns
+
+    return SDE_MODELS[model](initial_asset_prices, mu_annualized, sigma_annualized, time_step=time_step, n_simulations=n_simulations,
+                             n_steps=n_steps, correlation_matrix=correlation_matrix, seed=seed, **parameters)
+
+
+def benchmark_sde_models(n_simulations=2000, n_steps=252, n_assets=10, seed=0):
+    """
+    Time every model on the same problem.
+
+    Returns:
+    - dict of model name -> seconds per simulated path
+    """
+    rng = np.random.default_rng(seed)
+    S0 = np.full(n_assets, 100.0)
+    mu = rng.uniform(0.02, 0.12, n_assets)
+    sigma = rng.uniform(0.1, 0.4, n_assets)
+    A = rng.normal(size=(n_assets, n_assets))
+    covariance = A @ A.T + n_assets * np.eye(n_assets)
+    correlation = covariance / np.sqrt(np.outer(np.diag(covariance), np.diag(covariance)))
+
+    # A regime model in daily units: calm and turbulent states
+    daily_covariance = np.outer(sigma, sigma) * correlation / 252
+    model = RegimeSwitchingModel(np.array([[0.98, 0.02], [0.05, 0.95]]), np.vstack([mu / 252, -mu / 252]),
+                                 np.stack([daily_covariance, 4 * daily_covariance]), np.array([0.5, 0.5]), np.array([1.0, 0.0]), 0.0)
+
+    models = {
+        'gbm': lambda: simulate_portfolio(n_assets, S0, mu, sigma, 1, 1 / 252, n_simulations, n_steps, correlation),
+        'merton': lambda: simulate_merton_jump_diffusion(S0, mu, sigma, 1 / 252, n_simulations, n_steps, correlation_matrix=correlation),
+        'heston': lambda: simulate_heston(S0, mu, sigma, 1 / 252, n_simulations, n_steps, correlation_matrix=correlation),
+        'regime_switching': lambda: simulate_regime_switching(S0, model, n_simulations, n_steps),
+    }
+
+    timings = {}
+    for name, simulate in models.items():
+        start = time.perf_counter()
+        simulate()
+        timings[name] = (time.perf_counter() - start) / n_simulations
+    return timings
+
+
+if __name__ == '__main__':
+    for name, seconds in benchmark_sde_models().items():
+        print(f"{name}: {seconds * 1e6:.1f} µs per path")
@@ -2,24 +2,29 @@
 Purpose: Implement Monte Carlo simulations to simulate future assets price paths
 '''
 import numpy as np
-import matplotlib.pyplot as plt
+from quasi_monte_carlo import sobol_normals
+from precision import storage_dtype
 
-def simulation_value(size_assets, simulated_paths_prices,time_horizon, n_simulations=1000, n_steps=252, plot=False):
+# Paths drawn per batch, bounding the float64 scratch memory of float32 simulations
+DRAW_CHUNK_SIZE = 256
+
+def simulation_value(size_assets, simulated_paths_prices,time_horizon=None, n_simulations=1000, n_steps=252, plot=False, config=None, save_path=None):
+
+    # A run configuration supplies the horizon and path counts of its own simulation
+    if config is not None:
+        time_horizon, n_simulations, n_steps = config.time_horizon, config.n_simulations, config.n_steps
     
     # Initial portfolio weights (equal allocation for each asset)
-    portfolio_weights = np.array([1/size_assets] * size_assets)
+    portfolio_weights = np.array([1/size_assets] * size_assets).astype(simulated_paths_prices.dtype)
 
-    # Simulate portfolio values for each path
-    portfolio_values = np.zeros((n_simulations, n_steps))
-
-    # Calculate the portfolio value at each time step for each simulated path
-    for i in range(n_simulations):
-        portfolio_values[i, 0] = 1  # Initial portfolio value (normalized to 1)
-        for t in range(1, n_steps):
-            # Portfolio value is the weighted sum of the asset prices at time t
-            portfolio_values[i, t] = np.sum(portfolio_weights * simulated_paths_prices[i, t, :]) / np.sum(portfolio_weights * simulated_paths_prices[i, 0, :])
+    # Portfolio value is the weighted sum of the asset prices at time t, normalized to 1 at t=0
+    weighted_prices = simulated_paths_prices[:n_simulations, :n_steps, :] @ portfolio_weights
+    portfolio_values = weighted_prices / weighted_prices[:, :1]
 
     if(plot): 
+        # Plotting backend is imported lazily so headless callers never pay for matplotlib
+        import matplotlib.pyplot as plt
+
         # Plot portfolio values over time (for a few paths)
         plt.figure(figsize=(10, 6))
         for i in range(10):  # Plotting first 10 portfolio values
@@ -27,11 +32,97 @@ def simulation_value(size_assets, simulated_paths_prices,time_horizon, n_simulat
         plt.title("Simulated Portfolio Values Over Time")
         plt.xlabel("Time (Years)")
         plt.ylabel("Portfolio Value")
-        plt.show()
+        if save_path is None:
+            plt.show()
+        else:
+            # Headless runs write the figure to a file instead of opening a (blocking) window
+            plt.savefig(save_path)
+            plt.close()
 
     return portfolio_values[:10]
 
-def simulate_portfolio(assets_size, initial_asset_prices, mu_annualized, sigma_annualized, time_horizon,  time_step, n_simulations=1000, n_steps=252):
+def _draw_normals(random_state, shape, dtype):
+    # Same stream as one random_state.normal(0, 1, shape) call, converted batch by batch of paths
+    if dtype == np.float64:
+        return random_state.normal(0, 1, shape)
+
+    Z = np.empty(shape, dtype=dtype)
+    for start in range(0, shape[0], DRAW_CHUNK_SIZE):
+        stop = min(start + DRAW_CHUNK_SIZE, shape[0])
+        Z[start:stop] = random_state.normal(0, 1, (stop - start,) + shape[1:])
+    return Z
+
+def standard_shocks(n_simulations, n_steps, assets_size, n_factors=0, random_state=None, sampling='pseudo', dtype=np.float64):
+    """
+    Draw the uncorrelated standard normal shocks of correlated_normals, as one (n_simulations, n_steps,
+    assets_size + n_factors) array: the asset shocks, then the factor shocks of a factor model.
+
+    The values are those correlated_normals draws from the same random_state, so they can be drawn
+    once, cached (see noise_cache.py) and handed back to it through its `shocks` argument.
+    """
+    dtype = np.dtype(dtype)
+    random_state = np.random if random_state is None else random_state
+
+    if sampling == 'qmc':
+        return sobol_normals(n_simulations, n_steps, assets_size + n_factors, random_state).astype(dtype, copy=False)
+    if sampling != 'pseudo':
+        raise ValueError("sampling must be either 'pseudo' or 'qmc'.")
+
+    shocks = np.empty((n_simulations, n_steps, assets_size + n_factors), dtype=dtype)
+    shocks[..., :assets_size] = _draw_normals(random_state, (n_simulations, n_steps, assets_size), dtype)
+    if n_factors:
+        shocks[..., assets_size:] = _draw_normals(random_state, (n_simulations, n_steps, n_factors), dtype)
+    return shocks
+
+def correlated_normals(n_simulations, n_steps, assets_size, correlation_matrix=None, random_state=None, sampling='pseudo', dtype=np.float64,
+                       shocks=None):
+    """
+    Draw standard normal shocks of shape (n_simulations, n_steps, assets_size), optionally correlated across assets.
+
+    Parameters:
+    - correlation_matrix (optional): dense correlation matrix (Cholesky factor is applied), or a structured
+      factor model exposing `loadings` and `specific_variance` in correlation units (O(n*k) per draw).
+    - random_state (optional): np.random.RandomState to draw from (the global numpy generator if None)
+    - sampling (optional): 'pseudo' (pseudo-random) or 'qmc' (scrambled Sobol with Brownian bridge ordering)
+    - dtype (optional): dtype of the returned shocks (float32 under the mixed precision policy)
+    - shocks (optional): pre-drawn standard_shocks output to correlate instead of drawing; it is only
+      read (without a correlation matrix a view of it is returned)
+    """
+    dtype = np.dtype(dtype)
+    random_state = np.random if random_state is None else random_state
+    n_factors = correlation_matrix.loadings.shape[1] if hasattr(correlation_matrix, 'loadings') else 0
+
+    if shocks is not None:
+        Z, F = shocks[..., :assets_size], shocks[..., assets_size:]
+    elif sampling == 'qmc':
+        # One low-discrepancy block covering the asset and the factor shocks
+        shocks = sobol_normals(n_simulations, n_steps, assets_size + n_factors, random_state).astype(dtype, copy=False)
+        Z, F = shocks[..., :assets_size], shocks[..., assets_size:]
+    elif sampling == 'pseudo':
+        Z = _draw_normals(random_state, (n_simulations, n_steps, assets_size), dtype)
+        F = _draw_normals(random_state, (n_simulations, n_steps, n_factors), dtype) if n_factors else None
+    else:
+        raise ValueError("sampling must be either 'pseudo' or 'qmc'.")
+
+    if correlation_matrix is None:
+        return Z
+
+    if n_factors:
+        # Factor model: common factor shocks plus scaled idiosyncratic shocks
+        loadings = np.asarray(correlation_matrix.loadings).T.astype(dtype)
+        return F @ loadings + Z * np.sqrt(correlation_matrix.specific_variance).astype(dtype)
+
+    correlation_matrix = np.asarray(correlation_matrix, dtype=float)
+    try:
+        L = np.linalg.cholesky(correlation_matrix)
+    except np.linalg.LinAlgError:
+        # Singular sample correlation (e.g. more assets than observations): add a tiny ridge
+        L = np.linalg.cholesky(correlation_matrix + 1e-8 * np.eye(assets_size))
+
+    return Z @ L.T.astype(dtype)
+
+def simulate_portfolio(assets_size, initial_asset_prices, mu_annualized, sigma_annualized, time_horizon=None,  time_step=None, n_simulations=1000, n_steps=252, correlation_matrix=None,
+                       seed=42, config=None, sampling='pseudo', precision='double', noise_cache=None, model='gbm', model_parameters=None, returns=None):
     """
     Simulate multiple price paths for a portfolio of assets using geometric Brownian motion.
 
@@ -49,23 +140,66 @@ def simulate_portfolio(assets_size, initial_asset_prices, mu_annualized, sigma_a
     - time_step (int): Number of time steps per year for the simulation.
     - n_simulations (int, optional): Number of simulations to run (default is 1000).
     - n_steps (int, optional): Number of steps per year (default is 252, assuming daily steps in a year).
+    - correlation_matrix (optional): Correlation between assets (dense or factor model); independent draws if None.
+    - seed (int, optional): Seed of the simulation's own random generator (default is 42).
+    - config (RunConfig, optional): Run configuration; when given, its time_horizon, time_step, n_simulations,
+      n_steps, seed and sampling are used instead of the arguments above.
+    - sampling (str, optional): 'pseudo' (default) or 'qmc' for scrambled Sobol shocks with Brownian bridge
+      ordering; QMC reaches the precision of pseudo-random sampling on the mean and VaR with far fewer paths
+      (use a power of 2 for n_simulations, and quasi_monte_carlo.qmc_estimate over seeds for error bars).
+    - precision (str, optional): 'double' (default) or 'mixed' to generate and return the paths in float32,
+      halving their memory (see precision.py).
+    - noise_cache (NoiseCache, optional): read the standard normal shocks from this cache instead of drawing
+      them; runs with the same seed, sampling, precision and shape then share one buffer (see noise_cache.py)
+    - model (str, optional): 'gbm' (default, this function's geometric Brownian motion), or 'merton', 'heston' or
+      'regime_switching' to simulate with sde_models (pseudo-random shocks; noise_cache and sampling are not used).
+    - model_parameters (dict, optional): settings of the model, e.g. {'jump_intensity': 2.0} (see sde_models).
+    - returns (optional): historical daily returns, fitted by the 'regime_switching' model.
 
     Returns:
     - simulated_prices (array): Simulated asset price paths, with shape (n_simulations, n_steps, assets_size).
     """
 
-    # Simulate the price paths for each asset
-    simulated_prices = np.zeros((n_simulations, n_steps, assets_size))
+    if config is not None:
+        time_horizon, time_step, n_simulations, n_steps, seed = config.time_horizon, config.time_step, config.n_simulations, config.n_steps, config.seed
+        sampling, precision, model = config.sampling, config.precision, config.model
 
-    np.random.seed(42)  # For reproducibility
+    if model != 'gbm':
+        # Jump, stochastic volatility and regime models (sde_models imports this module, so it is loaded here)
+        from sde_models import simulate_sde_model
 
-    for i in range(n_simulations):
-        # Simulate correlated random walks for assets
-        W = np.random.normal(0, 1, (n_steps, assets_size))  # Standard normal random variables
-        W = np.cumsum(W, axis=0) * np.sqrt(time_step)  # Cumulative sum to simulate the Wiener process
+        if sampling != 'pseudo':
+            raise ValueError(f"sampling={sampling!r} is only supported by the 'gbm' model.")
+        prices = simulate_sde_model(model, initial_asset_prices, mu_annualized, sigma_annualized, time_step, n_simulations, n_steps,
+                                    correlation_matrix, seed, returns, **(model_parameters or {}))
+        return prices.astype(storage_dtype(precision), copy=False)
 
-        # Calculate assets price paths for each asset
-        for j in range(assets_size):
-            simulated_prices[i, :, j] = initial_asset_prices[j] * np.exp((mu_annualized.values[j] - 0.5 * sigma_annualized.values[j]**2) * np.linspace(0, time_horizon, n_steps) + sigma_annualized.values[j] * W[:, j])
-    
-    return simulated_prices
\ No newline at end of file
+    mu_annualized = np.asarray(mu_annualized, dtype=float)
+    sigma_annualized = np.asarray(sigma_annualized, dtype=float)
+
+    # Private generator for reproducibility: concurrent simulations never share the global numpy state
+    random_state = np.random.RandomState(seed)
+    dtype = storage_dtype(precision)
+
+    shocks = None
+    if noise_cache is not None:
+        n_factors = correlation_matrix.loadings.shape[1] if hasattr(correlation_matrix, 'loadings') else 0
+        shocks = noise_cache.shocks(n_simulations, n_steps, assets_size, n_factors, seed, sampling, dtype)
+
+    # Simulate correlated random walks for all paths at once (updated in place to avoid full-size temporaries)
+    W = correlated_normals(n_simulations, n_steps, assets_size, correlation_matrix, random_state, sampling, dtype, shocks)  # Standard normal random variables
+    if W.flags.writeable:
+        np.cumsum(W, axis=1, out=W)  # Cumulative sum to simulate the Wiener process
+    else:
+        # Uncorrelated cached shocks: the read-only buffer is shared, the walk is a new array
+        W = np.cumsum(W, axis=1)
+    W *= dtype.type(np.sqrt(time_step))
+
+    # Calculate assets price paths for each asset
+    drift = np.outer(np.linspace(0, time_horizon, n_steps), mu_annualized - 0.5 * sigma_annualized**2)
+    W *= sigma_annualized.astype(dtype)
+    W += drift.astype(dtype)
+    np.exp(W, out=W)
+    W *= np.asarray(initial_asset_prices, dtype=float).astype(dtype)
+
+    return W
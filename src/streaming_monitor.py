@@ -0,0 +1,325 @@
+'''
+Purpose: Live monitoring of many portfolios on a streaming price feed
+
+`continuous_monitoring_and_rebalancing` replays a fixed history. The streaming monitor instead
+consumes (timestamp, ticker, price) ticks from an async iterator (a file or socket replay in tests,
+a live feed in production) and, for every tick:
+- updates the ticker's incremental estimators (last price, EWMA mean and variance of log returns)
+- updates the value of every portfolio holding the ticker
+- evaluates the stopping trigger (one-tick move beyond the threshold, as optimal_stopping_rule) and
+  the rebalance trigger (the ticker's weight drifting out of its band) of those portfolios
+
+A stop takes priority over a rebalance on the same tick: the portfolio is closed at its current value
+and leaves the monitor (no further valuation or decisions).
+
+Positions are indexed by ticker, and the portfolios holding a ticker are updated together with a
+few vector operations, so a tick costs O(1) per affected portfolio and nothing for the others.
+Decisions are pushed to subscriber queues, which the Flask API streams as Server-Sent Events.
+'''
+
+import asyncio
+import json
+import math
+import queue
+import threading
+import numpy as np
+
+# Decay of the per-ticker EWMA estimators (RiskMetrics daily value)
+EWMA_DECAY = 0.94
+
+# Decisions buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 10000
+
+
+class StreamingMonitor:
+    """
+    Tick-driven stop and rebalance triggers for many portfolios.
+
+    Args:
+    - ewma_decay: decay of the per-ticker EWMA mean and variance of log returns
+    """
+
+    def __init__(self, ewma_decay=EWMA_DECAY):
+        self.ewma_decay = ewma_decay
+
+        # Per ticker: last price and [mean, variance, ticks] of its log returns
+        self.last_prices = {}
+        self.estimates = {}
+
+        # Per portfolio (row): value, rebalance band, stopping threshold and whether it is still open
+        self.portfolio_ids = []
+        self.values = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)
+        self.bands = np.zeros(0)
+        self.thresholds = np.zeros(0)
+        self._rows = {}
+        self._slots = []
+        self._pending = {}
+
+        # Per ticker: rows of the portfolios holding it, their holdings (shares) and target weights
+        self._positions = {}
+
+        # Subscribers come and go from Flask threads while feeds publish from theirs
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+
+        # Portfolios may be added from another thread (the API) while a feed is running
+        self._lock = threading.Lock()
+
+    def add_portfolio(self, portfolio_id, weights, prices=None, value=1.0, band=0.05, threshold=0.03):
+        """
+        Start monitoring a portfolio.
+
+        Args:
+        - portfolio_id: identifier used in the decisions
+        - weights: dict of ticker -> target weight
+        - prices (optional): dict of ticker -> current price; missing prices are taken from the feed,
+          and the portfolio is activated once every ticker has been seen
+        - value: initial portfolio value
+        - band: rebalance when a weight drifts further than this from its target
+        - threshold: stopping trigger on the one-tick price change of a holding
+        """
+        with self._lock:
+            self._add_portfolio(portfolio_id, weights, prices, value, band, threshold)
+
+    def _add_portfolio(self, portfolio_id, weights, prices, value, band, threshold):
+        if portfolio_id in self._rows or portfolio_id in self._pending:
+            raise ValueError(f"Portfolio {portfolio_id!r} is already monitored.")
+
+        prices = {**self.last_prices, **(prices or {})}
+        if any(ticker not in prices for ticker in weights):
+            self._pending[portfolio_id] = (dict(weights), value, band, threshold)
+            return
+
+        row = len(self.portfolio_ids)
+        self._rows[portfolio_id] = row
+        self.portfolio_ids.append(portfolio_id)
+        self.values = np.append(self.values, value)
+        self.active = np.append(self.active, True)
+        self.bands = np.append(self.bands, band)
+        self.thresholds = np.append(self.thresholds, threshold)
+        self._slots.append([])
+
+        for ticker, weight in weights.items():
+            self.last_prices.setdefault(ticker, prices[ticker])
+            rows, holdings, targets = self._positions.get(ticker, (np.zeros(0, dtype=int), np.zeros(0), np.zeros(0)))
+            self._slots[row].append((ticker, len(rows)))
+            self._positions[ticker] = (np.append(rows, row), np.append(holdings, weight * value / prices[ticker]),
+                                       np.append(targets, weight))
+
+    def _activate_pending(self):
+        # Pending portfolios whose tickers all have a price now
+        for portfolio_id, (weights, value, band, threshold) in list(self._pending.items()):
+            if all(ticker in self.last_prices for ticker in weights):
+                del self._pending[portfolio_id]
+                self._add_portfolio(portfolio_id, weights, None, value, band, threshold)
+
+    def _update_estimates(self, ticker, price, last_price):
+        # EWMA mean and variance of log returns, O(1) per tick
+        estimate = self.estimates.setdefault(ticker, [0.0, 0.0, 0])
+        log_return = math.log(price / last_price)
+        deviation = log_return - estimate[0]
+        estimate[0] += (1 - self.ewma_decay) * deviation
+        estimate[1] = self.ewma_decay * (estimate[1] + (1 - self.ewma_decay) * deviation * deviation)
+        estimate[2] += 1
+
+    def rebalance(self, portfolio_id):
+        """
+        Trade a portfolio back to its target weights at the last prices
+        """
+        row = self._rows[portfolio_id]
+        for ticker, slot in self._slots[row]:
+            _, holdings, targets = self._positions[ticker]
+            holdings[slot] = targets[slot] * self.values[row] / self.last_prices[ticker]
+
+    def on_tick(self, timestamp, ticker, price):
+        """
+        Process one tick and return the decisions it triggers.
+
+        Returns:
+        - list of decision dicts: 'type' ('stop' or 'rebalance'), 'portfolio', 'timestamp', 'ticker',
+          'price', 'change' (one-tick price change), 'drift' (weight minus target) and 'value'; a
+          stopped portfolio is not rebalanced and triggers nothing afterwards
+        """
+        with self._lock:
+            return self._on_tick(timestamp, ticker, price)
+
+    def _on_tick(self, timestamp, ticker, price):
+        price = float(price)
+        last_price = self.last_prices.get(ticker)
+        self.last_prices[ticker] = price
+
+        if last_price is None:
+            if self._pending:
+                self._activate_pending()
+            return []
+
+        self._update_estimates(ticker, price, last_price)
+
+        position = self._positions.get(ticker)
+        if position is None:
+            return []
+
+        rows, holdings, targets = position
+        active = self.active[rows]
+        self.values[rows] += np.where(active, holdings * (price - last_price), 0.0)
+        values = self.values[rows]
+
+        change = price / last_price - 1
+        drift = holdings * price / values - targets
+        stop = active & (abs(change) > self.thresholds[rows])
+        rebalance = active & ~stop & (np.abs(drift) > self.bands[rows])
+
+        decisions = []
+        for slot in np.flatnonzero(stop | rebalance):
+            portfolio_id = self.portfolio_ids[rows[slot]]
+            decision = {
+                'type': 'rebalance' if rebalance[slot] else 'stop',
+                'portfolio': portfolio_id,
+                'timestamp': timestamp,
+                'ticker': ticker,
+                'price': price,
+                'change': change,
+                'drift': float(drift[slot]),
+                'value': float(values[slot]),
+            }
+            if rebalance[slot]:
+                self.rebalance(portfolio_id)
+            else:
+                self.active[rows[slot]] = False
+            decisions.append(decision)
+
+        return decisions
+
+    def subscribe(self):
+        """
+        Return a thread-safe queue receiving every decision from now on
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._subscribers_lock:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, decision):
+        # Publishers (several feeds, error reports) are serialized; consumers keep draining concurrently
+        with self._subscribers_lock:
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(decision)
+                except queue.Full:
+                    # A slow consumer loses its oldest decision, never blocks the feed; it may drain the
+                    # queue in between, so both steps tolerate finding it empty or full
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+                    try:
+                        subscriber.put_nowait(decision)
+                    except queue.Full:
+                        pass
+
+    async def run(self, feed):
+        """
+        Consume an async iterator of (timestamp, ticker, price) ticks, publishing every decision.
+
+        Returns:
+        - number of ticks processed
+        """
+        n_ticks = 0
+        async for timestamp, ticker, price in feed:
+            for decision in self.on_tick(timestamp, ticker, price):
+                self.publish(decision)
+            n_ticks += 1
+        return n_ticks
+
+
+def _parse_tick(line):
+    timestamp, ticker, price = line.strip().split(',')
+    return timestamp, ticker, float(price)
+
+
+async def replay_file(path, rate=None):
+    """
+    Replay a CSV file as ticks.
+
+    Two layouts are read:
+    - ticks: header `timestamp,ticker,price`, one tick per line
+    - bars: a price table like data/raw_data.csv (date column, then one column per ticker); each row
+      becomes one tick per ticker with a price
+
+    Args:
+    - path: CSV file
+    - rate (optional): ticks per second to pace the replay at (as fast as possible if None)
+    """
+    delay = 0 if rate is None else 1 / rate
+    with open(path) as f:
+        header = next(f).strip().split(',')
+        ticks_layout = header == ['timestamp', 'ticker', 'price']
+
+        for n_lines, line in enumerate(f):
+            try:
+                if ticks_layout:
+                    ticks = [_parse_tick(line)]
+                else:
+                    fields = line.strip().split(',')
+                    ticks = [(fields[0], ticker, float(value)) for ticker, value in zip(header[1:], fields[1:]) if value]
+            except ValueError as error:
+                raise ValueError(f"{path}, line {n_lines + 2}: malformed tick {line.strip()!r} ({error})") from error
+
+            for tick in ticks:
+                yield tick
+                if delay:
+                    await asyncio.sleep(delay)
+
+            if not delay and n_lines % 1000 == 0:
+                # Let other tasks (e.g. subscribers) run during a full-speed replay
+                await asyncio.sleep(0)
+
+
+async def replay_socket(host, port):
+    """
+    Read `timestamp,ticker,price` lines from a TCP socket as ticks until the connection closes
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield _parse_tick(line.decode())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve_replay(path, host='127.0.0.1', port=0):
+    """
+    Serve a ticks CSV file (see replay_file) to every client connecting to host:port, e.g. to test replay_socket.
+
+    Returns:
+    - the asyncio server (its bound port is server.sockets[0].getsockname()[1])
+    """
+    async def send_file(reader, writer):
+        async for timestamp, ticker, price in replay_file(path):
+            writer.write(f'{timestamp},{ticker},{price!r}\n'.encode())
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(send_file, host, port)
+
+
+def server_sent_events(subscriber, timeout=15.0):
+    """
+    Yield a subscriber's decisions as Server-Sent Events, with a keep-alive comment after `timeout` idle seconds
+    """
+    while True:
+        try:
+            decision = subscriber.get(timeout=timeout)
+        except queue.Empty:
+            yield ': keep-alive\n\n'
+            continue
+        yield f"event: {decision['type']}\ndata: {json.dumps(decision)}\n\n"
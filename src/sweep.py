@@ -0,0 +1,227 @@
+'''
+Purpose: Parameter sweeps over the optimizer and rebalancing settings of config.py
+
+Instead of hand-editing config.py and rerunning main.py, a sweep takes a grid of values for
+risk_tolerance, rebalancing_frequency, threshold and return_target and evaluates every point:
+- statistics common to every point (returns, annualized mu/sigma, correlation, simulated paths)
+  are computed once and handed to each worker process once, through the pool initializer
+- points sharing (risk_tolerance, return_target) share one optimization: a task is one optimizer
+  run followed by every rebalancing backtest of that optimum
+- each finished task is appended to a JSONL checkpoint, so an interrupted sweep resumes where it stopped;
+  its key holds a fingerprint of the prices and the run settings, so rows of another run are never reused
+- the results are one columnar table (one row per point), written as a .npz file of columns
+'''
+
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from data_handler import annualize_parameters, get_return, get_correlation_matrix
+from portfolio_optimizer import optimize_portfolio
+from rebalance import REBALANCE_PERIODS
+from rebalance_policies import evaluate_rebalancing_policy
+from simulations import simulate_portfolio
+
+# Swept parameters, in grid order
+SWEEP_PARAMETERS = ('risk_tolerance', 'return_target', 'rebalancing_frequency', 'threshold')
+
+# Statistics shared by every point of the running sweep (set once per worker process)
+_shared = None
+
+
+def sweep_statistics(data, time_horizon=1, n_simulations=1000, correlated=True):
+    """
+    Compute the statistics shared by every point of a sweep.
+
+    Args:
+    - data: historical prices (DataFrame, dates x assets)
+    - time_horizon: simulation horizon in years
+    - n_simulations: number of simulated paths
+    - correlated: simulate with the sample correlation (independent assets otherwise, as main.py)
+
+    Returns:
+    - dict with 'assets', 'mu', 'sigma', 'correlation_matrix', 'historical_prices' and 'simulated_prices'
+    """
+    returns = get_return(data, complete=False)
+    mu_annualized, sigma_annualized = annualize_parameters(returns.mean(), returns.std(), 252)
+    correlation_matrix = get_correlation_matrix(returns)
+
+    simulated_prices = simulate_portfolio(len(data.columns), data.iloc[-1].values, mu_annualized.values, sigma_annualized.values,
+                                          time_horizon, 1 / 252, n_simulations=n_simulations,
+                                          correlation_matrix=correlation_matrix.values if correlated else None)
+
+    return {
+        'assets': [str(asset) for asset in data.columns],
+        'mu': mu_annualized.values,
+        'sigma': sigma_annualized.values,
+        'correlation_matrix': correlation_matrix.values,
+        'historical_prices': data.dropna().values[None, :, :],
+        'simulated_prices': simulated_prices,
+    }
+
+
+def _set_shared(shared):
+    global _shared
+    _shared = shared
+
+
+def _run_task(task, transaction_cost):
+    """
+    Optimize once for (risk_tolerance, return_target), then backtest every rebalancing setting of the task
+    """
+    (risk_tolerance, return_target), rebalancing = task
+    weights, (expected_return, volatility) = optimize_portfolio(_shared['mu'], _shared['sigma'], _shared['correlation_matrix'],
+                                                                risk_tolerance / 10, return_target)
+
+    rows = []
+    for rebalancing_frequency, threshold in rebalancing:
+        policy = dict(period=REBALANCE_PERIODS[rebalancing_frequency], threshold=threshold, transaction_cost=transaction_cost)
+        simulated = evaluate_rebalancing_policy(_shared['simulated_prices'], weights, **policy)
+        historical = evaluate_rebalancing_policy(_shared['historical_prices'], weights, **policy)
+        wealth = simulated['terminal_wealth']
+
+        row = {
+            'risk_tolerance': risk_tolerance,
+            'return_target': np.nan if return_target is None else return_target,
+            'rebalancing_frequency': rebalancing_frequency,
+            'threshold': np.nan if threshold is None else threshold,
+            'expected_return': float(expected_return),
+            'volatility': float(volatility),
+            'mean_terminal_wealth': float(wealth.mean()),
+            'std_terminal_wealth': float(wealth.std()),
+            'terminal_wealth_5%': float(np.quantile(wealth, 0.05)),
+            'probability_of_loss': float(np.mean(wealth < 1.0)),
+            'mean_turnover': float(simulated['turnover'].mean()),
+            'mean_costs': float(simulated['costs'].mean()),
+            'historical_terminal_wealth': float(historical['terminal_wealth'][0]),
+            'historical_rebalances': int(historical['rebalances'][0]),
+        }
+        row.update({f'weight_{asset}': float(weight) for asset, weight in zip(_shared['assets'], weights)})
+        rows.append(row)
+
+    return rows
+
+
+def _run_fingerprint(data, transaction_cost, time_horizon, n_simulations):
+    # Hash of the prices (values, dates, tickers) and of the settings shared by every task of the sweep
+    import pandas as pd
+
+    digest = hashlib.sha256(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update(json.dumps([[str(asset) for asset in data.columns], transaction_cost, time_horizon, n_simulations]).encode())
+    return digest.hexdigest()[:16]
+
+
+def _task_key(task, fingerprint):
+    # Run fingerprint, optimizer setting and rebalancing settings: a changed grid, price history or
+    # setting never reuses stale rows
+    return json.dumps([fingerprint, task])
+
+
+def _read_checkpoint(checkpoint_path):
+    # Completed tasks: key -> rows; a line cut short by an interruption is ignored
+    completed = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[entry['key']] = entry['rows']
+    return completed
+
+
+def run_sweep(data, grid, results_path=None, checkpoint_path=None, max_workers=None, transaction_cost=0.001,
+              time_horizon=1, n_simulations=1000):
+    """
+    Evaluate every point of a parameter grid.
+
+    Args:
+    - data: historical prices (DataFrame, dates x assets)
+    - grid: dict of parameter name -> list of values for the SWEEP_PARAMETERS; missing parameters use
+      config.py's value (RunConfig defaults: risk tolerance, return expectations, rebalancing frequency and
+      rebalance threshold). A threshold of None means calendar rebalancing only, a return_target of None no target
+    - results_path (optional): .npz file to write the results table to
+    - checkpoint_path (optional): JSONL checkpoint; finished tasks of the same prices and settings found there are not rerun
+    - max_workers: worker processes (1 runs in this process)
+    - transaction_cost: proportional rebalancing cost
+    - time_horizon, n_simulations: simulation settings shared by every point
+
+    Returns:
+    - Results table (DataFrame, one row per grid point, in grid order)
+    """
+    import pandas as pd
+    from config import RunConfig
+
+    defaults = {'risk_tolerance': [RunConfig.risk_tolerance], 'return_target': [RunConfig.return_expectations],
+                'rebalancing_frequency': [RunConfig.rebalancing_frequency], 'threshold': [RunConfig.rebalance_threshold]}
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    grid = {name: list(grid.get(name, defaults[name])) for name in SWEEP_PARAMETERS}
+
+    # One task per optimizer setting, carrying every rebalancing setting
+    rebalancing = list(itertools.product(grid['rebalancing_frequency'], grid['threshold']))
+    tasks = [(key, rebalancing) for key in itertools.product(grid['risk_tolerance'], grid['return_target'])]
+
+    fingerprint = _run_fingerprint(data, transaction_cost, time_horizon, n_simulations)
+    completed = _read_checkpoint(checkpoint_path)
+    pending = [task for task in tasks if _task_key(task, fingerprint) not in completed]
+
+    if pending:
+        shared = sweep_statistics(data, time_horizon, n_simulations)
+        checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+        if checkpoint and checkpoint.tell() > 0:
+            # Terminate a line left incomplete by an interruption
+            checkpoint.write('\n')
+
+        def record(task, rows):
+            completed[_task_key(task, fingerprint)] = rows
+            if checkpoint:
+                checkpoint.write(json.dumps({'key': _task_key(task, fingerprint), 'rows': rows}) + '\n')
+                checkpoint.flush()
+
+        try:
+            if max_workers == 1:
+                _set_shared(shared)
+                for task in pending:
+                    record(task, _run_task(task, transaction_cost))
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_shared, initargs=(shared,)) as pool:
+                    futures = {pool.submit(_run_task, task, transaction_cost): task for task in pending}
+                    for future in as_completed(futures):
+                        record(futures[future], future.result())
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+    results = pd.DataFrame([row for task in tasks for row in completed[_task_key(task, fingerprint)]])
+
+    if results_path:
+        write_results_table(results, results_path)
+
+    return results
+
+
+def write_results_table(results, results_path):
+    """
+    Write a results table as a columnar .npz file (one array per column)
+    """
+    os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+    columns = {name: results[name].to_numpy(dtype=None if results[name].dtype.kind in 'biuf' else str) for name in results.columns}
+    with open(results_path + '.tmp', 'wb') as f:
+        np.savez(f, **columns)
+    os.replace(results_path + '.tmp', results_path)
+
+
+def read_results_table(results_path):
+    """
+    Read a results table written by write_results_table
+    """
+    import pandas as pd
+
+    with np.load(results_path) as table:
+        return pd.DataFrame({name: table[name] for name in table.files})
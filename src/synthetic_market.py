@@ -0,0 +1,171 @@
+'''
+Purpose: Deterministic synthetic market data, for offline tests, benchmarks and load tests
+
+Prices follow a sector factor model of daily log returns:
+    r_t = (mu - sigma^2/2)/252 + sigma/sqrt(252) * (sqrt(m) M_t + sqrt(s) S_t + sqrt(1 - m - s) e_t)
+with one market factor M, one factor S per sector and idiosyncratic noise e, so the correlation is
+about m + s within a sector and m across sectors. Each ticker's drift, volatility, starting price and
+sector are drawn from a generator seeded by the ticker name, so a ticker's history is the same whatever
+other tickers are requested with it, and the same arguments always give the same panel.
+
+Real panels are ragged (raw_data.csv has TSLA from mid-2010 only); the generator reproduces that with:
+- listings: a share of tickers starts trading part-way through the period (NaN before)
+- delistings: a share of tickers stops trading before the end (NaN after)
+- gaps: missing prices (trading halts, bad prints) in runs of a given length
+
+With `SDE_DATA_BACKEND=synthetic`, data_handler.fetch_data serves these panels instead of downloading,
+and SyntheticProvider plugs them into the ingestion pipeline.
+'''
+
+import zlib
+import numpy as np
+
+from config import RISK_FREE_RATE
+
+# Trading days per year of the generated calendar (business days)
+TRADING_DAYS = 252
+
+
+def synthetic_tickers(n_assets, prefix='SYN'):
+    """
+    Return n_assets ticker names: SYN0000, SYN0001, ...
+    """
+    width = max(4, len(str(n_assets - 1)))
+    return [f'{prefix}{i:0{width}d}' for i in range(n_assets)]
+
+
+def ticker_parameters(ticker, seed=0, n_sectors=10):
+    """
+    Return the drawn parameters of one ticker.
+
+    Returns:
+    - dict with 'mu' and 'sigma' (annualized), 'initial_price', 'sector', and 'listing' and 'delisting'
+      (uniform draws deciding the ticker's listing and delisting dates)
+    """
+    random_state = np.random.RandomState([zlib.crc32(str(ticker).encode()), seed])
+    return {
+        'mu': random_state.uniform(-0.05, 0.25),
+        'sigma': random_state.uniform(0.15, 0.6),
+        'initial_price': random_state.uniform(10, 500),
+        'sector': random_state.randint(n_sectors),
+        'listing': random_state.random_sample(),
+        'delisting': random_state.random_sample(),
+    }
+
+
+def synthetic_prices(tickers, start='2010-01-01', end='2025-01-01', seed=0, n_sectors=10, market_share=0.3, sector_share=0.2,
+                     missing_rate=0.0, gap_length=1, listing_rate=0.0, delisting_rate=0.0):
+    """
+    Generate a price panel for the tickers.
+
+    Args:
+    - tickers: ticker names (e.g. synthetic_tickers(1000)); any names work
+    - start, end: date range (business days, end excluded as with yfinance)
+    - seed: seed of the market; each ticker is further seeded by its name
+    - n_sectors: number of sector factors
+    - market_share, sector_share: shares of each ticker's variance explained by the market and its sector
+    - missing_rate: expected share of missing prices, in runs of gap_length days
+    - listing_rate: share of tickers listing after start
+    - delisting_rate: share of tickers delisting before end
+
+    Returns:
+    - DataFrame of prices (dates x tickers)
+    """
+    import pandas as pd
+
+    if market_share < 0 or sector_share < 0 or market_share + sector_share > 1:
+        raise ValueError("market_share and sector_share must be non-negative and sum to at most 1.")
+    if not 0 <= missing_rate < 1 or gap_length < 1:
+        raise ValueError("missing_rate must be in [0, 1) and gap_length at least 1.")
+
+    dates = pd.bdate_range(start, end, inclusive='left')
+    n_days, n_assets = len(dates), len(tickers)
+
+    # Market factor (column 0) and sector factors, shared by every ticker
+    factors = np.random.RandomState(seed).normal(0, 1, (n_days, 1 + n_sectors))
+
+    parameters = [ticker_parameters(ticker, seed, n_sectors) for ticker in tickers]
+    mu = np.array([p['mu'] for p in parameters])
+    sigma = np.array([p['sigma'] for p in parameters])
+    sectors = np.array([p['sector'] for p in parameters], dtype=int)
+
+    # Idiosyncratic shocks and missing-price draws come from each ticker's own generators
+    noise = np.empty((n_days, n_assets))
+    missing = np.zeros((n_days, n_assets), dtype=bool)
+    for j, ticker in enumerate(tickers):
+        noise[:, j] = np.random.RandomState([zlib.crc32(str(ticker).encode()), seed, 1]).normal(0, 1, n_days)
+        if missing_rate:
+            gap_starts = np.random.RandomState([zlib.crc32(str(ticker).encode()), seed, 2]).random_sample(n_days) < missing_rate / gap_length
+            missing[:, j] = np.convolve(gap_starts, np.ones(gap_length, dtype=int))[:n_days] > 0
+
+    shocks = (np.sqrt(market_share) * factors[:, :1] + np.sqrt(sector_share) * factors[:, 1 + sectors]
+              + np.sqrt(1 - market_share - sector_share) * noise)
+    log_returns = (mu - 0.5 * sigma**2) / TRADING_DAYS + sigma / np.sqrt(TRADING_DAYS) * shocks
+
+    # Prices start at each ticker's initial price on the first day
+    log_returns[0] = 0
+    prices = np.array([p['initial_price'] for p in parameters]) * np.exp(np.cumsum(log_returns, axis=0))
+
+    # Listings (first day in the first 80% of the period) and delistings (last day in the final 80%)
+    days = np.arange(n_days)[:, None]
+    listing = np.array([p['listing'] for p in parameters])
+    delisting = np.array([p['delisting'] for p in parameters])
+    first_day = np.where(listing < listing_rate, (listing / max(listing_rate, 1e-12) * 0.8 * n_days).astype(int), 0)
+    last_day = np.where(delisting < delisting_rate, n_days - 1 - (delisting / max(delisting_rate, 1e-12) * 0.8 * n_days).astype(int), n_days - 1)
+    last_day = np.maximum(last_day, first_day)
+
+    prices[(days < first_day) | (days > last_day) | missing] = np.nan
+
+    return pd.DataFrame(prices, index=pd.DatetimeIndex(dates, name='Date'), columns=list(tickers))
+
+
+class SyntheticProvider:
+    """
+    Market data provider serving synthetic prices and option chains (see ingestion.YahooProvider).
+
+    Args:
+    - as_of: date of the option chains (their spot is the last synthetic price before it)
+    - kwargs: generator settings forwarded to synthetic_prices (seed, n_sectors, missing_rate, ...)
+    """
+
+    def __init__(self, as_of='2025-01-01', **kwargs):
+        self.as_of = as_of
+        self.kwargs = kwargs
+
+    def download_prices(self, tickers, start, end):
+        return synthetic_prices(list(tickers), start, end, **self.kwargs)
+
+    def option_chain(self, ticker, max_expirations=1):
+        """
+        Calls and puts at 9 strikes around the last synthetic price, for monthly expirations after as_of,
+        priced by Black-Scholes on a volatility smile around the ticker's volatility
+        """
+        import pandas as pd
+        from risk_neutral_pricing import black_scholes
+
+        as_of = self.as_of
+        spot = synthetic_prices([ticker], end=as_of, **self.kwargs)[ticker].dropna().iloc[-1]
+        sigma = ticker_parameters(ticker, self.kwargs.get('seed', 0), self.kwargs.get('n_sectors', 10))['sigma']
+
+        chains = []
+        for month in range(1, max_expirations + 1):
+            expiration = pd.Timestamp(as_of) + pd.DateOffset(months=month)
+            strikes = np.round(spot * np.linspace(0.8, 1.2, 9), 2)
+            implied_volatility = sigma * (1 + 2 * np.log(strikes / spot)**2)
+            T = (expiration - pd.Timestamp(as_of)).days / 365
+
+            for option_type in ('call', 'put'):
+                price = black_scholes(spot, strikes, T, RISK_FREE_RATE, implied_volatility, is_call=option_type == 'call')['price']
+                chains.append(pd.DataFrame({
+                    'ticker': ticker,
+                    'expiration': expiration.strftime('%Y-%m-%d'),
+                    'option_type': option_type,
+                    'strike': strikes,
+                    'bid': price * 0.98,
+                    'ask': price * 1.02,
+                    'last_price': price,
+                    'implied_volatility': implied_volatility,
+                    'spot': spot,
+                }))
+
+        return pd.concat(chains, ignore_index=True)
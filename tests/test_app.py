@@ -0,0 +1,133 @@
+'''
+Purpose: Unit tests for the request validation of the Flask API
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.app import app, portfolio
+from src.batch import evaluate_spec
+from src.config import RunConfig
+import incremental
+
+
+class TestOptimizeRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.request = {'assets': ['AAPL', 'MSFT'], 'risk_tolerance': 5, 'time_horizon': 1, 'return_expectations': 0.06,
+                        'rebalancing_frequency': 'Quarterly'}
+
+    def assert_rejected(self, **changes):
+        # Invalid settings are answered with a 400 before any data is loaded
+        with patch('src.app.portfolio') as mock_portfolio:
+            response = self.client.post('/optimize', json={**self.request, **changes})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid request', response.get_json()['error'])
+        mock_portfolio.assert_not_called()
+
+    def test_unknown_covariance_estimator(self):
+        self.assert_rejected(covariance_estimator='foo')
+
+    def test_risk_tolerance_as_string(self):
+        self.assert_rejected(risk_tolerance='5')
+
+    def test_time_horizon_as_string(self):
+        self.assert_rejected(time_horizon='1')
+
+
+class TestPortfolioPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = patch.dict(os.environ, {'SDE_NOISE_CACHE_PATH': self.directory.name})
+        self.environment.start()
+
+        rng = np.random.RandomState(0)
+        returns = rng.normal([0.0008, 0.0004, 0.0001], [0.02, 0.01, 0.002], size=(500, 3))
+        self.prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=['AAA', 'BBB', 'CCC'],
+                                   index=pd.date_range('2020-01-01', periods=500, freq='B'))
+
+    def tearDown(self):
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def test_api_and_batch_share_the_pipeline(self):
+        for objective in ('variance', 'cvar'):
+            with self.subTest(objective=objective):
+                config = RunConfig(assets=('AAA', 'BBB', 'CCC'), n_simulations=50, return_expectations=0.05, objective=objective)
+                with patch('pipeline.asset_prices', return_value=self.prices):
+                    weights, expected_return, _, VaR, frontier, values, frontier_risk = portfolio(config)
+                row, _ = evaluate_spec(config, self.prices)
+
+                # Same optimum and risk figures from the API and the batch
+                np.testing.assert_allclose(weights, row['weights'])
+                self.assertEqual(expected_return, f"{row['expected_return'] * 100:.2f}")
+                self.assertEqual(VaR, f"{row['historical_var'] * 100:.2f}")
+                self.assertEqual(len(frontier_risk['historical_var']), len(frontier))
+                self.assertEqual(values.shape, (10, config.n_steps))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestWhatIfRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.sessions = patch.dict(incremental._sessions, clear=True)
+        self.sessions.start()
+
+        rng = np.random.RandomState(1)
+        returns = rng.normal([0.0008, 0.0004, 0.0002], [0.02, 0.01, 0.005], size=(300, 3))
+        prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=['AAA', 'BBB', 'CCC'],
+                              index=pd.date_range('2020-01-01', periods=300, freq='B'))
+        self.asset_prices = patch('src.app.asset_prices', side_effect=lambda assets: prices[list(assets)])
+        self.mock_prices = self.asset_prices.start()
+
+    def tearDown(self):
+        self.asset_prices.stop()
+        self.sessions.stop()
+
+    def post(self, **data):
+        return self.client.post('/what_if', json={'session_id': 's1', **data})
+
+    def test_session_is_kept_after_a_removal(self):
+        self.assertEqual(self.post(assets=['AAA', 'BBB', 'CCC']).status_code, 200)
+        session = incremental.get_session('s1')
+        response = self.post(assets=['AAA', 'BBB', 'CCC'], remove='CCC')
+        self.assertEqual(response.get_json()['assets'], ['AAA', 'BBB'])
+
+        # The next call with the session's current assets (or none) reuses it without loading prices again
+        calls = self.mock_prices.call_count
+        for request in ({'assets': ['AAA', 'BBB']}, {}):
+            response = self.post(**request)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['assets'], ['AAA', 'BBB'])
+        self.assertIs(incremental.get_session('s1'), session)
+        self.assertEqual(self.mock_prices.call_count, calls)
+
+    def test_conflicting_assets_are_rejected(self):
+        self.post(assets=['AAA', 'BBB', 'CCC'], remove='CCC')
+        session = incremental.get_session('s1')
+
+        response = self.post(assets=['AAA', 'BBB', 'CCC'])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['assets'], ['AAA', 'BBB'])
+        self.assertIs(incremental.get_session('s1'), session)
+
+        # 'reset' starts the session over on the requested assets
+        response = self.post(assets=['AAA', 'BBB', 'CCC'], reset=True)
+        self.assertEqual(response.get_json()['assets'], ['AAA', 'BBB', 'CCC'])
+        self.assertIsNot(incremental.get_session('s1'), session)
+
+    def test_new_session_needs_assets(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid request', response.get_json()['error'])
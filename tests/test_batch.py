@@ -0,0 +1,94 @@
+'''
+Purpose: Unit tests for the headless batch runs of portfolio specs
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.batch import read_specs, run_batch
+from src.config import RunConfig
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        # Shocks are cached in the test directory, not the repository's data/store
+        self.environment = patch.dict(os.environ, {'SDE_NOISE_CACHE_PATH': os.path.join(self.directory.name, 'noise')})
+        self.environment.start()
+
+        # Three assets with distinct drifts and volatilities
+        rng = np.random.RandomState(0)
+        returns = rng.normal([0.0008, 0.0004, 0.0001], [0.02, 0.01, 0.002], size=(500, 3))
+        self.prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=['AAA', 'BBB', 'CCC'],
+                                   index=pd.date_range('2020-01-01', periods=500, freq='B'))
+
+    def tearDown(self):
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_read_specs(self):
+        jsonl = self._write('specs.jsonl', '{"id": "a", "assets": ["AAA", "BBB"], "risk_tolerance": 8}\n\n{"n_simulations": 50}\n')
+        csv = self._write('specs.csv', 'id,assets,risk_tolerance,n_simulations\na,AAA;BBB,8,\n1,,,50\n')
+
+        # Settings are compared as dicts (the tests and batch.py import config.py under different module names)
+        expected = [('a', vars(RunConfig(assets=('AAA', 'BBB'), risk_tolerance=8))), ('1', vars(RunConfig(n_simulations=50)))]
+        self.assertEqual([(spec_id, vars(config)) for spec_id, config in read_specs(jsonl)], expected)
+        self.assertEqual([(spec_id, vars(config)) for spec_id, config in read_specs(csv)], expected)
+
+        # Invalid settings fail before anything runs
+        with self.assertRaises(ValueError):
+            read_specs(self._write('typo.jsonl', '{"id": "a", "risk_tolerence": 8}\n'))
+        with self.assertRaises(ValueError):
+            read_specs(self._write('bad.csv', 'id,rebalancing_frequency\na,Monthly\n'))
+        with self.assertRaises(ValueError):
+            read_specs(self._write('duplicate.jsonl', '{"id": "a"}\n{"id": "a"}\n'))
+
+    def test_run_batch(self):
+        specs = [
+            ('two', RunConfig(assets=('AAA', 'BBB'), n_simulations=50, return_expectations=0.05)),
+            ('missing', RunConfig(assets=('AAA', 'ZZZ'), n_simulations=50)),
+            ('three', RunConfig(assets=('AAA', 'BBB', 'CCC'), n_simulations=50, return_expectations=0.05)),
+        ]
+        output_path = os.path.join(self.directory.name, 'results', 'batch.jsonl')
+        plot_dir = os.path.join(self.directory.name, 'plots')
+
+        results = run_batch(specs, self.prices, output_path=output_path, max_workers=1, plot_dir=plot_dir)
+
+        # One row per spec in spec order; the failing spec carries its error and does not stop the others
+        self.assertEqual(results['id'].tolist(), ['two', 'missing', 'three'])
+        self.assertIn('KeyError', results.loc[1, 'error'])
+        self.assertTrue(pd.isna(results.loc[2, 'error']))
+        self.assertAlmostEqual(sum(results.loc[2, 'weights']), 1.0)
+        self.assertGreaterEqual(results.loc[0, 'expected_return'], 0.05 - 1e-6)
+
+        with open(output_path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['id'] for row in rows], ['two', 'missing', 'three'])
+        self.assertEqual(rows[2]['assets'], ['AAA', 'BBB', 'CCC'])
+
+        self.assertEqual(sorted(os.listdir(plot_dir)), ['three_frontier.png', 'three_simulation.png', 'two_frontier.png', 'two_simulation.png'])
+
+    def test_pool_matches_inline(self):
+        specs = [(str(risk_tolerance), RunConfig(assets=('AAA', 'BBB', 'CCC'), risk_tolerance=risk_tolerance, n_simulations=50))
+                 for risk_tolerance in (2, 5, 8)]
+        inline = run_batch(specs, self.prices, max_workers=1)
+        pooled = run_batch(specs, self.prices, max_workers=2)
+        pd.testing.assert_frame_equal(inline, pooled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+'''
+Purpose: Unit tests for the immutable run configuration
+'''
+
+import unittest
+from dataclasses import FrozenInstanceError
+from src import config
+from src.config import RunConfig
+
+class TestRunConfig(unittest.TestCase):
+
+    def test_defaults_follow_constants(self):
+        run_config = RunConfig()
+
+        self.assertEqual(run_config.assets, tuple(config.ASSETS))
+        self.assertEqual(run_config.risk_tolerance, config.RISK_TOLERANCE)
+        self.assertEqual(run_config.rebalancing_frequency, config.REBALANCING_FREQUENCY)
+        self.assertIsInstance(config.RETURN_EXPECTATIONS, float)
+        self.assertEqual(run_config.return_expectations, 0.06)
+
+    def test_hashable_and_immutable(self):
+        first = RunConfig(assets=['MSFT', 'NVDA'], return_expectations=0.1)
+        second = RunConfig(assets=('MSFT', 'NVDA'), return_expectations=0.1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len({first, second, RunConfig()}), 2)
+
+        with self.assertRaises(FrozenInstanceError):
+            first.risk_tolerance = 9
+
+    def test_replace(self):
+        base = RunConfig()
+        changed = base.replace(risk_tolerance=8, assets=['SPY'])
+
+        self.assertEqual(changed.risk_tolerance, 8)
+        self.assertEqual(changed.assets, ('SPY',))
+        self.assertEqual(base.risk_tolerance, config.RISK_TOLERANCE)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            RunConfig(rebalancing_frequency='Monthly')
+        with self.assertRaises(ValueError):
+            RunConfig(objective='sharpe')
+        with self.assertRaises(ValueError):
+            RunConfig(assets=[])
+        with self.assertRaises(ValueError):
+            RunConfig(time_horizon=0)
+        with self.assertRaises(ValueError):
+            RunConfig(model='sabr')
+        with self.assertRaises(ValueError):
+            RunConfig(model='heston', sampling='qmc')
+        for invalid in ({'covariance_estimator': 'foo'}, {'risk_tolerance': '5'}, {'risk_tolerance': 11}, {'time_horizon': '1'},
+                        {'time_horizon': float('nan')}, {'return_expectations': True}):
+            with self.subTest(**invalid), self.assertRaises(ValueError):
+                RunConfig(**invalid)
+
+        self.assertEqual(RunConfig(risk_tolerance=7).risk_tolerance, 7.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
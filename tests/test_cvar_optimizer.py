@@ -0,0 +1,78 @@
+'''
+Purpose: Unit tests for the CVaR (Rockafellar-Uryasev) scenario optimizer
+'''
+
+import unittest
+import numpy as np
+from scipy.optimize import linprog
+from src.cvar_optimizer import optimize_cvar, portfolio_cvar, scenario_returns
+
+class TestCVaROptimizer(unittest.TestCase):
+
+    def setUp(self):
+        # Fat-tailed daily return scenarios for 5 assets
+        rng = np.random.default_rng(0)
+        self.returns = rng.standard_t(4, (3000, 5)) * np.array([0.01, 0.015, 0.02, 0.008, 0.012]) + 0.0004
+        self.alpha = 0.95
+
+    def reference_cvar(self, returns, alpha):
+        # Full dense Rockafellar-Uryasev LP over every scenario
+        n_scenarios, num_assets = returns.shape
+        cost = np.concatenate([np.zeros(num_assets), [1.0], np.full(n_scenarios, 1 / ((1 - alpha) * n_scenarios))])
+        A_ub = np.hstack([-returns, -np.ones((n_scenarios, 1)), -np.eye(n_scenarios)])
+        A_eq = np.concatenate([np.ones(num_assets), np.zeros(1 + n_scenarios)])[None, :]
+        bounds = [(0, 1)] * num_assets + [(None, None)] + [(0, None)] * n_scenarios
+        return linprog(cost, A_ub=A_ub, b_ub=np.zeros(n_scenarios), A_eq=A_eq, b_eq=[1.0], bounds=bounds, method='highs').fun
+
+    def test_matches_full_linear_program(self):
+        weights, (portfolio_return, optimal_cvar) = optimize_cvar(self.returns[:800], self.alpha)
+
+        self.assertAlmostEqual(optimal_cvar, self.reference_cvar(self.returns[:800], self.alpha), places=8)
+        self.assertAlmostEqual(weights.sum(), 1, places=8)
+        self.assertTrue(np.all(weights >= -1e-9))
+
+    def test_round_limit_falls_back_to_full_program(self):
+        with self.assertWarns(RuntimeWarning):
+            weights, (_, optimal_cvar) = optimize_cvar(self.returns[:800], self.alpha, max_rounds=0)
+
+        self.assertAlmostEqual(optimal_cvar, self.reference_cvar(self.returns[:800], self.alpha), places=8)
+
+    def test_default_target_return(self):
+        # The configured annual target, as a daily return (app.portfolio with objective='cvar')
+        from src.config import RunConfig
+
+        weights, (portfolio_return, _) = optimize_cvar(self.returns, self.alpha, target_return=RunConfig().return_expectations / 252)
+        self.assertGreaterEqual(portfolio_return, RunConfig().return_expectations / 252 - 1e-10)
+
+    def test_reported_cvar_matches_scenarios(self):
+        weights, (portfolio_return, optimal_cvar) = optimize_cvar(self.returns, self.alpha)
+        _, realized_cvar = portfolio_cvar(weights, self.returns, self.alpha)
+
+        self.assertAlmostEqual(optimal_cvar, realized_cvar, places=8)
+        self.assertAlmostEqual(portfolio_return, self.returns.mean(axis=0) @ weights)
+
+        # Never worse than the equal-weight portfolio
+        _, equal_weight_cvar = portfolio_cvar(np.full(5, 0.2), self.returns, self.alpha)
+        self.assertLessEqual(optimal_cvar, equal_weight_cvar)
+
+    def test_target_return_and_bounds(self):
+        target_return = np.quantile(self.returns.mean(axis=0), 0.75)
+        weights, (portfolio_return, _) = optimize_cvar(self.returns, self.alpha, target_return=target_return, upper_bounds=0.4)
+
+        self.assertGreaterEqual(portfolio_return, target_return - 1e-10)
+        self.assertLessEqual(weights.max(), 0.4 + 1e-9)
+
+    def test_infeasible_target(self):
+        with self.assertRaises(ValueError):
+            optimize_cvar(self.returns, self.alpha, target_return=1.0)
+
+    def test_simulated_price_scenarios(self):
+        # (n_simulations, n_steps, n_assets) prices are reduced to horizon returns per path
+        prices = 100 * np.cumprod(1 + self.returns.reshape(300, 10, 5), axis=1)
+        np.testing.assert_allclose(scenario_returns(prices), prices[:, -1] / prices[:, 0] - 1)
+
+        weights, (_, optimal_cvar) = optimize_cvar(prices, self.alpha)
+        self.assertAlmostEqual(optimal_cvar, portfolio_cvar(weights, prices, self.alpha)[1], places=8)
+
+if __name__ == '__main__':
+    unittest.main()
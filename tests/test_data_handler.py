@@ -2,7 +2,9 @@ import unittest
 import numpy as np
 import pandas as pd
 from unittest.mock import patch
-from src.data_handler import fetch_data, get_return, get_correlation_matrix, annualize_parameters
+from src.data_handler import fetch_data, get_return, get_correlation_matrix, annualize_parameters, \
+    estimate_covariance, ledoit_wolf_covariance, ewma_covariance, factor_covariance, covariance_to_correlation, FactorCovariance, \
+    pairwise_covariance, overlap_counts, repair_psd
 
 class TestDataProcessing(unittest.TestCase):
 
@@ -77,5 +79,123 @@ class TestDataProcessing(unittest.TestCase):
         np.testing.assert_almost_equal(annualized_return, expected_annualized_mu)
         np.testing.assert_almost_equal(annualized_volatility, expected_annualized_sigma)
 
+class TestCovarianceEstimators(unittest.TestCase):
+
+    def setUp(self):
+        # Returns driven by 3 common factors plus idiosyncratic noise
+        rng = np.random.default_rng(0)
+        self.n_factors = 3
+        loadings = rng.normal(0, 0.01, (40, self.n_factors))
+        self.returns = rng.normal(0, 1, (300, self.n_factors)) @ loadings.T + rng.normal(0, 0.005, (300, 40))
+        self.sample_cov = np.cov(self.returns, rowvar=False)
+
+    def test_sample_estimator_matches_numpy(self):
+        np.testing.assert_allclose(estimate_covariance(self.returns, 'sample'), self.sample_cov)
+
+    def test_unknown_estimator(self):
+        with self.assertRaises(ValueError):
+            estimate_covariance(self.returns, 'invalid')
+
+    def test_ledoit_wolf_is_better_conditioned(self):
+        # Fewer observations than assets: the sample covariance is singular
+        short_history = self.returns[:30]
+        shrunk_cov = ledoit_wolf_covariance(short_history)
+
+        np.testing.assert_allclose(shrunk_cov, shrunk_cov.T)
+        self.assertGreater(np.linalg.eigvalsh(shrunk_cov).min(), 0)
+        self.assertLess(np.linalg.cond(shrunk_cov), np.linalg.cond(np.cov(short_history, rowvar=False)))
+
+    def test_ewma_weights_recent_observations(self):
+        # With no decay every observation counts equally (population covariance)
+        np.testing.assert_allclose(ewma_covariance(self.returns, decay=1.0), np.cov(self.returns, rowvar=False, ddof=0))
+
+        # With strong decay the estimate is dominated by the last observation's deviation
+        ewma_cov = ewma_covariance(self.returns, decay=0.5)
+        self.assertEqual(ewma_cov.shape, (40, 40))
+        self.assertGreater(np.linalg.eigvalsh(ewma_cov).min(), -1e-12)
+
+    def test_factor_model_structure(self):
+        factor_model = factor_covariance(self.returns, n_factors=self.n_factors)
+
+        self.assertIsInstance(factor_model, FactorCovariance)
+        self.assertEqual(factor_model.loadings.shape, (40, self.n_factors))
+
+        # Diagonal matches the sample variances and the off-diagonal is close to the sample covariance
+        np.testing.assert_allclose(factor_model.diagonal(), np.diag(self.sample_cov), rtol=1e-6)
+        self.assertLess(np.abs(factor_model.to_dense() - self.sample_cov).max(), 0.05 * np.abs(self.sample_cov).max())
+
+    def test_factor_model_products_match_dense(self):
+        factor_model = factor_covariance(self.returns, n_factors=self.n_factors)
+        dense = factor_model.to_dense()
+        weights = np.full(40, 1 / 40)
+
+        self.assertAlmostEqual(factor_model.variance(weights), weights @ dense @ weights)
+        np.testing.assert_allclose(factor_model.dot(weights), dense @ weights)
+        np.testing.assert_allclose(factor_model.dot(np.eye(40)[:, :2]), dense[:, :2])
+
+    def test_covariance_to_correlation(self):
+        sigma, correlation_matrix = covariance_to_correlation(self.sample_cov)
+        np.testing.assert_allclose(sigma, np.sqrt(np.diag(self.sample_cov)))
+        np.testing.assert_allclose(correlation_matrix, np.corrcoef(self.returns, rowvar=False), atol=1e-12)
+
+        # Structured input stays structured
+        _, factor_correlation = covariance_to_correlation(factor_covariance(self.returns, n_factors=self.n_factors))
+        self.assertIsInstance(factor_correlation, FactorCovariance)
+        np.testing.assert_allclose(factor_correlation.diagonal(), 1)
+
+    def test_get_correlation_matrix_with_estimator(self):
+        returns = pd.DataFrame(self.returns[:, :3], columns=['A', 'B', 'C'])
+        correlation_matrix = get_correlation_matrix(returns, method='ledoit_wolf')
+
+        self.assertListEqual(list(correlation_matrix.columns), ['A', 'B', 'C'])
+        np.testing.assert_allclose(np.diag(correlation_matrix), 1)
+
+
+class TestMissingData(unittest.TestCase):
+
+    def setUp(self):
+        # Ragged panel: one asset listed late, one with scattered gaps
+        rng = np.random.default_rng(1)
+        returns = rng.normal(0, 0.01, (250, 4)) + rng.normal(0, 0.01, (250, 1))
+        returns[:100, 1] = np.nan
+        returns[rng.random(250) < 0.1, 2] = np.nan
+        self.returns = pd.DataFrame(returns, columns=['A', 'B', 'C', 'D'])
+
+    def test_pairwise_covariance_matches_pandas(self):
+        np.testing.assert_allclose(pairwise_covariance(self.returns, repair=False), self.returns.cov().values, atol=1e-15)
+
+    def test_overlap_counts(self):
+        counts = overlap_counts(self.returns)
+        n_c = self.returns['C'].notna().sum()
+
+        self.assertEqual(counts[0, 0], 250)
+        self.assertEqual(counts[0, 1], 150)
+        self.assertEqual(counts[2, 2], n_c)
+        self.assertEqual(counts[1, 2], self.returns[['B', 'C']].notna().all(axis=1).sum())
+
+    def test_repair_psd(self):
+        matrix = np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]])
+        self.assertLess(np.linalg.eigvalsh(matrix).min(), 0)
+
+        repaired = repair_psd(matrix)
+        self.assertGreaterEqual(np.linalg.eigvalsh(repaired).min(), -1e-12)
+        np.testing.assert_allclose(np.diag(repaired), np.diag(matrix))
+
+    def test_get_return_keeps_incomplete_days(self):
+        prices = (1 + self.returns.fillna(0)).cumprod() * 100
+        prices.iloc[:100, 1] = np.nan
+
+        self.assertEqual(len(get_return(prices)), 149)
+        self.assertEqual(len(get_return(prices, complete=False)), 249)
+
+    def test_pairwise_estimator(self):
+        covariance = estimate_covariance(self.returns, 'pairwise')
+        correlation_matrix = get_correlation_matrix(self.returns)
+
+        self.assertGreaterEqual(np.linalg.eigvalsh(covariance).min(), -1e-15)
+        self.assertListEqual(list(correlation_matrix.columns), ['A', 'B', 'C', 'D'])
+        np.testing.assert_allclose(np.diag(correlation_matrix), 1)
+        self.assertFalse(correlation_matrix.isna().any().any())
+
 if __name__ == '__main__':
     unittest.main()
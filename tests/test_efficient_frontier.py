@@ -6,7 +6,7 @@ import unittest
 from unittest.mock import patch
 import numpy as np
 import matplotlib.pyplot as plt
-from src.efficient_frontier import plot_effifient_frontier  
+from src.efficient_frontier import plot_effifient_frontier, efficient_frontier_qp, bootstrap_moments, resampled_frontier
 from src.portfolio_optimizer import optimize_portfolio  
 
 class TestPlotEfficientFrontier(unittest.TestCase):
@@ -48,5 +48,72 @@ class TestPlotEfficientFrontier(unittest.TestCase):
         mock_optimize.assert_not_called()
         mock_show.assert_not_called()
 
+    def test_qp_method_matches_slsqp(self):
+        mu_annualized = np.array([0.05, 0.06, 0.07])
+        sigma_annualized = np.array([0.1, 0.12, 0.15])
+        correlation_matrix = np.array([[1, 0.5, 0.3], [0.5, 1, 0.4], [0.3, 0.4, 1]])
+
+        slsqp_volatilities = plot_effifient_frontier(mu_annualized, sigma_annualized, correlation_matrix, 1.0, plot=False)
+        qp_volatilities = plot_effifient_frontier(mu_annualized, sigma_annualized, correlation_matrix, 1.0, plot=False, method='qp')
+
+        np.testing.assert_allclose(qp_volatilities, slsqp_volatilities, atol=1e-4)
+
+    def sample_returns(self, n_obs=1000, seed=0):
+        # Daily returns of three correlated assets
+        covariance = np.array([[1, 0.5, 0.3], [0.5, 1, 0.4], [0.3, 0.4, 1]]) * np.outer([0.1, 0.12, 0.15], [0.1, 0.12, 0.15]) / 252
+        return np.random.default_rng(seed).multivariate_normal(np.array([0.05, 0.06, 0.07]) / 252, covariance, n_obs)
+
+    def test_bootstrap_moments(self):
+        returns = self.sample_returns()
+        mu, covariance = bootstrap_moments(returns, n_resamples=4, seed=1)
+        self.assertEqual(mu.shape, (4, 3))
+        self.assertEqual(covariance.shape, (4, 3, 3))
+
+        # Same moments as resampling the rows explicitly
+        draws = np.random.RandomState(1).randint(len(returns), size=(4, len(returns)))
+        for b in range(4):
+            np.testing.assert_allclose(mu[b], returns[draws[b]].mean(axis=0) * 252)
+            np.testing.assert_allclose(covariance[b], np.cov(returns[draws[b]], rowvar=False) * 252)
+
+    def test_resampled_frontier(self):
+        returns = self.sample_returns()
+        frontier = resampled_frontier(returns, n_resamples=50, n_points=20)
+
+        self.assertEqual(frontier['weights'].shape, (20, 3))
+        np.testing.assert_allclose(frontier['weights'].sum(axis=1), 1.0, atol=1e-5)
+        self.assertTrue(np.all(frontier['weights'] > -1e-5))
+        lower, upper = frontier['volatility_bands'][0.05], frontier['volatility_bands'][0.95]
+        self.assertTrue(np.all(lower <= upper))
+
+        # Resampled weights are spread over more assets than the single-asset end points of each sample
+        self.assertGreater(np.min(np.max(frontier['weights'], axis=1)), 0.3)
+
+    def test_resampled_frontier_chunks(self):
+        # Chunking the resamples only bounds memory: the frontier is the same
+        returns = self.sample_returns()
+        whole = resampled_frontier(returns, n_resamples=20, n_points=10, chunk_size=20)
+        chunked = resampled_frontier(returns, n_resamples=20, n_points=10, chunk_size=7)
+
+        np.testing.assert_allclose(chunked['weights'], whole['weights'], atol=1e-6)
+        np.testing.assert_allclose(chunked['volatility_bands'][0.95], whole['volatility_bands'][0.95], atol=1e-6)
+
+        # Chunks solved across processes give the same frontier too
+        pooled = resampled_frontier(returns, n_resamples=20, n_points=10, chunk_size=7, max_workers=2)
+        np.testing.assert_allclose(pooled['weights'], chunked['weights'], atol=1e-12)
+
+        with self.assertRaises(ValueError):
+            resampled_frontier(returns, n_resamples=20, n_points=2)
+
+    def test_resampled_frontier_matches_single_frontier(self):
+        # One resample's frontier agrees with the sequential ADMM frontier of the same estimates
+        returns = self.sample_returns()
+        frontier = resampled_frontier(returns, n_resamples=1, n_points=10, seed=3)
+        mu, covariance = bootstrap_moments(returns, n_resamples=1, seed=3)
+        sigma = np.sqrt(np.diag(covariance[0]))
+        targets = np.linspace(mu[0].min(), mu[0].max(), 10)[1:-1]
+
+        sequential = np.array([weights for weights, _ in efficient_frontier_qp(mu[0], sigma, covariance[0] / np.outer(sigma, sigma), targets)])
+        np.testing.assert_allclose(frontier['weights'][1:-1], sequential, atol=1e-4)
+
 if __name__ == '__main__':
     unittest.main()
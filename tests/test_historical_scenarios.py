@@ -0,0 +1,100 @@
+'''
+Purpose: Unit tests for the bootstrap and filtered historical simulation scenario generator
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import unittest
+import numpy as np
+from src.historical_scenarios import (bootstrap_indices, bootstrap_returns, fit_garch, scenario_prices, stream_scenarios,
+                                      scenario_var)
+from src.simulations import simulation_value
+
+
+def garch_returns(n_obs=2000, omega=1e-6, alpha=0.08, beta=0.9, seed=0):
+    # Two assets with GARCH(1,1) volatility and correlated shocks
+    rng = np.random.default_rng(seed)
+    chol = np.linalg.cholesky([[1.0, 0.6], [0.6, 1.0]])
+    variance = np.full(2, omega / (1 - alpha - beta))
+    returns = np.empty((n_obs, 2))
+    for t in range(n_obs):
+        error = np.sqrt(variance) * (chol @ rng.standard_normal(2))
+        returns[t] = 0.0003 + error
+        variance = omega + alpha * error**2 + beta * variance
+    return returns
+
+
+class TestHistoricalScenarios(unittest.TestCase):
+
+    def test_block_indices_are_contiguous(self):
+        index = bootstrap_indices(100, 3, 12, block_length=4, method='block', random_state=np.random.RandomState(1))
+        self.assertEqual(index.shape, (3, 12))
+        # Inside each fixed block the days follow each other (circularly)
+        steps = np.diff(index, axis=1) % 100
+        within = np.ones(11, dtype=bool)
+        within[3::4] = False
+        self.assertTrue(np.all(steps[:, within] == 1))
+
+    def test_stationary_block_lengths(self):
+        index = bootstrap_indices(1000, 2000, 50, block_length=5, random_state=np.random.RandomState(2))
+        self.assertTrue(np.all((index >= 0) & (index < 1000)))
+        # A block breaks with probability 1 / block_length
+        breaks = np.mean(np.diff(index, axis=1) % 1000 != 1)
+        self.assertAlmostEqual(breaks, 0.2, places=2)
+
+    def test_bootstrap_keeps_cross_asset_rows(self):
+        returns = garch_returns()
+        scenarios = bootstrap_returns(returns, 50, 20, random_state=np.random.RandomState(3))
+        self.assertEqual(scenarios.shape, (50, 20, 2))
+        # Every resampled day is a whole row of the history
+        rows = {tuple(row) for row in returns}
+        self.assertTrue(all(tuple(row) in rows for row in scenarios.reshape(-1, 2)))
+
+    def test_fit_garch_recovers_parameters(self):
+        garch = fit_garch(garch_returns(n_obs=4000))
+        np.testing.assert_allclose(garch.alpha + garch.beta, 0.98, atol=0.03)
+        np.testing.assert_allclose(garch.residuals.std(axis=0), 1.0, atol=0.05)
+        self.assertTrue(np.all(garch.next_variance > 0))
+
+    def test_filtered_scenarios_scale_with_current_volatility(self):
+        returns = garch_returns()
+        garch = fit_garch(returns)
+        calm = garch._replace(next_variance=garch.omega / (1 - garch.alpha - garch.beta) / 4)
+        stressed = garch._replace(next_variance=calm.next_variance * 16)
+
+        first_day = [bootstrap_returns(returns, 5000, 5, 'filtered', random_state=np.random.RandomState(4), garch=model)[:, 0]
+                     for model in (calm, stressed)]
+        np.testing.assert_allclose(first_day[1].std(axis=0) / first_day[0].std(axis=0), 4.0, rtol=0.05)
+
+    def test_stream_matches_simulation_shape(self):
+        returns = garch_returns()
+        chunks = list(stream_scenarios(returns, [10.0, 20.0], n_paths=25, n_steps=30, chunk_size=10))
+        self.assertEqual([chunk.shape for chunk in chunks], [(10, 30, 2), (10, 30, 2), (5, 30, 2)])
+        np.testing.assert_allclose(chunks[0][:, 0], [[10.0, 20.0]] * 10)
+
+        # The scenarios feed the same valuation as simulate_portfolio paths
+        portfolio = simulation_value(2, np.concatenate(chunks), n_simulations=25, n_steps=30)
+        self.assertEqual(portfolio.shape, (10, 30))
+        np.testing.assert_allclose(portfolio[:, 0], 1.0)
+
+    def test_scenario_var(self):
+        returns = garch_returns()
+        var, cvar = scenario_var([0.5, 0.5], returns, n_paths=4000, n_steps=21, chunk_size=1000)
+        self.assertLess(var, 0)
+        self.assertLessEqual(cvar, var)
+        # Chunking changes the draws, not the distribution
+        var_single, _ = scenario_var([0.5, 0.5], returns, n_paths=4000, n_steps=21, chunk_size=4000, seed=7)
+        self.assertAlmostEqual(var, var_single, places=2)
+
+    def test_scenario_prices_compound(self):
+        prices = scenario_prices(np.full((1, 3, 1), 0.1), [100.0])
+        np.testing.assert_allclose(prices[0, :, 0], [100.0, 110.0, 121.0, 133.1])
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            bootstrap_returns(garch_returns(n_obs=10), 1, 1, method='parametric')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+'''
+Purpose: Unit tests for the incremental moments and warm-started interactive sessions
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import unittest
+import numpy as np
+import pandas as pd
+from src.incremental import cholesky_update, IncrementalMoments, PortfolioSession, get_session, open_session
+from src.portfolio_optimizer import optimize_portfolio, portfolio_performance
+
+
+def sample_returns(n_obs=800, n_assets=5, seed=0):
+    # Daily returns with a common market factor
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0005, 0.01, (n_obs, n_assets)) + rng.normal(0, 0.005, (n_obs, 1))
+
+
+class TestIncremental(unittest.TestCase):
+
+    def test_cholesky_update(self):
+        A = np.cov(sample_returns(n_assets=4).T)
+        x = np.array([0.01, -0.02, 0.005, 0.0])
+        L = cholesky_update(np.linalg.cholesky(A), x)
+        np.testing.assert_allclose(L @ L.T, A + np.outer(x, x), atol=1e-15)
+        np.testing.assert_allclose(L, np.tril(L))
+
+    def test_append_days_matches_full_estimate(self):
+        R = sample_returns()
+        moments = IncrementalMoments(R[:500, :4])
+        for row in R[500:, :4]:
+            moments.append(row)
+
+        np.testing.assert_allclose(moments.covariance, np.cov(R[:, :4], rowvar=False), rtol=1e-10)
+        np.testing.assert_allclose(moments.mu_annualized, R[:, :4].mean(axis=0) * 252, rtol=1e-10)
+        np.testing.assert_allclose(moments.cholesky @ moments.cholesky.T, moments.scatter, rtol=1e-10)
+        np.testing.assert_array_equal(moments.returns, R[:, :4])
+
+    def test_add_asset_matches_full_estimate(self):
+        R = sample_returns()
+        moments = IncrementalMoments(R[:, :4])
+        moments.add_asset(R[:, 4])
+
+        np.testing.assert_allclose(moments.covariance, np.cov(R, rowvar=False), rtol=1e-10)
+        np.testing.assert_allclose(moments.correlation_matrix, np.corrcoef(R, rowvar=False), rtol=1e-10)
+        np.testing.assert_allclose(moments.cholesky @ moments.cholesky.T, moments.scatter, rtol=1e-10)
+
+        with self.assertRaises(ValueError):
+            moments.add_asset(np.full(len(R), np.nan))
+
+    def test_add_young_asset(self):
+        R = sample_returns()
+        young = R[:, 4].copy()
+        young[:300] = np.nan
+        moments = IncrementalMoments(R[:, :4])
+        moments.add_asset(young)
+
+        # Variance from the asset's own days, the rest of the history untouched
+        self.assertAlmostEqual(moments.covariance[4, 4], np.var(young[300:], ddof=1), places=12)
+        np.testing.assert_allclose(moments.covariance[:4, :4], np.cov(R[:, :4], rowvar=False), rtol=1e-10)
+        self.assertGreater(np.linalg.eigvalsh(moments.covariance).min(), 0)
+
+        one_day = np.full(len(R), np.nan)
+        one_day[-1] = 0.01
+        with self.assertRaises(ValueError):
+            moments.add_asset(one_day)
+
+    def test_add_two_young_assets(self):
+        R = sample_returns(n_assets=5)
+        columns = R[:, 3:].copy()
+        columns[:50, 0] = np.nan
+        columns[:20, 1] = np.nan
+        moments = IncrementalMoments(R[:, :3])
+        moments.add_asset(columns[:, 0])
+        moments.add_asset(columns[:, 1])
+
+        # The cross-moment of the two young assets uses the days both have, as pairwise_covariance
+        expected = pd.DataFrame(np.column_stack([R[:, :3], columns])).cov().values
+        np.testing.assert_allclose(moments.covariance, expected, rtol=1e-10)
+        self.assertTrue(np.isfinite(moments.cholesky).all())
+        self.assertGreater(np.linalg.eigvalsh(moments.covariance).min(), 0)
+
+    def test_remove_asset_matches_full_estimate(self):
+        R = sample_returns()
+        moments = IncrementalMoments(R)
+        moments.remove_asset(1)
+        remaining = R[:, [0, 2, 3, 4]]
+
+        np.testing.assert_allclose(moments.covariance, np.cov(remaining, rowvar=False), rtol=1e-10)
+        np.testing.assert_allclose(moments.cholesky, np.linalg.cholesky(moments.scatter), rtol=1e-8, atol=1e-12)
+        np.testing.assert_array_equal(moments.returns, remaining)
+
+        # The reduced factor keeps taking new days
+        moments.append(np.full(4, 0.002))
+        np.testing.assert_allclose(moments.covariance, np.cov(np.vstack([remaining, np.full(4, 0.002)]), rowvar=False), rtol=1e-10)
+
+        with self.assertRaises(ValueError):
+            IncrementalMoments(R[:, :1]).remove_asset(0)
+
+    def test_session_remove_and_update(self):
+        dates = pd.bdate_range('2020-01-01', periods=800)
+        R = pd.DataFrame(sample_returns(), index=dates, columns=list('ABCDE'))
+        session = PortfolioSession(list('ABCDE'), R.iloc[:790])
+        session.optimize(0.5)
+        session.frontier(n_points=10)
+
+        # Cached solutions lose the removed asset and still sum to one
+        session.remove_asset('C')
+        self.assertEqual(session.assets, list('ABDE'))
+        self.assertAlmostEqual(session.weights.sum(), 1.0)
+        np.testing.assert_allclose(session.frontier_weights.sum(axis=1), 1.0)
+        with self.assertRaises(ValueError):
+            session.remove_asset('C')
+
+        # Only the days after the session's last one are appended
+        self.assertEqual(session.update(R), 10)
+        self.assertEqual(session.update(R), 0)
+        np.testing.assert_allclose(session.moments.covariance, np.cov(R[list('ABDE')].values, rowvar=False), rtol=1e-10)
+
+        with self.assertRaises(ValueError):
+            session.append_day(np.full(4, 0.001))
+        with self.assertRaises(ValueError):
+            session.append_day(np.full(4, 0.001), date=dates[0])
+
+    def test_session_warm_start(self):
+        dates = pd.bdate_range('2020-01-01', periods=800)
+        R = pd.DataFrame(sample_returns(), index=dates, columns=list('ABCDE'))
+        session = PortfolioSession(list('ABCD'), R[list('ABCD')])
+        session.optimize(0.5)
+        session.frontier(n_points=20)
+
+        # Adding a ticker gives the same optimum as a cold run on the full universe
+        session.add_asset('E', R['E'])
+        weights, _ = session.optimize(0.5)
+        mu, sigma, correlation = R.mean().values * 252, R.std().values * np.sqrt(252), R.corr().values
+        cold, _ = optimize_portfolio(mu, sigma, correlation, 0.5)
+        # Same objective value (SLSQP stops within its tolerance from either start)
+        self.assertAlmostEqual(portfolio_performance(weights, mu, sigma, correlation, 0.5),
+                               portfolio_performance(cold, mu, sigma, correlation, 0.5), places=5)
+
+        _, volatilities, frontier_weights = session.frontier(n_points=20)
+        self.assertEqual(frontier_weights.shape, (20, 5))
+        np.testing.assert_allclose(frontier_weights.sum(axis=1), 1.0, atol=1e-5)
+        self.assertTrue(np.all(volatilities > 0))
+
+        session.append_day(np.full(5, 0.001), date=pd.Timestamp('2023-01-31'))
+        self.assertEqual(len(session.index), 801)
+        self.assertEqual(session.moments.n_obs, 801)
+
+    def test_session_cache(self):
+        R = sample_returns(n_assets=3)
+        session = open_session('test-session', list('ABC'), R)
+        self.assertIs(get_session('test-session'), session)
+        self.assertIsNone(get_session('unknown-session'))
+
+
+if __name__ == '__main__':
+    unittest.main()
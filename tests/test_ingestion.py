@@ -0,0 +1,124 @@
+'''
+Purpose: Unit tests for bulk ingestion against a local fake provider
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from src.ingestion import ingest_prices, ingest_option_chains, load_freshness, RateLimiter, call_with_retry
+from src.price_store import PriceStore, load_option_snapshot
+
+
+class FakeProvider:
+    """
+    Deterministic provider: fails the first `flaky` calls of a shard, always fails `broken` tickers
+    """
+
+    def __init__(self, flaky=1, broken=(), dates=pd.date_range('2024-01-01', periods=5, freq='D')):
+        self.flaky = flaky
+        self.broken = set(broken)
+        self.dates = dates
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def download_prices(self, tickers, start, end):
+        with self.lock:
+            key = tuple(tickers)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            if self.calls[key] <= self.flaky or self.broken.intersection(tickers):
+                raise ConnectionError('rate limited')
+
+        return pd.DataFrame({ticker: 100.0 + i + np.arange(len(self.dates)) for i, ticker in enumerate(tickers)},
+                            index=self.dates)
+
+    def option_chain(self, ticker, max_expirations=1):
+        if ticker in self.broken:
+            raise ConnectionError('no chain')
+
+        strikes = np.array([90.0, 100.0, 110.0])
+        return pd.DataFrame({
+            'ticker': ticker, 'expiration': '2025-03-21', 'option_type': ['call', 'put', 'call'],
+            'strike': strikes, 'bid': 1.0, 'ask': 1.2, 'last_price': 1.1, 'implied_volatility': 0.25, 'spot': 100.0,
+        })
+
+
+class TestIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.fast = dict(rate_limiter=RateLimiter(rate=1e6, burst=1000), backoff=0.001)
+
+    def tearDown(self):
+        self.store_dir.cleanup()
+
+    def test_ingest_prices_with_retries(self):
+        tickers = [f'T{i:03d}' for i in range(250)]
+        freshness = ingest_prices(tickers, 'bulk', FakeProvider(flaky=2), store_path=self.store_dir.name,
+                                  shard_size=40, max_workers=4, **self.fast)
+
+        store = PriceStore('bulk', self.store_dir.name)
+        self.assertListEqual(store.tickers, tickers)
+        self.assertEqual(store.values.shape, (5, 250))
+        self.assertTrue(all(record['status'] == 'ok' and record['attempts'] == 3 for record in freshness.values()))
+        self.assertEqual(freshness['T000']['last_date'], '2024-01-05')
+        self.assertDictEqual(load_freshness('bulk', self.store_dir.name), freshness)
+
+    def test_failed_shard_keeps_history(self):
+        tickers = ['AAA', 'BBB', 'CCC', 'DDD']
+        ingest_prices(tickers, 'bulk', FakeProvider(flaky=0), store_path=self.store_dir.name, shard_size=2, **self.fast)
+
+        # Second run: the shard holding CCC fails every attempt, the other one brings a new day
+        provider = FakeProvider(flaky=0, broken=['CCC'], dates=pd.date_range('2024-01-02', periods=5, freq='D'))
+        freshness = ingest_prices(tickers, 'bulk', provider, store_path=self.store_dir.name, shard_size=2, retries=2, **self.fast)
+
+        self.assertEqual(freshness['AAA']['status'], 'ok')
+        self.assertEqual(freshness['AAA']['last_date'], '2024-01-06')
+        self.assertEqual(freshness['CCC']['status'], 'failed')
+        self.assertEqual(freshness['CCC']['attempts'], 3)
+        self.assertEqual(freshness['CCC']['last_date'], '2024-01-05')
+        self.assertIn('ConnectionError', freshness['DDD']['error'])
+
+        prices = PriceStore('bulk', self.store_dir.name).frame()
+        self.assertListEqual(list(prices.columns), tickers)
+        self.assertEqual(len(prices), 6)
+        self.assertTrue(np.isnan(prices.loc['2024-01-06', 'CCC']))
+        self.assertEqual(prices.loc['2024-01-01', 'CCC'], 100.0)
+
+    def test_ingest_option_chains(self):
+        path, errors = ingest_option_chains(['AAA', 'BBB', 'CCC'], FakeProvider(broken=['BBB']), as_of='2025-01-02T15:30:00',
+                                            store_path=self.store_dir.name, **self.fast)
+
+        snapshot = load_option_snapshot(store_path=self.store_dir.name)
+        self.assertEqual(os.path.basename(path), '2025-01-02T15-30-00.npz')
+        self.assertListEqual(list(errors), ['BBB'])
+        self.assertEqual(len(snapshot['strike']), 6)
+        self.assertSetEqual(set(snapshot['ticker']), {'AAA', 'CCC'})
+        self.assertEqual(snapshot['expiration'].dtype, np.dtype('datetime64[D]'))
+
+    def test_retry_gives_up(self):
+        attempts = []
+
+        def always_fails():
+            attempts.append(1)
+            raise TimeoutError('timeout')
+
+        with self.assertRaises(TimeoutError):
+            call_with_retry(always_fails, retries=2, backoff=0.001)
+        self.assertEqual(len(attempts), 3)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(11):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+'''
+Purpose: Unit tests for the API load-test harness and its baseline comparison
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.load_test import (REQUEST_PROFILES, compare_to_baseline, run_load, start_server, stop_server, summarize, worker_memory,
+                           format_report)
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_summarize(self):
+        samples = [('small', latency / 1000, True) for latency in range(1, 101)] + [('large', 2.0, False)]
+        summary = summarize(samples, elapsed=10.0)
+
+        self.assertEqual(summary['requests'], 101)
+        self.assertEqual(summary['errors'], 1)
+        self.assertAlmostEqual(summary['throughput'], 10.1)
+        self.assertAlmostEqual(summary['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['p99_ms'], 99.01)
+        self.assertEqual(summary['profiles']['large']['error_rate'], 1.0)
+        self.assertEqual(summary['profiles']['small']['requests'], 100)
+
+    def test_compare_to_baseline(self):
+        level = {'p50_ms': 100.0, 'p95_ms': 200.0, 'p99_ms': 300.0, 'throughput': 10.0, 'error_rate': 0.0}
+        baseline = {'levels': {'50': level}}
+
+        self.assertEqual(compare_to_baseline({'levels': {'50': dict(level, p50_ms=115.0), '100': level}}, baseline), [])
+
+        regressions = compare_to_baseline({'levels': {'50': dict(level, p99_ms=400.0, throughput=7.0, error_rate=0.05)}}, baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('50 users: p99_ms'))
+
+    def test_prefork_server_on_synthetic_data(self):
+        # The server inherits the environment: its shocks are cached in a temporary directory
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, {'SDE_NOISE_CACHE_PATH': directory}):
+            process, base_url = start_server(workers=2, server='prefork')
+            try:
+                samples = run_load(base_url, users=2, n_requests=4, profiles={'small': REQUEST_PROFILES['small']})
+                memory = worker_memory(process.pid)
+            finally:
+                stop_server(process)
+
+        self.assertEqual(len(samples), 4)
+        self.assertTrue(all(ok for _, _, ok in samples))
+        if os.path.isdir('/proc'):
+            self.assertEqual(len(memory), 2)
+            self.assertTrue(all(worker['peak_rss_mb'] >= worker['rss_mb'] > 0 for worker in memory))
+
+        report = {'levels': {'2': {**summarize(samples, 1.0), 'worker_memory': memory}}}
+        self.assertIn('Worker RSS MB', format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
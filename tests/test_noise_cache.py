@@ -0,0 +1,107 @@
+'''
+Purpose: Unit tests for the cache of Monte Carlo shocks
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import unittest
+import numpy as np
+from src.noise_cache import CACHE_FORMAT_VERSION, NoiseCache
+from src.simulations import simulate_portfolio
+from src.data_handler import FactorCovariance
+
+
+class TestNoiseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.S0 = np.array([100.0, 50.0, 10.0])
+        self.mu = np.array([0.1, 0.05, 0.02])
+        self.sigma = np.array([0.3, 0.2, 0.05])
+        self.correlation = np.array([[1.0, 0.3, 0.1], [0.3, 1.0, 0.2], [0.1, 0.2, 1.0]])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cached_paths_match_fresh_draws(self):
+        for cache in (NoiseCache(), NoiseCache(self.directory.name)):
+            for correlation in (None, self.correlation):
+                for sampling in ('pseudo', 'qmc'):
+                    for precision in ('double', 'mixed'):
+                        kwargs = dict(correlation_matrix=correlation, n_simulations=64, sampling=sampling, precision=precision)
+                        fresh = simulate_portfolio(3, self.S0, self.mu, self.sigma, 1, 1 / 252, **kwargs)
+                        cached = simulate_portfolio(3, self.S0, self.mu, self.sigma, 1, 1 / 252, noise_cache=cache, **kwargs)
+                        np.testing.assert_array_equal(cached, fresh)
+
+            # The correlated runs rescale the shocks of the independent ones; other parameters reuse them too
+            self.assertEqual((cache.hits, cache.misses), (4, 4))
+            simulate_portfolio(3, self.S0, 2 * self.mu, self.sigma, 1, 1 / 252, n_simulations=64, noise_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (5, 4))
+
+    def test_factor_model_shocks(self):
+        factor = FactorCovariance(np.array([[0.6], [0.5], [0.2]]), 1 - np.array([0.36, 0.25, 0.04]))
+        fresh = simulate_portfolio(3, self.S0, self.mu, self.sigma, 1, 1 / 252, n_simulations=64, correlation_matrix=factor)
+        cached = simulate_portfolio(3, self.S0, self.mu, self.sigma, 1, 1 / 252, n_simulations=64, correlation_matrix=factor,
+                                    noise_cache=NoiseCache())
+        np.testing.assert_array_equal(cached, fresh)
+
+    def test_shared_read_only_buffer(self):
+        cache = NoiseCache(self.directory.name)
+        shocks = cache.shocks(32, 10, 3, seed=7)
+        self.assertIsInstance(shocks, np.memmap)
+        self.assertFalse(shocks.flags.writeable)
+        self.assertIs(cache.shocks(32, 10, 3, seed=7), shocks)
+
+        # Another process (a new cache on the same directory) maps the file instead of redrawing
+        other = NoiseCache(self.directory.name)
+        np.testing.assert_array_equal(other.shocks(32, 10, 3, seed=7), shocks)
+        self.assertEqual((other.hits, other.misses), (1, 0))
+
+        # Different seeds or shapes are different entries, and the oldest entries are closed first
+        small = NoiseCache(max_entries=2)
+        first = small.shocks(4, 5, 2, seed=1)
+        small.shocks(4, 5, 2, seed=2)
+        small.shocks(4, 6, 2, seed=1)
+        self.assertIsNot(small.shocks(4, 5, 2, seed=1), first)
+        self.assertEqual(small.misses, 4)
+
+        with self.assertRaises(ValueError):
+            cache.shocks(4, 5, 2, model='heston')
+
+    def test_disk_size_cap(self):
+        # Each (32, 10, 3) float64 entry takes 7808 bytes on disk: room for two
+        cache = NoiseCache(self.directory.name, max_bytes=16000)
+        stale = os.path.join(self.directory.name, 'gbm-pseudo-42-32x10x3+0-float64.npy')
+        np.save(stale, np.zeros((32, 10, 3)))
+
+        cache.shocks(32, 10, 3, seed=1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(all(name.startswith(f'v{CACHE_FORMAT_VERSION}-') for name in os.listdir(self.directory.name)))
+
+        # Mapping an entry from disk marks it as recently used, so the other one is evicted
+        first, second = cache._file(('gbm', 'pseudo', 1, 32, 10, 3, 0, 'float64')), cache._file(('gbm', 'pseudo', 2, 32, 10, 3, 0, 'float64'))
+        cache.shocks(32, 10, 3, seed=2)
+        os.utime(first, (0, 0))
+        os.utime(second, (1, 1))
+        NoiseCache(self.directory.name).shocks(32, 10, 3, seed=1)
+        cache.shocks(32, 10, 3, seed=3)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted([os.path.basename(first), os.path.basename(cache._file(
+            ('gbm', 'pseudo', 3, 32, 10, 3, 0, 'float64')))]))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.directory.name, name)) for name in os.listdir(self.directory.name)), 16000)
+
+        # An entry larger than the cap is returned uncached: no file, and nothing kept open
+        large = cache.shocks(64, 100, 3, seed=1)
+        self.assertNotIsInstance(large, np.memmap)
+        self.assertFalse(large.flags.writeable)
+        self.assertNotIn(('gbm', 'pseudo', 1, 64, 100, 3, 0, 'float64'), cache._entries)
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+        in_memory = NoiseCache(max_bytes=16000)
+        in_memory.shocks(64, 100, 3, seed=1)
+        self.assertEqual(len(in_memory._entries), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,14 @@
 """
 Purpose: Unit tests to ensure the correctness of portfolio optimization logic.
 """
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import time
 import unittest
-from src.portfolio_optimizer import optimize_portfolio, portfolio_performance
+from scipy import sparse
+from src.portfolio_optimizer import optimize_portfolio, optimize_portfolio_large, portfolio_performance
 import pandas as pd
 import numpy as np
 from scipy.optimize import minimize
@@ -70,7 +76,87 @@ class TestPortfolioOptimization(unittest.TestCase):
         # Check if the return and volatility are expected values
         self.assertGreater(portfolio_return, 0)  # Expected return should be positive
         self.assertGreater(portfolio_volatility, 0)  # Expected volatility should be positive
+
+    def test_optimize_portfolio_with_factor_model(self):
+        # A structured correlation gives the same optimum as its dense equivalent
+        from src.data_handler import FactorCovariance
+        loadings = np.array([[0.8], [0.6], [0.5]])
+        factor_correlation = FactorCovariance(loadings, 1 - loadings[:, 0]**2)
+
+        dense_weights, (dense_return, dense_volatility) = optimize_portfolio(self.mu, self.sigma, factor_correlation.to_dense(), self.risk_tolerance)
+        factor_weights, (factor_return, factor_volatility) = optimize_portfolio(self.mu, self.sigma, factor_correlation, self.risk_tolerance)
+
+        np.testing.assert_allclose(factor_weights, dense_weights, atol=1e-6)
+        self.assertAlmostEqual(factor_volatility, dense_volatility, places=6)
     
 
+class TestLargePortfolioOptimization(unittest.TestCase):
+
+    def setUp(self):
+        # S&P 500-sized universe with a 5-factor correlation structure
+        from src.data_handler import FactorCovariance
+        rng = np.random.default_rng(0)
+        self.num_assets = 500
+        loadings = rng.uniform(0.1, 0.4, (self.num_assets, 5))
+        self.correlation_matrix = FactorCovariance(loadings, 1 - np.sum(loadings**2, axis=1))
+        self.mu = rng.normal(0.08, 0.04, self.num_assets)
+        self.sigma = rng.uniform(0.15, 0.45, self.num_assets)
+
+    def test_matches_slsqp_on_small_problem(self):
+        mu = np.array([0.05, 0.07, 0.06])
+        sigma = np.array([0.1, 0.2, 0.15])
+        correlation_matrix = np.array([[1.0, 0.5, 0.3], [0.5, 1.0, 0.4], [0.3, 0.4, 1.0]])
+
+        slsqp_weights, _ = optimize_portfolio(mu, sigma, correlation_matrix, 0.5, target_return=0.06)
+        qp_weights, (qp_return, _) = optimize_portfolio_large(mu, sigma, correlation_matrix, 0.5, target_return=0.06)
+
+        np.testing.assert_allclose(qp_weights, slsqp_weights, atol=1e-3)
+        self.assertAlmostEqual(qp_return, 0.06, places=5)
+
+    def test_large_universe_is_fast(self):
+        start = time.perf_counter()
+        weights, (portfolio_return, portfolio_volatility) = optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5)
+        elapsed = time.perf_counter() - start
+
+        self.assertAlmostEqual(weights.sum(), 1, places=5)
+        self.assertGreater(weights.min(), -1e-5)
+        self.assertLess(elapsed, 1.0)
+
+    def test_per_asset_and_group_constraints(self):
+        # Two sectors; sector 0 (first half) capped at 30%, no single position above 5%
+        groups = np.repeat([0, 1], self.num_assets // 2)
+        group_matrix = sparse.csr_matrix((np.ones(self.num_assets), (groups, np.arange(self.num_assets))))
+
+        weights, _ = optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5, upper_bounds=0.05,
+                                              group_matrix=group_matrix, group_upper=[0.3, 1.0])
+
+        self.assertLessEqual(weights.max(), 0.05 + 1e-5)
+        self.assertLessEqual(weights[groups == 0].sum(), 0.3 + 1e-5)
+        self.assertAlmostEqual(weights.sum(), 1, places=5)
+
+    def test_turnover_limit(self):
+        current_weights = np.full(self.num_assets, 1 / self.num_assets)
+        weights, _ = optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5,
+                                              current_weights=current_weights, max_turnover=0.2)
+
+        self.assertLessEqual(np.abs(weights - current_weights).sum(), 0.2 + 1e-4)
+
+    def test_cardinality_limit(self):
+        weights, _ = optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5, upper_bounds=0.1, max_assets=20)
+
+        self.assertLessEqual(np.count_nonzero(weights), 20)
+        self.assertAlmostEqual(weights.sum(), 1, places=4)
+
+        # Five positions of at most 10% cannot make a fully invested portfolio
+        with self.assertRaises(ValueError):
+            optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5, upper_bounds=0.1, max_assets=5)
+
+    def test_infeasible_target_return(self):
+        start = time.perf_counter()
+        with self.assertRaises(ValueError):
+            optimize_portfolio_large(self.mu, self.sigma, self.correlation_matrix, 0.5, target_return=self.mu.max() + 0.1)
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,74 @@
+'''
+Purpose: Accuracy tests of the mixed (float32) precision policy against the float64 reference
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import unittest
+import numpy as np
+from src.precision import storage_dtype, as_storage_array
+from src.simulations import simulate_portfolio, simulation_value
+from src.risk import risk_metrics
+from src.rebalance_policies import evaluate_rebalancing_policy
+from src.cvar_optimizer import scenario_returns, portfolio_cvar
+from src.config import RunConfig
+
+
+class TestMixedPrecision(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.n_assets = 8
+        self.mu = rng.uniform(0.0, 0.12, self.n_assets)
+        self.sigma = rng.uniform(0.1, 0.5, self.n_assets)
+        A = rng.normal(size=(self.n_assets, self.n_assets))
+        self.correlation = np.corrcoef(A @ A.T + self.n_assets * np.eye(self.n_assets))
+        self.weights = rng.dirichlet(np.ones(self.n_assets))
+
+        simulate = lambda precision: simulate_portfolio(self.n_assets, np.full(self.n_assets, 100.0), self.mu, self.sigma, 1, 1 / 252,
+                                                        n_simulations=500, correlation_matrix=self.correlation, precision=precision)
+        self.reference = simulate('double')
+        self.mixed = simulate('mixed')
+
+    def test_paths(self):
+        self.assertEqual(self.reference.dtype, np.float64)
+        self.assertEqual(self.mixed.dtype, np.float32)
+        self.assertEqual(self.mixed.nbytes * 2, self.reference.nbytes)
+        # Same shocks, rounded: relative error of a few float32 ulps after 252 compounded steps
+        np.testing.assert_allclose(self.mixed, self.reference, rtol=1e-5)
+
+    def test_valuation(self):
+        values = simulation_value(self.n_assets, self.mixed, 1)
+        np.testing.assert_allclose(values, simulation_value(self.n_assets, self.reference, 1), rtol=1e-5)
+
+    def test_risk_metrics(self):
+        returns = np.diff(self.reference[0], axis=0) / self.reference[0, :-1]
+        reference = risk_metrics(self.weights, returns)
+        mixed = risk_metrics(self.weights, returns.astype(np.float32))
+
+        for name, values in reference.items():
+            self.assertEqual(mixed[name].dtype, np.float64, name)
+            np.testing.assert_allclose(mixed[name], values, rtol=1e-4, err_msg=name)
+
+    def test_rebalancing_and_cvar(self):
+        reference = evaluate_rebalancing_policy(self.reference, self.weights, period=63)
+        mixed = evaluate_rebalancing_policy(self.mixed, self.weights, period=63)
+        np.testing.assert_allclose(mixed['terminal_wealth'], reference['terminal_wealth'], rtol=1e-5)
+
+        # The optimizer side works in float64 whatever the scenario precision
+        self.assertEqual(scenario_returns(self.mixed).dtype, np.float64)
+        np.testing.assert_allclose(portfolio_cvar(self.weights, self.mixed), portfolio_cvar(self.weights, self.reference), rtol=1e-4)
+
+    def test_policy(self):
+        self.assertEqual(storage_dtype('mixed'), np.float32)
+        self.assertEqual(as_storage_array([1, 2]).dtype, np.float64)
+        self.assertEqual(RunConfig(precision='mixed').precision, 'mixed')
+        with self.assertRaises(ValueError):
+            storage_dtype('half')
+        with self.assertRaises(ValueError):
+            RunConfig(precision='half')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+'''
+Purpose: Unit tests for the memory-mapped price store
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.price_store import write_price_store, open_price_store
+from unittest.mock import patch
+from src.data_handler import load_prices, asset_prices
+
+
+def column_sum(store, ticker):
+    # Runs in a worker process: the store arrives by reference and is re-attached there
+    return float(store.column(ticker).sum()), isinstance(store.values, np.memmap)
+
+
+def publish(prices, universe, store_path):
+    # Runs in another process: a new version written while the test process holds a mapping
+    write_price_store(prices, universe, store_path)
+
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.prices = pd.DataFrame(np.arange(40, dtype=float).reshape(10, 4) + 100,
+                                   index=pd.date_range('2024-01-01', periods=10, freq='D'),
+                                   columns=['AAPL', 'MSFT', 'TSLA', 'SPY'])
+        write_price_store(self.prices, 'test', self.store_dir.name)
+        self.store = open_price_store('test', self.store_dir.name)
+
+    def tearDown(self):
+        self.store_dir.cleanup()
+
+    def test_round_trip(self):
+        pd.testing.assert_frame_equal(self.store.frame(), self.prices, check_names=False, check_freq=False, check_index_type=False)
+        self.assertListEqual(self.store.tickers, ['AAPL', 'MSFT', 'TSLA', 'SPY'])
+        self.assertEqual(self.store.columns['TSLA'], 2)
+
+    def test_views_are_zero_copy_and_read_only(self):
+        column = self.store.column('MSFT')
+        self.assertTrue(np.shares_memory(column, self.store.values))
+        self.assertTrue(column.flags.c_contiguous)
+        self.assertFalse(column.flags.writeable)
+
+        # Whole matrix and contiguous ticker runs are views; the DataFrame wraps them without copying
+        self.assertTrue(np.shares_memory(self.store.matrix(['MSFT', 'TSLA']), self.store.values))
+        self.assertTrue(np.shares_memory(self.store.frame().to_numpy(), self.store.values))
+
+        # Arbitrary selections gather the requested columns
+        np.testing.assert_array_equal(self.store.matrix(['SPY', 'AAPL']), self.prices[['SPY', 'AAPL']].values)
+
+    def test_date_range(self):
+        window = self.store.frame(['AAPL'], start='2024-01-03', end='2024-01-05')
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window.index[0], pd.Timestamp('2024-01-03'))
+        np.testing.assert_array_equal(self.store.column('AAPL', start='2024-01-09'), [132.0, 136.0])
+
+    def test_pickles_by_reference(self):
+        payload = pickle.dumps(self.store)
+        self.assertLess(len(payload), 500)  # Only the universe name and path, not the prices
+        self.assertIs(pickle.loads(payload), self.store)  # Same process: the existing mapping is reused
+
+    def test_worker_processes_attach(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(column_sum, [self.store] * 2, ['AAPL', 'SPY']))
+
+        self.assertEqual(results, [(self.prices['AAPL'].sum(), True), (self.prices['SPY'].sum(), True)])
+
+    def test_rewrite_replaces_universe(self):
+        write_price_store(self.prices * 2, 'test', self.store_dir.name)
+        np.testing.assert_array_equal(open_price_store('test', self.store_dir.name).column('AAPL'), self.prices['AAPL'].values * 2)
+
+    def test_rewrite_publishes_one_version(self):
+        old_store = self.store
+        write_price_store(self.prices.iloc[:5, :2], 'test', self.store_dir.name)
+
+        # The metadata names the values file of its own version; the previous one is removed
+        with open(os.path.join(self.store_dir.name, 'test.json')) as f:
+            metadata = json.load(f)
+        self.assertListEqual(sorted(name for name in os.listdir(self.store_dir.name) if name.endswith('.prices')), [metadata['values']])
+
+        new_store = open_price_store('test', self.store_dir.name)
+        self.assertEqual(new_store.values.shape, (5, 2))
+        self.assertEqual(len(new_store.dates), 5)
+
+        # A process still holding the old mapping keeps reading consistent old prices
+        np.testing.assert_array_equal(old_store.column('SPY'), self.prices['SPY'].values)
+
+    def test_other_process_publishes_new_version(self):
+        self.assertEqual(len(open_price_store('test', self.store_dir.name).dates), 10)
+
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            pool.submit(publish, self.prices.iloc[:4, :3], 'test', self.store_dir.name).result()
+
+        # The metadata was replaced by the other process: the next open re-attaches to the new version
+        store = open_price_store('test', self.store_dir.name)
+        self.assertEqual(store.values.shape, (4, 3))
+        self.assertEqual(len(store.dates), 4)
+        self.assertIs(open_price_store('test', self.store_dir.name), store)
+
+    def test_asset_prices_from_configured_universe(self):
+        with patch.dict(os.environ, {'SDE_PRICE_UNIVERSE': 'test'}), patch('config.DATA_STORE_PATH', self.store_dir.name), \
+                patch('src.data_handler.fetch_data') as mock_fetch:
+            prices = asset_prices(['MSFT', 'TSLA'])
+
+        mock_fetch.assert_not_called()
+        np.testing.assert_array_equal(prices.values, self.prices[['MSFT', 'TSLA']].values)
+
+    def test_load_prices(self):
+        prices = load_prices('test', tickers=['AAPL', 'MSFT'], store_path=self.store_dir.name)
+        np.testing.assert_array_equal(prices.values, self.prices[['AAPL', 'MSFT']].values)
+
+        # Repeated loads are views of the same mapping
+        self.assertTrue(np.shares_memory(prices.to_numpy(), load_prices('test', store_path=self.store_dir.name).to_numpy()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+'''
+Purpose: Unit tests for the vectorized Black-Scholes path and offline batch pricing of option snapshots
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import time
+import unittest
+import zipfile
+import numpy as np
+from src.risk_neutral_pricing import risk_neutral_price, black_scholes
+from src.price_store import write_option_snapshot
+from src.pricing_batch import price_option_snapshot, run_pricing_batch, time_to_maturity
+
+
+def make_chain(n_contracts, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'ticker': rng.choice(['AAPL', 'TSLA', 'MSFT'], n_contracts),
+        'expiration': np.datetime64('2025-01-03') + rng.integers(1, 400, n_contracts),
+        'option_type': rng.choice(['call', 'put'], n_contracts),
+        'strike': rng.uniform(50, 150, n_contracts).round(),
+        'bid': np.ones(n_contracts),
+        'ask': np.ones(n_contracts),
+        'last_price': np.ones(n_contracts),
+        'implied_volatility': rng.uniform(0.1, 0.8, n_contracts),
+        'spot': np.full(n_contracts, 100.0),
+    }
+
+
+class TestBlackScholes(unittest.TestCase):
+
+    def test_matches_scalar_pricer(self):
+        strikes = np.array([80.0, 100.0, 120.0])
+        for option_type in ['call', 'put']:
+            vectorized = black_scholes(100, strikes, 0.5, 0.05, 0.2, option_type == 'call')['price']
+            for K, price in zip(strikes, vectorized):
+                self.assertAlmostEqual(price, risk_neutral_price(100, K, 0.5, 0.05, 0.2, option_type), places=10)
+
+    def test_greeks_match_finite_differences(self):
+        S0, K, T, r, sigma, h = 100.0, 105.0, 0.75, 0.03, 0.25, 1e-4
+        for is_call in [True, False]:
+            greeks = black_scholes(S0, K, T, r, sigma, is_call)
+            price = lambda **bump: black_scholes(**{**dict(S0=S0, K=K, T=T, r=r, sigma=sigma, is_call=is_call), **bump})['price']
+
+            self.assertAlmostEqual(greeks['delta'], (price(S0=S0 + h) - price(S0=S0 - h)) / (2 * h), places=6)
+            self.assertAlmostEqual(greeks['gamma'], (price(S0=S0 + 1e-2) - 2 * greeks['price'] + price(S0=S0 - 1e-2)) / 1e-4, places=5)
+            self.assertAlmostEqual(greeks['vega'], (price(sigma=sigma + h) - price(sigma=sigma - h)) / (2 * h), places=4)
+            self.assertAlmostEqual(greeks['rho'], (price(r=r + h) - price(r=r - h)) / (2 * h), places=4)
+            # Theta is the derivative with respect to calendar time, i.e. minus the maturity derivative
+            self.assertAlmostEqual(greeks['theta'], -(price(T=T + h) - price(T=T - h)) / (2 * h), places=4)
+
+    def test_invalid_contracts_are_nan(self):
+        prices = black_scholes([100, 100, -1], [100, 100, 100], [1, 0, 1], 0.05, [0.2, 0.2, 0.2])['price']
+        self.assertFalse(np.isnan(prices[0]))
+        self.assertTrue(np.isnan(prices[1:]).all())
+
+
+class TestPricingBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.store_dir.cleanup()
+
+    def test_time_to_maturity(self):
+        self.assertAlmostEqual(time_to_maturity(np.datetime64('2026-01-01'), '2025-01-01T00:00:00'), 1.0)
+
+    def test_batch_is_deterministic(self):
+        write_option_snapshot(make_chain(1000), '2025-01-02T16:00:00', self.store_dir.name)
+        first, path = run_pricing_batch(store_path=self.store_dir.name, r=0.05)
+        with open(path, 'rb') as f:
+            first_bytes = f.read()
+        second, _ = run_pricing_batch(store_path=self.store_dir.name, r=0.05)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), first_bytes)
+
+        # Zip entries carry a fixed timestamp, not the time of the run
+        with zipfile.ZipFile(path) as archive:
+            self.assertSetEqual({info.date_time for info in archive.infolist()}, {(1980, 1, 1, 0, 0, 0)})
+
+        self.assertEqual(os.path.basename(path), '2025-01-02T16-00-00.npz')
+        for name in ['price', 'delta', 'gamma', 'vega', 'theta', 'rho']:
+            np.testing.assert_array_equal(first[name], second[name])
+
+        with np.load(path) as stored:
+            np.testing.assert_array_equal(stored['price'], first['price'])
+            self.assertEqual(len(stored['ticker']), 1000)
+
+        # Spot check one contract against the scalar pricer
+        i = 0
+        expected = risk_neutral_price(100.0, first['strike'][i], first['time_to_maturity'][i], 0.05,
+                                      first['implied_volatility'][i], str(first['option_type'][i]))
+        self.assertAlmostEqual(first['price'][i], expected, places=10)
+
+    def test_volatility_per_ticker(self):
+        chain = make_chain(50)
+        chain['as_of'] = np.datetime64('2025-01-02T16:00:00')
+        results = price_option_snapshot(chain, r=0.05, volatility={'AAPL': 0.3, 'TSLA': 0.6})
+
+        expected = black_scholes(chain['spot'], chain['strike'], results['time_to_maturity'], 0.05,
+                                 np.where(chain['ticker'] == 'AAPL', 0.3, 0.6), chain['option_type'] == 'call')['price']
+        known = chain['ticker'] != 'MSFT'
+        np.testing.assert_allclose(results['price'][known], expected[known])
+        self.assertTrue(np.isnan(results['price'][~known]).all())
+
+    def test_reprices_large_snapshot_quickly(self):
+        chain = make_chain(500_000)
+        chain['as_of'] = np.datetime64('2025-01-02T16:00:00')
+
+        start = time.perf_counter()
+        results = price_option_snapshot(chain, r=0.05)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertFalse(np.isnan(results['price']).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+'''
+Purpose: Unit tests for the per-stage profiler and the CLI stage selection
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+import tempfile
+import unittest
+import numpy as np
+from src.profiling import StageProfiler
+from src.main import main, parse_args
+
+
+def _leaf(n):
+    return np.ones(n).sum()
+
+
+def _work():
+    return [_leaf(100000) for _ in range(3)]
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_speedscope_report(self):
+        profiler = StageProfiler()
+        with profiler.stage('work'):
+            _work()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.speedscope.json')
+            profiler.write_speedscope(path)
+            with open(path) as f:
+                report = json.load(f)
+
+        names = [frame['name'] for frame in report['shared']['frames']]
+        self.assertIn('_work', names)
+        self.assertIn('_leaf', names)
+
+        profile, = report['profiles']
+        self.assertEqual(profile['name'], 'work')
+
+        # Events are time-ordered and every close matches the innermost open frame
+        stack, last = [], 0
+        for event in profile['events']:
+            self.assertGreaterEqual(event['at'], last)
+            last = event['at']
+            if event['type'] == 'O':
+                stack.append(event['frame'])
+            else:
+                self.assertEqual(stack.pop(), event['frame'])
+        self.assertEqual(stack, [])
+        self.assertLessEqual(last, profile['endValue'])
+
+        # _leaf is called three times
+        leaf = names.index('_leaf')
+        self.assertEqual(sum(event['type'] == 'O' and event['frame'] == leaf for event in profile['events']), 3)
+
+    def test_memory_table(self):
+        profiler = StageProfiler(trace_calls=False)
+        with profiler.stage('allocate'):
+            block = np.ones(2**20)  # 8 MB
+            del block
+
+        row, = profiler.memory
+        self.assertGreaterEqual(row['peak_mb'], 8)
+        self.assertLess(row['retained_mb'], 1)
+        self.assertEqual(profiler.profiles, [])
+        self.assertIn('allocate', profiler.memory_table())
+
+
+class TestStageSelection(unittest.TestCase):
+
+    def test_parse_args(self):
+        args = parse_args(['--stages', 'optimize, simulate', '--profile', 'out'])
+        self.assertEqual(args.stages, ['optimize', 'simulate'])
+        self.assertEqual(args.profile, 'out')
+        self.assertIsNone(args.cached)
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            main(stages=['optimise'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+'''
+Purpose: Unit tests for the ADMM quadratic program solver
+'''
+
+import unittest
+import numpy as np
+from scipy import sparse
+from src.qp_solver import ADMMSolver, solve_qp, solve_qp_batch
+
+class TestADMMSolver(unittest.TestCase):
+
+    def setUp(self):
+        # minimize (x1 - 1)^2 + (x2 - 2)^2  subject to  x1 + x2 = 1, 0 <= x <= 0.8
+        self.P = 2 * np.eye(2)
+        self.q = np.array([-2.0, -4.0])
+        self.A = sparse.vstack([sparse.identity(2), sparse.csr_matrix([[1.0, 1.0]])])
+        self.l = np.array([0.0, 0.0, 1.0])
+        self.u = np.array([0.8, 0.8, 1.0])
+
+    def test_solves_constrained_problem(self):
+        result = solve_qp(self.P, self.q, self.A, self.l, self.u)
+
+        self.assertEqual(result.status, 'solved')
+        np.testing.assert_allclose(result.x, [0.2, 0.8], atol=1e-5)
+
+    def test_unconstrained_rows(self):
+        # Infinite bounds leave the unconstrained minimizer (1, 2)
+        result = solve_qp(self.P, self.q, sparse.identity(2), [-np.inf, -np.inf], [np.inf, np.inf])
+        np.testing.assert_allclose(result.x, [1.0, 2.0], atol=1e-5)
+
+    def test_bound_update_and_warm_start(self):
+        solver = ADMMSolver(self.P, self.q, self.A, self.l, self.u)
+        first = solver.solve()
+
+        # Changing the budget row only updates bounds; the warm-started re-solve needs fewer iterations
+        solver.update(l=[0.0, 0.0, 1.2], u=[0.8, 0.8, 1.2])
+        second = solver.solve()
+        np.testing.assert_allclose(second.x, [0.4, 0.8], atol=1e-5)
+
+        solver.update(l=self.l, u=self.u)
+        third = solver.solve()
+        np.testing.assert_allclose(third.x, first.x, atol=1e-5)
+        self.assertLessEqual(third.iterations, first.iterations)
+
+    def test_sparse_objective(self):
+        result = solve_qp(sparse.csc_matrix(self.P), self.q, self.A, self.l, self.u)
+
+        self.assertEqual(result.status, 'solved')
+        np.testing.assert_allclose(result.x, [0.2, 0.8], atol=1e-5)
+
+    def test_primal_infeasible(self):
+        # x1 + x2 = 1.8 cannot hold with 0 <= x <= 0.8
+        result = solve_qp(self.P, self.q, self.A, [0.0, 0.0, 1.8], [0.8, 0.8, 1.8])
+
+        self.assertEqual(result.status, 'primal_infeasible')
+        self.assertLess(result.iterations, 10000)
+
+    def test_max_iter_reached(self):
+        result = solve_qp(self.P, self.q, self.A, self.l, self.u, max_iter=3)
+        self.assertEqual(result.status, 'max_iter_reached')
+        self.assertEqual(result.iterations, 3)
+
+    def test_batch_matches_single_solves(self):
+        # Two problems (scaled objectives), each with two budget rows
+        P = np.stack([self.P, 4 * self.P])
+        q = np.stack([self.q, 4 * self.q])
+        A = np.broadcast_to(self.A.toarray(), (2, 3, 2))
+        l = np.array([[self.l, [0.0, 0.0, 1.2]]] * 2)
+        u = np.array([[self.u, [0.8, 0.8, 1.2]]] * 2)
+
+        result = solve_qp_batch(P, q, A, l, u)
+        self.assertEqual(result.x.shape, (2, 2, 2))
+        self.assertTrue(np.all(result.status == 'solved'))
+        for b in range(2):
+            for k in range(2):
+                single = solve_qp(P[b], q[b], self.A, l[b, k], u[b, k])
+                np.testing.assert_allclose(result.x[b, k], single.x, atol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'
 import unittest
 import numpy as np
 import pandas as pd
-from src.rebalance import continuous_monitoring_and_rebalancing, adjust_weights_based_on_price_change
+from src.rebalance import (continuous_monitoring_and_rebalancing, adjust_weights_based_on_price_change, holdings_from_weights,
+                           portfolio_drift, rebalance_holdings)
 from src.portfolio_optimizer import optimize_portfolio  
 from src.optimal_stopping import optimal_stopping_rule 
 
@@ -79,5 +80,39 @@ class TestContinuousMonitoringAndRebalancing(unittest.TestCase):
         
         # Todo: reform logic
 
+    def test_adjust_weights_drift_and_rebalance(self):
+        target = np.array([0.6, 0.4])
+
+        # A 2% move leaves the drifted weights inside a 3% threshold
+        adjusted = adjust_weights_based_on_price_change(target, [102.0, 50.0], 0.03, previous_price=[100.0, 50.0])
+        np.testing.assert_allclose(adjusted, [61.2 / 101.2, 40 / 101.2])
+
+        # A 20% move drifts past it, so the portfolio is traded back to the targets
+        adjusted = adjust_weights_based_on_price_change(target, [120.0, 50.0], 0.03, previous_price=[100.0, 50.0])
+        np.testing.assert_allclose(adjusted, target)
+
+        # ... or only back to the edge of a 2% no-trade band
+        adjusted = adjust_weights_based_on_price_change(target, [120.0, 50.0], 0.03, previous_price=[100.0, 50.0], band=0.02)
+        np.testing.assert_allclose(adjusted, [0.62, 0.38], atol=1e-9)
+
+    def test_rebalance_many_portfolios(self):
+        rng = np.random.default_rng(0)
+        targets = rng.dirichlet(np.ones(4), size=1000)
+        holdings = holdings_from_weights(targets, np.full(4, 100.0), wealth=np.full(1000, 10.0))
+        prices = 100.0 * np.exp(rng.normal(0, 0.1, (1000, 4)))
+
+        weights, drift, wealth = portfolio_drift(holdings, prices, targets)
+        np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+
+        result = rebalance_holdings(holdings, prices, targets, threshold=0.05, band=0.01, transaction_cost=0.001)
+        np.testing.assert_array_equal(result.rebalanced, np.max(np.abs(drift), axis=1) > 0.05)
+        np.testing.assert_array_equal(result.holdings[~result.rebalanced], holdings[~result.rebalanced])
+
+        # Rebalanced portfolios end inside the band, having paid their costs
+        new_weights, new_drift, new_wealth = portfolio_drift(result.holdings, prices, targets)
+        self.assertLessEqual(np.max(np.abs(new_drift[result.rebalanced])), 0.01 + 1e-9)
+        np.testing.assert_allclose(new_wealth, wealth - result.costs)
+        np.testing.assert_allclose(result.costs, 0.001 * result.traded)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+'''
+Purpose: Unit tests for rebalancing policy evaluation over simulated paths
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import unittest
+import numpy as np
+from src.rebalance_policies import evaluate_rebalancing_policy, compare_rebalancing_policies
+from src.simulations import simulate_portfolio
+
+
+def rebalance_one_path(path, weights, period, cost):
+    # Straightforward single-path reference implementation
+    holdings = weights / path[0]
+    for t in range(1, len(path)):
+        if t % period == 0:
+            values = holdings * path[t]
+            wealth = values.sum()
+            traded = np.abs(wealth * weights - values).sum()
+            holdings = (wealth - cost * traded) * weights / path[t]
+    return holdings @ path[-1]
+
+
+class TestRebalancePolicies(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = simulate_portfolio(3, np.array([100.0, 50.0, 20.0]), np.array([0.08, 0.12, 0.03]),
+                                         np.array([0.2, 0.45, 0.05]), 1, 1 / 252, n_simulations=200)
+        self.weights = np.array([0.5, 0.3, 0.2])
+
+    def test_buy_and_hold(self):
+        result = evaluate_rebalancing_policy(self.prices, self.weights)
+        expected = (self.weights / self.prices[:, 0, :] * self.prices[:, -1, :]).sum(axis=1)
+
+        np.testing.assert_allclose(result['terminal_wealth'], expected)
+        self.assertTrue(np.all(result['rebalances'] == 0))
+        self.assertTrue(np.all(result['costs'] == 0))
+
+    def test_calendar_matches_single_path_loop(self):
+        result = evaluate_rebalancing_policy(self.prices, self.weights, period=63, transaction_cost=0.002)
+
+        expected = [rebalance_one_path(path, self.weights, 63, 0.002) for path in self.prices[:20]]
+        np.testing.assert_allclose(result['terminal_wealth'][:20], expected)
+        self.assertTrue(np.all(result['rebalances'] == 3))
+        self.assertTrue(np.all(result['turnover'] > 0))
+
+    def test_threshold_policy(self):
+        prices = np.ones((2, 5, 2))
+        prices[0, 3, 0] = 1.2  # 20% jump on path 0 only
+        prices[0, 4, 0] = 1.2
+
+        result = evaluate_rebalancing_policy(prices, np.array([0.5, 0.5]), threshold=0.1, transaction_cost=0.01)
+        np.testing.assert_array_equal(result['rebalances'], [1, 0])
+        # Wealth 1.1 with values (0.6, 0.5): trading 0.05 each way costs 0.01 * 0.1
+        self.assertAlmostEqual(result['costs'][0], 0.001)
+        self.assertAlmostEqual(result['terminal_wealth'][0], 1.099)
+        self.assertEqual(result['terminal_wealth'][1], 1.0)
+
+    def test_drift_band_policy(self):
+        # Drift trigger at 5% with a 2% no-trade band trades less than full rebalancing on the same trigger
+        full = evaluate_rebalancing_policy(self.prices, self.weights, drift_threshold=0.05)
+        banded = evaluate_rebalancing_policy(self.prices, self.weights, drift_threshold=0.05, band=0.02)
+
+        self.assertGreater(full['rebalances'].sum(), 0)
+        self.assertLess(banded['turnover'].sum(), full['turnover'].sum())
+
+    def test_compare_policies(self):
+        summary = compare_rebalancing_policies(self.prices, self.weights)
+
+        self.assertListEqual(list(summary), ['Buy and hold', 'Quarterly', 'Yearly', 'Threshold 10%'])
+        self.assertEqual(summary['Buy and hold']['mean_costs'], 0)
+        self.assertEqual(summary['Quarterly']['mean_rebalances'], 3)
+        # A one-year horizon ends before day 252: Yearly never fires and is flagged as buy and hold
+        self.assertEqual(summary['Yearly']['mean_rebalances'], 0)
+        self.assertTrue(summary['Yearly']['identical_to_buy_and_hold'])
+        self.assertFalse(summary['Quarterly']['identical_to_buy_and_hold'])
+        self.assertEqual(summary['Yearly']['mean_terminal_wealth'], summary['Buy and hold']['mean_terminal_wealth'])
+        quantiles = summary['Quarterly']['terminal_wealth_quantiles']
+        self.assertLess(quantiles[0.05], quantiles[0.5])
+        self.assertLess(quantiles[0.5], quantiles[0.95])
+
+    def test_probability_of_loss_uses_initial_wealth(self):
+        summary = compare_rebalancing_policies(self.prices, self.weights, policies={'Buy and hold': {}}, initial_wealth=100.0)
+        wealth = evaluate_rebalancing_policy(self.prices, self.weights, initial_wealth=100.0)['terminal_wealth']
+
+        self.assertAlmostEqual(summary['Buy and hold']['probability_of_loss'], np.mean(wealth < 100.0))
+        self.assertGreater(summary['Buy and hold']['probability_of_loss'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
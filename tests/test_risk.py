@@ -0,0 +1,75 @@
+'''
+Purpose: Unit tests for the vectorized risk analytics
+'''
+
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from src.risk import portfolio_return_matrix, historical_var, historical_cvar, parametric_var, cornish_fisher_var, \
+    max_drawdown, sharpe_ratio, sortino_ratio, risk_metrics
+from src.utils import calculate_sharpe_ratio
+
+class TestRiskMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.returns = rng.standard_t(5, (1000, 4)) * 0.01 + 0.0003
+        self.weights = rng.dirichlet(np.ones(4), size=25)  # 25 portfolios x 4 assets
+        self.portfolio_returns = portfolio_return_matrix(self.weights, self.returns)
+
+    def test_portfolio_return_matrix(self):
+        self.assertEqual(self.portfolio_returns.shape, (1000, 25))
+        np.testing.assert_allclose(self.portfolio_returns[:, 3], self.returns @ self.weights[3])
+
+        # A single weights vector gives a single column
+        self.assertEqual(portfolio_return_matrix(self.weights[0], self.returns).shape, (1000, 1))
+
+    def test_historical_var_matches_percentile(self):
+        np.testing.assert_allclose(historical_var(self.portfolio_returns, 0.95), np.percentile(self.portfolio_returns, 5, axis=0))
+        np.testing.assert_allclose(historical_var(self.portfolio_returns, 0.99), np.percentile(self.portfolio_returns, 1, axis=0))
+
+    def test_historical_cvar(self):
+        expected = np.sort(self.portfolio_returns, axis=0)[:50].mean(axis=0)
+        np.testing.assert_allclose(historical_cvar(self.portfolio_returns, 0.95), expected)
+        self.assertTrue(np.all(historical_cvar(self.portfolio_returns) <= historical_var(self.portfolio_returns)))
+
+    def test_parametric_and_cornish_fisher_var(self):
+        mean = self.portfolio_returns.mean(axis=0)
+        std = self.portfolio_returns.std(axis=0, ddof=1)
+        np.testing.assert_allclose(parametric_var(self.portfolio_returns, 0.95), mean + norm.ppf(0.05) * std)
+
+        # Without skewness or excess kurtosis Cornish-Fisher reduces to the Gaussian VaR
+        gaussian_like = norm.ppf((np.arange(1, 100001) - 0.5) / 100000)[:, None] * 0.01
+        np.testing.assert_allclose(cornish_fisher_var(gaussian_like), parametric_var(gaussian_like), rtol=1e-3)
+
+        # Fat tails push the modified VaR of the t-distributed returns further into the loss tail at 99%
+        self.assertTrue(np.all(cornish_fisher_var(self.portfolio_returns, 0.99) < parametric_var(self.portfolio_returns, 0.99)))
+
+    def test_max_drawdown(self):
+        portfolio_returns = np.array([[0.1, 0.0], [-0.5, 0.1], [0.2, 0.1]])
+        # Column 0: 1.1 -> 0.55 (-50%) -> 0.66; column 1 never draws down
+        np.testing.assert_allclose(max_drawdown(portfolio_returns), [-0.5, 0.0])
+
+    def test_sharpe_matches_utils(self):
+        for column in [0, 7]:
+            expected = calculate_sharpe_ratio(pd.Series(self.portfolio_returns[:, column]), 0.0001)
+            self.assertAlmostEqual(sharpe_ratio(self.portfolio_returns, 0.0001)[column], expected)
+
+    def test_sortino_ratio(self):
+        portfolio_returns = np.array([[0.02], [-0.01], [0.03], [-0.02]])
+        downside_deviation = np.sqrt((0.01**2 + 0.02**2) / 4)
+        np.testing.assert_allclose(sortino_ratio(portfolio_returns), [0.005 / downside_deviation])
+
+    def test_risk_metrics(self):
+        metrics = risk_metrics(self.weights, self.returns)
+
+        self.assertSetEqual(set(metrics), {'historical_var', 'historical_cvar', 'parametric_var', 'cornish_fisher_var',
+                                           'max_drawdown', 'sharpe_ratio', 'sortino_ratio'})
+        for values in metrics.values():
+            self.assertEqual(values.shape, (25,))
+
+        np.testing.assert_allclose(metrics['historical_var'], historical_var(self.portfolio_returns))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+'''
+Purpose: Unit tests for the jump-diffusion, Heston and regime-switching path models
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import unittest
+import numpy as np
+from src.sde_models import (simulate_merton_jump_diffusion, simulate_heston, fit_regime_switching, simulate_regime_switching,
+                            RegimeSwitchingModel, benchmark_sde_models)
+from src.simulations import simulation_value, simulate_portfolio
+from src.config import RunConfig
+from src.risk import risk_metrics
+
+
+def regime_returns(n_obs=2000, seed=1):
+    # Two-state sample: calm with positive drift, turbulent with negative drift and 3x volatility
+    rng = np.random.default_rng(seed)
+    transitions = np.array([[0.99, 0.01], [0.03, 0.97]])
+    means = np.array([[0.0008, 0.0005], [-0.001, -0.002]])
+    volatilities = np.array([[0.008, 0.01], [0.025, 0.03]])
+
+    regimes = np.empty(n_obs, dtype=int)
+    regime = 0
+    for t in range(n_obs):
+        regime = rng.choice(2, p=transitions[regime])
+        regimes[t] = regime
+    return np.expm1(rng.normal(means[regimes], volatilities[regimes])), regimes
+
+
+class TestSDEModels(unittest.TestCase):
+
+    def setUp(self):
+        self.S0 = np.array([100.0, 50.0])
+        self.mu = np.array([0.08, 0.04])
+        self.sigma = np.array([0.2, 0.3])
+
+    def test_merton_jump_diffusion(self):
+        prices = simulate_merton_jump_diffusion(self.S0, self.mu, self.sigma, n_simulations=4000, jump_intensity=3.0)
+
+        self.assertEqual(prices.shape, (4000, 252, 2))
+        np.testing.assert_array_equal(prices[:, 0], np.broadcast_to(self.S0, (4000, 2)))
+        # The compensated drift keeps E[S_T] = S0 exp(mu T)
+        expected = self.S0 * np.exp(self.mu * 251 / 252)
+        np.testing.assert_allclose(prices[:, -1].mean(axis=0), expected, rtol=0.02)
+
+        # Jumps fatten the tails of daily log returns
+        log_returns = np.diff(np.log(prices[:, :, 0]), axis=1).ravel()
+        standardized = (log_returns - log_returns.mean()) / log_returns.std()
+        self.assertGreater(np.mean(standardized**4), 4)
+
+    def test_heston(self):
+        # Without vol of vol the variance stays at theta: plain GBM volatility
+        constant = simulate_heston(self.S0, self.mu, self.sigma, n_simulations=2000, vol_of_vol=0.0)
+        np.testing.assert_allclose(np.diff(np.log(constant), axis=1).std(axis=(0, 1)) * np.sqrt(252), self.sigma, rtol=0.01)
+
+        # Leverage effect: negative price/variance correlation skews terminal returns to the left
+        stochastic = simulate_heston(self.S0, self.mu, self.sigma, n_simulations=4000, vol_of_vol=0.8, rho=-0.9)
+        terminal = np.log(stochastic[:, -1, 0] / self.S0[0])
+        skewness = np.mean((terminal - terminal.mean())**3) / terminal.std()**3
+        self.assertLess(skewness, -0.2)
+        self.assertTrue(np.all(np.isfinite(stochastic)))
+
+    def test_fit_regime_switching(self):
+        returns, regimes = regime_returns()
+        model = fit_regime_switching(returns)
+
+        np.testing.assert_allclose(np.sqrt(np.diagonal(model.covariances, axis1=1, axis2=2)), [[0.008, 0.01], [0.025, 0.03]], rtol=0.15)
+        np.testing.assert_allclose(np.diag(model.transition_matrix), [0.99, 0.97], atol=0.02)
+        self.assertEqual(np.argmax(model.current_probabilities), regimes[-1])
+
+    def test_simulate_regime_switching(self):
+        model = RegimeSwitchingModel(np.array([[0.9, 0.1], [0.2, 0.8]]), np.array([[0.001, 0.0], [-0.002, -0.001]]),
+                                     np.stack([np.diag([1e-4, 2e-4]), np.diag([9e-4, 1e-3])]), np.array([0.5, 0.5]), np.array([1.0, 0.0]), 0.0)
+        prices, regimes = simulate_regime_switching(self.S0, model, n_simulations=2000, return_regimes=True)
+
+        self.assertEqual(prices.shape, (2000, 252, 2))
+        # Empirical transition frequencies of the batched chains
+        stay_calm = np.mean(regimes[:, 1:][regimes[:, :-1] == 0] == 0)
+        self.assertAlmostEqual(stay_calm, 0.9, places=2)
+        # Stationary share of the turbulent regime is 1/3
+        self.assertAlmostEqual(np.mean(regimes[:, 100:] == 1), 1 / 3, delta=0.02)
+
+        # Same valuation and risk pipeline as simulate_portfolio
+        values = simulation_value(2, prices, 1)
+        self.assertEqual(values.shape, (10, 252))
+        metrics = risk_metrics(np.array([0.5, 0.5]), np.diff(prices[0], axis=0) / prices[0, :-1])
+        self.assertTrue(np.isfinite(metrics['historical_var']).all())
+
+    def test_simulate_portfolio_model_selection(self):
+        returns, _ = regime_returns(500)
+        correlation_matrix = np.array([[1.0, 0.3], [0.3, 1.0]])
+
+        # The pipeline entry point dispatches to the models with the same arguments and seed
+        merton = simulate_portfolio(2, self.S0, self.mu, self.sigma, 1, 1 / 252, n_simulations=50, correlation_matrix=correlation_matrix,
+                                    model='merton', model_parameters={'jump_intensity': 3.0})
+        np.testing.assert_array_equal(merton, simulate_merton_jump_diffusion(self.S0, self.mu, self.sigma, n_simulations=50, jump_intensity=3.0,
+                                                                             correlation_matrix=correlation_matrix))
+
+        for model in ('heston', 'regime_switching'):
+            config = RunConfig(assets=['A', 'B'], n_simulations=50, model=model)
+            prices = simulate_portfolio(2, self.S0, self.mu, self.sigma, config=config, returns=returns)
+            self.assertEqual(prices.shape, (50, 252, 2))
+            np.testing.assert_array_equal(prices[:, 0], np.broadcast_to(self.S0, (50, 2)))
+
+        with self.assertRaises(ValueError):
+            simulate_portfolio(2, self.S0, self.mu, self.sigma, 1, 1 / 252, n_simulations=50, model='regime_switching')
+        with self.assertRaises(ValueError):
+            simulate_portfolio(2, self.S0, self.mu, self.sigma, 1, 1 / 252, n_simulations=50, model='sabr')
+
+    def test_benchmark(self):
+        timings = benchmark_sde_models(n_simulations=100, n_steps=50, n_assets=3)
+        self.assertListEqual(list(timings), ['gbm', 'merton', 'heston', 'regime_switching'])
+        self.assertTrue(all(seconds > 0 for seconds in timings.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
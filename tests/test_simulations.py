@@ -1,6 +1,9 @@
 '''
 Purpose: Unit tests for the Monte Carlo simulations
 '''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 import unittest
 import pandas as pd
@@ -56,6 +59,48 @@ class TestMonteCarloSimulation(unittest.TestCase):
         # Assert the shape is (n_simulations, assets_size)
         self.assertEqual(final_prices.shape, (self.n_simulations, self.assets_size))
 
+    def test_correlated_simulation(self):
+        correlation_matrix = np.array([[1.0, 0.8, 0.0], [0.8, 1.0, 0.0], [0.0, 0.0, 1.0]])
+        simulated_prices = simulate_portfolio(
+            self.assets_size, self.initial_asset_prices, self.mu_annualized, self.sigma_annualized,
+            self.time_horizon, self.time_step, self.n_simulations, self.n_steps, correlation_matrix=correlation_matrix
+        )
+        log_returns = np.diff(np.log(simulated_prices), axis=1).reshape(-1, self.assets_size)
+
+        # Empirical correlation of the simulated shocks matches the input
+        np.testing.assert_allclose(np.corrcoef(log_returns, rowvar=False), correlation_matrix, atol=0.01)
+
+    def test_factor_model_simulation(self):
+        from src.data_handler import FactorCovariance
+        loadings = np.array([[0.9], [0.7], [0.0]])
+        factor_correlation = FactorCovariance(loadings, 1 - loadings[:, 0]**2)
+
+        simulated_prices = simulate_portfolio(
+            self.assets_size, self.initial_asset_prices, self.mu_annualized, self.sigma_annualized,
+            self.time_horizon, self.time_step, self.n_simulations, self.n_steps, correlation_matrix=factor_correlation
+        )
+        log_returns = np.diff(np.log(simulated_prices), axis=1).reshape(-1, self.assets_size)
+
+        np.testing.assert_allclose(np.corrcoef(log_returns, rowvar=False), factor_correlation.to_dense(), atol=0.01)
+
+    def test_run_config_and_concurrency(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from src.config import RunConfig
+
+        configs = [RunConfig(n_simulations=200, seed=seed) for seed in (1, 2, 3, 4)]
+        simulate = lambda config: simulate_portfolio(self.assets_size, self.initial_asset_prices, self.mu_annualized,
+                                                     self.sigma_annualized, config=config)
+        serial = [simulate(config) for config in configs]
+
+        # Each simulation owns its generator, so concurrent runs reproduce the serial results
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            concurrent = list(pool.map(simulate, configs))
+
+        self.assertEqual(serial[0].shape, (200, 252, self.assets_size))
+        for expected, result in zip(serial, concurrent):
+            np.testing.assert_array_equal(result, expected)
+        self.assertFalse(np.array_equal(serial[0], serial[1]))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
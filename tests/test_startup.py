@@ -0,0 +1,62 @@
+'''
+Purpose: Import-time benchmark for the API and CLI entry points (startup budget)
+'''
+
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+
+# Cumulative import budget per entry point, in milliseconds (as reported by `python -X importtime`)
+STARTUP_BUDGET_MS = {'app': 1000, 'main': 1000}
+
+# Optional dependencies that must only be loaded when they are actually used
+LAZY_MODULES = ['matplotlib', 'yfinance', 'scipy.stats', 'scipy.optimize']
+
+
+def measure_import_time(module):
+    """
+    Return the cumulative import time of a module in milliseconds, measured in a fresh interpreter.
+
+    Args:
+    - module: name of the module in src/ to import
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=SRC_DIR, capture_output=True, text=True, check=True)
+
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        # The top-level entry is the only one without indentation in the module column
+        if len(fields) == 3 and fields[2].rstrip() == f' {module}':
+            return int(fields[1]) / 1000
+
+    raise AssertionError(f"No import timing reported for {module}")
+
+
+def loaded_modules(module):
+    """
+    Return which of LAZY_MODULES are present in sys.modules after importing a module.
+    """
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+
+class TestStartupBudget(unittest.TestCase):
+
+    def test_entry_points_do_not_load_optional_dependencies(self):
+        for module in STARTUP_BUDGET_MS:
+            with self.subTest(module=module):
+                self.assertEqual(loaded_modules(module), [])
+
+    def test_entry_points_within_budget(self):
+        for module, budget in STARTUP_BUDGET_MS.items():
+            with self.subTest(module=module):
+                elapsed = measure_import_time(module)
+                self.assertLess(elapsed, budget, f"Importing {module} took {elapsed:.0f} ms (budget {budget} ms)")
+
+
+if __name__ == '__main__':
+    unittest.main()
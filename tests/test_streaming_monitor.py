@@ -0,0 +1,191 @@
+'''
+Purpose: Unit tests for the streaming stop/rebalance monitor and its replay feeds
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import asyncio
+import json
+import queue
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import numpy as np
+from src.streaming_monitor import StreamingMonitor, replay_file, replay_socket, serve_replay, server_sent_events
+
+
+class TestStreamingMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ticks_path = os.path.join(self.directory.name, 'ticks.csv')
+        with open(self.ticks_path, 'w') as f:
+            f.write('timestamp,ticker,price\n')
+            f.write('t0,AAA,100\nt0,BBB,50\nt1,AAA,101\nt2,BBB,45\nt3,AAA,130\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stop_and_rebalance_triggers(self):
+        monitor = StreamingMonitor()
+        monitor.add_portfolio('p1', {'AAA': 0.5, 'BBB': 0.5}, prices={'AAA': 100.0, 'BBB': 50.0}, band=0.05, threshold=0.05)
+
+        # 1% move: no trigger, value follows the holding
+        self.assertEqual(monitor.on_tick('t1', 'AAA', 101.0), [])
+        self.assertAlmostEqual(monitor.values[0], 1.005)
+
+        # 10% drop in BBB: a stop decision, the weight drift (about -2.9%) stays in the band
+        decisions = monitor.on_tick('t2', 'BBB', 45.0)
+        self.assertEqual([decision['type'] for decision in decisions], ['stop'])
+        self.assertAlmostEqual(decisions[0]['change'], -0.1)
+
+        # The stopped portfolio is closed: its value no longer moves and it triggers nothing
+        self.assertFalse(monitor.active[0])
+        value = monitor.values[0]
+        self.assertEqual(monitor.on_tick('t3', 'AAA', 130.0), [])
+        self.assertEqual(monitor.values[0], value)
+
+    def test_rebalance_trigger(self):
+        monitor = StreamingMonitor()
+        monitor.add_portfolio('p1', {'AAA': 0.5, 'BBB': 0.5}, prices={'AAA': 100.0, 'BBB': 50.0}, band=0.05, threshold=0.5)
+
+        # AAA up 29%: its weight drifts out of the band and the portfolio is rebalanced to target
+        decisions = monitor.on_tick('t1', 'AAA', 129.0)
+        self.assertEqual([decision['type'] for decision in decisions], ['rebalance'])
+        self.assertGreater(decisions[0]['drift'], 0.05)
+        self.assertEqual(monitor.on_tick('t2', 'AAA', 129.5), [])
+        self.assertTrue(monitor.active[0])
+
+    def test_stop_has_priority_over_rebalance(self):
+        monitor = StreamingMonitor()
+        monitor.add_portfolio('p1', {'AAA': 0.5, 'BBB': 0.5}, prices={'AAA': 100.0, 'BBB': 50.0}, band=0.05, threshold=0.05)
+        holdings = monitor._positions['AAA'][1].copy()
+
+        # A 30% jump fires both triggers: only the stop is emitted, and the holdings are not traded back
+        decisions = monitor.on_tick('t1', 'AAA', 130.0)
+        self.assertEqual([decision['type'] for decision in decisions], ['stop'])
+        self.assertGreater(abs(decisions[0]['drift']), 0.05)
+        np.testing.assert_array_equal(monitor._positions['AAA'][1], holdings)
+        self.assertEqual(monitor.on_tick('t2', 'BBB', 40.0), [])
+
+    def test_pending_portfolio_and_estimates(self):
+        monitor = StreamingMonitor()
+        monitor.add_portfolio('p1', {'AAA': 1.0})
+        self.assertEqual(monitor.portfolio_ids, [])
+
+        monitor.on_tick('t0', 'AAA', 100.0)
+        self.assertEqual(monitor.portfolio_ids, ['p1'])
+
+        monitor.on_tick('t1', 'AAA', 110.0)
+        mean, variance, n_ticks = monitor.estimates['AAA']
+        self.assertEqual(n_ticks, 1)
+        self.assertGreater(mean, 0)
+        self.assertGreater(variance, 0)
+
+        with self.assertRaises(ValueError):
+            monitor.add_portfolio('p1', {'AAA': 1.0})
+
+    def test_run_file_replay_publishes_decisions(self):
+        monitor = StreamingMonitor()
+        monitor.add_portfolio('p1', {'AAA': 0.5, 'BBB': 0.5}, band=0.05, threshold=0.05)
+        subscriber = monitor.subscribe()
+
+        n_ticks = asyncio.run(monitor.run(replay_file(self.ticks_path)))
+        self.assertEqual(n_ticks, 5)
+        # p1 stops on BBB's drop and ignores AAA's later jump
+        self.assertEqual([subscriber.get_nowait()['type'] for _ in range(subscriber.qsize())], ['stop'])
+
+        # Published decisions stream as Server-Sent Events
+        monitor.publish({'type': 'stop', 'portfolio': 'p1'})
+        event = next(server_sent_events(subscriber))
+        self.assertTrue(event.startswith('event: stop\ndata: '))
+        self.assertEqual(json.loads(event.split('data: ')[1]), {'type': 'stop', 'portfolio': 'p1'})
+
+    def test_publish_with_concurrent_consumers(self):
+        monitor = StreamingMonitor()
+        with patch('src.streaming_monitor.SUBSCRIBER_QUEUE_SIZE', 2):
+            subscriber = monitor.subscribe()
+        errors, stop = [], threading.Event()
+
+        def guarded(function):
+            def run():
+                try:
+                    function()
+                except Exception as error:
+                    errors.append(error)
+            return threading.Thread(target=run)
+
+        def publish():
+            for number in range(2000):
+                monitor.publish({'type': 'stop', 'number': number})
+
+        def drain():
+            while not stop.is_set():
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+
+        def churn():
+            while not stop.is_set():
+                monitor.unsubscribe(monitor.subscribe())
+
+        # Switch threads as often as possible so the publishers interleave with the consumer and each other
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            publishers = [guarded(publish) for _ in range(2)]
+            others = [guarded(drain), guarded(churn)]
+            for thread in publishers + others:
+                thread.start()
+            for thread in publishers:
+                thread.join()
+            stop.set()
+            for thread in others:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Full queues drop their oldest decision instead of raising in the feed
+        self.assertEqual(errors, [])
+        monitor.publish({'type': 'stop', 'number': 'last'})
+        monitor.publish({'type': 'stop', 'number': 'newest'})
+        monitor.publish({'type': 'stop', 'number': 'latest'})
+        self.assertEqual([subscriber.get_nowait()['number'] for _ in range(2)], ['newest', 'latest'])
+
+    def test_bars_file_replay(self):
+        bars_path = os.path.join(self.directory.name, 'prices.csv')
+        with open(bars_path, 'w') as f:
+            f.write('Date,AAA,BBB\n2020-01-01,100.0,\n2020-01-02,101.0,50.0\n')
+
+        async def collect():
+            return [tick async for tick in replay_file(bars_path)]
+
+        self.assertEqual(asyncio.run(collect()), [('2020-01-01', 'AAA', 100.0), ('2020-01-02', 'AAA', 101.0), ('2020-01-02', 'BBB', 50.0)])
+
+    def test_malformed_line_names_the_line(self):
+        with open(self.ticks_path, 'a') as f:
+            f.write('t4,AAA\n')
+
+        async def collect():
+            return [tick async for tick in replay_file(self.ticks_path)]
+
+        with self.assertRaisesRegex(ValueError, 'line 7'):
+            asyncio.run(collect())
+
+    def test_socket_replay(self):
+        async def replay():
+            server = await serve_replay(self.ticks_path)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return [tick async for tick in replay_socket('127.0.0.1', port)]
+
+        ticks = asyncio.run(replay())
+        self.assertEqual(len(ticks), 5)
+        self.assertEqual(ticks[-1], ('t3', 'AAA', 130.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
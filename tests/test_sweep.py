@@ -0,0 +1,99 @@
+'''
+Purpose: Unit tests for the parameter sweep runner
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.sweep import run_sweep, read_results_table
+
+
+def make_prices(n_days=300, seed=1):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal([0.0006, 0.0009, 0.0002], [0.015, 0.03, 0.004], size=(n_days, 3))
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=['AAA', 'BBB', 'CCC'],
+                        index=pd.bdate_range('2022-01-03', periods=n_days))
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_prices()
+        self.grid = {'risk_tolerance': [3, 8], 'rebalancing_frequency': ['Quarterly', 'Yearly'], 'threshold': [None, 0.05]}
+        self.work_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_grid_results(self):
+        results_path = os.path.join(self.work_dir.name, 'sweep.npz')
+        results = run_sweep(self.data, self.grid, results_path=results_path, max_workers=1, n_simulations=200)
+
+        self.assertEqual(len(results), 8)
+        self.assertListEqual(results['risk_tolerance'].tolist(), [3] * 4 + [8] * 4)
+        self.assertListEqual(results['rebalancing_frequency'].tolist()[:4], ['Quarterly', 'Quarterly', 'Yearly', 'Yearly'])
+        np.testing.assert_allclose(results[['weight_AAA', 'weight_BBB', 'weight_CCC']].sum(axis=1), 1, atol=1e-6)
+
+        # Points sharing the optimizer setting share the optimum
+        self.assertEqual(results.loc[results['risk_tolerance'] == 3, 'expected_return'].nunique(), 1)
+        # The historical backtest rebalances quarterly more often than yearly
+        self.assertGreater(results['historical_rebalances'][0], results['historical_rebalances'][2])
+
+        stored = read_results_table(results_path)
+        pd.testing.assert_frame_equal(stored, results, check_dtype=False)
+
+    def test_parallel_matches_serial(self):
+        serial = run_sweep(self.data, self.grid, max_workers=1, n_simulations=100)
+        parallel = run_sweep(self.data, self.grid, max_workers=2, n_simulations=100)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_resume_from_checkpoint(self):
+        checkpoint_path = os.path.join(self.work_dir.name, 'sweep.jsonl')
+        first = run_sweep(self.data, {**self.grid, 'risk_tolerance': [3]}, checkpoint_path=checkpoint_path, max_workers=1, n_simulations=100)
+
+        # Simulate an interruption in the middle of writing the next task
+        with open(checkpoint_path, 'a') as f:
+            f.write('{"key": "[8, nu')
+
+        from src import sweep
+        with patch.object(sweep, '_run_task', wraps=sweep._run_task) as run_task:
+            resumed = run_sweep(self.data, self.grid, checkpoint_path=checkpoint_path, max_workers=1, n_simulations=100)
+
+        # Only the risk_tolerance = 8 task was run again
+        self.assertEqual(run_task.call_count, 1)
+        pd.testing.assert_frame_equal(resumed.iloc[:4], first)
+        self.assertEqual(len(resumed), 8)
+
+    def test_resume_ignores_rows_of_other_runs(self):
+        checkpoint_path = os.path.join(self.work_dir.name, 'sweep.jsonl')
+        run_sweep(self.data, self.grid, checkpoint_path=checkpoint_path, max_workers=1, n_simulations=100)
+
+        from src import sweep
+        # Different prices, transaction cost or simulation settings rerun every task
+        for changes in [{'data': self.data * 1.01}, {'transaction_cost': 0.01}, {'n_simulations': 50}, {'time_horizon': 0.5}]:
+            settings = {'data': self.data, 'n_simulations': 100, **changes}
+            with patch.object(sweep, '_run_task', wraps=sweep._run_task) as run_task:
+                run_sweep(grid=self.grid, checkpoint_path=checkpoint_path, max_workers=1, **settings)
+            self.assertEqual(run_task.call_count, 2, changes)
+
+    def test_defaults_from_config(self):
+        from src.config import RunConfig
+
+        results = run_sweep(self.data, {'risk_tolerance': [3]}, max_workers=1, n_simulations=100)
+        self.assertEqual(results['return_target'][0], RunConfig.return_expectations)
+        self.assertEqual(results['threshold'][0], RunConfig.rebalance_threshold)
+        self.assertEqual(results['rebalancing_frequency'][0], RunConfig.rebalancing_frequency)
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(ValueError):
+            run_sweep(self.data, {'risk_tolerence': [3]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+'''
+Purpose: Unit tests for the synthetic market data generator and the synthetic fetch backend
+'''
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from src.synthetic_market import synthetic_prices, synthetic_tickers, ticker_parameters, SyntheticProvider
+from src.data_handler import fetch_data
+from src.ingestion import ingest_prices, ingest_option_chains, RateLimiter
+from src.price_store import PriceStore, load_option_snapshot
+
+
+class TestSyntheticMarket(unittest.TestCase):
+
+    def test_deterministic_and_independent_of_other_tickers(self):
+        tickers = synthetic_tickers(50)
+        prices = synthetic_prices(tickers, start='2020-01-01', end='2022-01-01')
+
+        self.assertEqual(prices.shape, (523, 50))
+        self.assertEqual(tickers[:2], ['SYN0000', 'SYN0001'])
+        pd.testing.assert_frame_equal(prices, synthetic_prices(tickers, start='2020-01-01', end='2022-01-01'))
+        pd.testing.assert_frame_equal(prices[['SYN0007', 'SYN0003']],
+                                      synthetic_prices(['SYN0007', 'SYN0003'], start='2020-01-01', end='2022-01-01'))
+        self.assertFalse(prices.equals(synthetic_prices(tickers, start='2020-01-01', end='2022-01-01', seed=1)))
+
+        # Starts at the drawn initial price, with no missing data by default
+        self.assertAlmostEqual(prices['SYN0000'].iloc[0], ticker_parameters('SYN0000')['initial_price'])
+        self.assertFalse(prices.isna().any().any())
+
+    def test_correlation_structure(self):
+        tickers = synthetic_tickers(200)
+        prices = synthetic_prices(tickers, market_share=0.3, sector_share=0.2)
+        correlation = np.log(prices).diff().dropna().corr().values
+
+        sectors = np.array([ticker_parameters(ticker)['sector'] for ticker in tickers])
+        same_sector = sectors[:, None] == sectors[None, :]
+        off_diagonal = ~np.eye(len(tickers), dtype=bool)
+        self.assertAlmostEqual(correlation[same_sector & off_diagonal].mean(), 0.5, places=1)
+        self.assertAlmostEqual(correlation[~same_sector].mean(), 0.3, places=1)
+
+    def test_missing_data_patterns(self):
+        tickers = synthetic_tickers(400)
+        prices = synthetic_prices(tickers, start='2015-01-01', end='2020-01-01', listing_rate=0.1, delisting_rate=0.05)
+
+        listed_late = prices.iloc[0].isna()
+        delisted = prices.iloc[-1].isna()
+        self.assertAlmostEqual(listed_late.mean(), 0.1, delta=0.05)
+        self.assertAlmostEqual(delisted.mean(), 0.05, delta=0.04)
+
+        # Listed tickers trade without interruption until they delist
+        first_days = prices.apply(lambda column: column.first_valid_index())
+        last_days = prices.apply(lambda column: column.last_valid_index())
+        self.assertEqual(prices.notna().sum().tolist(), [len(prices.loc[first:last]) for first, last in zip(first_days, last_days)])
+
+        # Gaps come in runs of 5 days (or longer where runs overlap)
+        gaps = synthetic_prices(tickers, start='2015-01-01', end='2020-01-01', missing_rate=0.02, gap_length=5)
+        self.assertAlmostEqual(gaps.isna().mean().mean(), 0.02, delta=0.01)
+        missing = gaps['SYN0000'].isna()
+        runs = missing.astype(int).groupby((~missing).cumsum()).sum()
+        self.assertGreaterEqual(runs[runs > 0].min(), 5)
+
+    def test_fetch_backend_and_provider(self):
+        with patch.dict(os.environ, {'SDE_DATA_BACKEND': 'synthetic'}):
+            data = fetch_data(['AAPL', 'TSLA'], end_date='2012-01-01')
+        pd.testing.assert_frame_equal(data, synthetic_prices(['AAPL', 'TSLA'], start='2010-01-01', end='2012-01-01'))
+
+        with patch.dict(os.environ, {'SDE_DATA_BACKEND': 'bloomberg'}), self.assertRaises(ValueError):
+            fetch_data(['AAPL'])
+
+        with tempfile.TemporaryDirectory() as store_path:
+            provider = SyntheticProvider(as_of='2024-06-03', missing_rate=0.01)
+            fast = dict(rate_limiter=RateLimiter(rate=1e6, burst=1000), backoff=0.001)
+            freshness = ingest_prices(synthetic_tickers(30), 'synthetic', provider, start='2023-01-01', end='2024-01-01',
+                                      store_path=store_path, shard_size=10, **fast)
+            self.assertTrue(all(record['status'] == 'ok' for record in freshness.values()))
+            self.assertEqual(PriceStore('synthetic', store_path).values.shape, (260, 30))
+
+            _, errors = ingest_option_chains(['AAA', 'BBB'], provider, as_of='2024-06-03T16:00:00', store_path=store_path,
+                                             max_expirations=2, **fast)
+            snapshot = load_option_snapshot(store_path=store_path)
+            self.assertEqual(errors, {})
+            self.assertEqual(len(snapshot['strike']), 2 * 2 * 2 * 9)
+            self.assertTrue(np.all(snapshot['bid'] < snapshot['ask']))
+
+
+if __name__ == '__main__':
+    unittest.main()